@@ -0,0 +1,194 @@
+import os
+import time
+
+import numpy as np
+
+class IVFIndex:
+    """
+    Approximate nearest neighbour index berbasis inverted file (IVF) untuk
+    vector dokumen (misal vector LSI dari DocumentEmbeddings).
+
+    Vector dokumen dinormalisasi (cosine similarity = dot product), lalu
+    dikelompokkan dengan spherical k-means menjadi n_lists cluster. Setiap
+    cluster adalah satu "inverted list" yang vector-vectornya disimpan
+    berdampingan di disk. Saat query, hanya nprobe cluster dengan centroid
+    paling dekat yang di-scan; nprobe lebih besar = recall lebih tinggi,
+    latency lebih besar.
+
+    Attributes
+    ----------
+    centroids: np.ndarray (n_lists, dim), centroid yang sudah dinormalisasi
+    offsets: np.ndarray (n_lists + 1,), list ke-c berada di baris
+             offsets[c] sampai offsets[c + 1] dari list_ids / list_vectors
+    list_ids: np.ndarray, doc ID untuk setiap baris, dikelompokkan per list
+    list_vectors: np.ndarray, vector ternormalisasi, urutan sama dengan list_ids
+    """
+    def __init__(self, output_dir, name = "doc_ivf"):
+        self.output_dir = output_dir
+        self.name = name
+        self.centroids = None
+        self.offsets = None
+        self.list_ids = None
+        self.list_vectors = None
+
+    def _path(self, part):
+        return os.path.join(self.output_dir, self.name + '.' + part + '.npy')
+
+    @staticmethod
+    def normalize(vectors):
+        vectors = np.asarray(vectors, dtype = np.float32)
+        norms = np.linalg.norm(vectors, axis = -1, keepdims = True)
+        return np.divide(vectors, norms, out = np.zeros_like(vectors), where = norms > 0)
+
+    def build(self, vectors, n_lists = None, n_iter = 20, seed = 0):
+        """
+        Melatih coarse quantiser (spherical k-means) dan membangun inverted lists.
+
+        Parameters
+        ----------
+        vectors: np.ndarray (N, dim)
+            Vector dokumen, baris ke-i adalah doc ID i
+        n_lists: int
+            Banyaknya cluster; default sqrt(N)
+        n_iter: int
+            Banyaknya iterasi k-means
+        """
+        X = self.normalize(vectors)
+        N = X.shape[0]
+        if n_lists is None:
+            n_lists = max(1, int(np.sqrt(N)))
+        n_lists = min(n_lists, N)
+
+        rng = np.random.default_rng(seed)
+        centroids = X[rng.choice(N, n_lists, replace = False)].copy()
+        for _ in range(n_iter):
+            assign = np.argmax(X @ centroids.T, axis = 1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, X)
+            counts = np.bincount(assign, minlength = n_lists)
+            # cluster kosong diinisialisasi ulang dengan titik acak
+            empty = counts == 0
+            sums[empty] = X[rng.choice(N, int(empty.sum()))]
+            centroids = self.normalize(sums)
+        assign = np.argmax(X @ centroids.T, axis = 1)
+
+        order = np.argsort(assign, kind = 'stable')
+        counts = np.bincount(assign, minlength = n_lists)
+        self.centroids = centroids
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.list_ids = order.astype(np.int64)
+        self.list_vectors = X[order]
+
+    def save(self):
+        """Menyimpan centroids dan inverted lists ke output directory"""
+        np.save(self._path('centroids'), self.centroids)
+        np.save(self._path('offsets'), self.offsets)
+        np.save(self._path('ids'), self.list_ids)
+        np.save(self._path('vectors'), self.list_vectors)
+
+    def load(self):
+        """Memuat index; vector inverted lists di-memory-map"""
+        self.centroids = np.load(self._path('centroids'))
+        self.offsets = np.load(self._path('offsets'))
+        self.list_ids = np.load(self._path('ids'))
+        self.list_vectors = np.load(self._path('vectors'), mmap_mode = 'r')
+        return self
+
+    def search(self, queries, k = 10, nprobe = 8):
+        """
+        Mencari top-k dokumen untuk satu batch query.
+
+        Parameters
+        ----------
+        queries: np.ndarray (n_queries, dim) atau (dim,)
+        k: int
+        nprobe: int
+            Banyaknya inverted list yang di-scan per query
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            (scores, doc_ids), masing-masing berukuran (n_queries, k), terurut
+            mengecil berdasarkan cosine similarity. Jika kandidat kurang dari k,
+            sisa slot diisi score -inf dan doc ID -1; query dengan zero vector
+            (misal semua term-nya OOV) tidak punya kandidat sama sekali.
+        """
+        if k <= 0 or nprobe <= 0:
+            raise ValueError("k dan nprobe harus >= 1")
+        Q = self.normalize(np.atleast_2d(queries))
+        nprobe = min(nprobe, self.centroids.shape[0])
+        # probe list untuk seluruh batch dihitung dengan satu perkalian matrix
+        coarse = Q @ self.centroids.T
+        probes = np.argpartition(-coarse, nprobe - 1, axis = 1)[:, :nprobe]
+
+        all_scores = np.full((Q.shape[0], k), -np.inf, dtype = np.float32)
+        all_ids = np.full((Q.shape[0], k), -1, dtype = np.int64)
+        for qi in range(Q.shape[0]):
+            if not Q[qi].any():
+                continue
+            rows = np.concatenate([np.arange(self.offsets[c], self.offsets[c + 1]) for c in probes[qi]])
+            if len(rows) == 0:
+                continue
+            rows.sort()
+            scores = self.list_vectors[rows] @ Q[qi]
+            top = top_k_indices(scores, k)
+            all_scores[qi, :len(top)] = scores[top]
+            all_ids[qi, :len(top)] = self.list_ids[rows[top]]
+        return all_scores, all_ids
+
+
+def top_k_indices(scores, k):
+    """Indeks top-k dari array scores, terurut mengecil (argpartition + sort)"""
+    if len(scores) > k:
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind = 'stable')]
+
+def brute_force_search(vectors, queries, k = 10):
+    """Exact top-k cosine similarity, dipakai sebagai ground truth recall"""
+    X = IVFIndex.normalize(vectors)
+    Q = IVFIndex.normalize(np.atleast_2d(queries))
+    sims = Q @ X.T
+    ids = np.stack([top_k_indices(row, k) for row in sims])
+    return np.take_along_axis(sims, ids, axis = 1), ids
+
+def recall_at_k(approx_ids, exact_ids):
+    """Rata-rata proporsi exact top-k yang juga ditemukan oleh ANN"""
+    hits = [len(set(a.tolist()) & set(e.tolist())) / len(e) for a, e in zip(approx_ids, exact_ids)]
+    return sum(hits) / len(hits)
+
+
+if __name__ == "__main__":
+
+    from embedding import DocumentEmbeddings
+
+    # bangun IVF dari matrix embedding (lihat embedding.py), lalu bandingkan
+    # recall dan latency terhadap brute force untuk beberapa nilai nprobe
+    embeddings = DocumentEmbeddings('index').load()
+    vectors = embeddings[np.arange(len(embeddings))]
+
+    ivf = IVFIndex('index')
+    ivf.build(vectors)
+    ivf.save()
+    # zero vector (query yang semua term-nya OOV) tidak menghasilkan dokumen
+    assert (ivf.search(np.zeros(vectors.shape[1]), k = 10)[1] == -1).all(), "zero vector seharusnya tanpa hasil"
+
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), min(200, len(vectors)), replace = False)]
+    K = 10
+
+    start = time.perf_counter()
+    _, exact_ids = brute_force_search(vectors, queries, k = K)
+    elapsed = time.perf_counter() - start
+    print(f"{'brute force':12} recall@{K} = 1.000  {1000 * elapsed / len(queries):.3f} ms/query")
+
+    n_lists = ivf.centroids.shape[0]
+    for nprobe in [1, 2, 4, 8, 16, 32]:
+        if nprobe > n_lists:
+            break
+        start = time.perf_counter()
+        _, approx_ids = ivf.search(queries, k = K, nprobe = nprobe)
+        elapsed = time.perf_counter() - start
+        print(f"nprobe = {nprobe:<4} recall@{K} = {recall_at_k(approx_ids, exact_ids):.3f}  "
+              f"{1000 * elapsed / len(queries):.3f} ms/query")
@@ -1,31 +1,353 @@
-from flask import Flask, jsonify, request
+import os
+import sys
+import time
+import contextlib
+
+# memory profiling mode (lihat memprofile.py): tracemalloc dinyalakan sebelum
+# import lainnya supaya semua alokasi worker tercatat; breakdown di /memory
+MEMORY_PROFILE = os.environ.get("MEMORY_PROFILE") == "1"
+if MEMORY_PROFILE:
+        import tracemalloc
+        tracemalloc.start()
+
+# waktu (detik) setiap tahap startup worker, dilaporkan ke stderr dan di /status
+STARTUP_TIMES = {}
+_startup_begin = _phase_begin = time.perf_counter()
+
+def _startup_phase(name):
+        global _phase_begin
+        now = time.perf_counter()
+        STARTUP_TIMES[name] = round(now - _phase_begin, 4)
+        _phase_begin = now
+
+from flask import Flask, jsonify, request, g
 from flask_cors import CORS
+_startup_phase("import_flask")
+
+# bsbi tidak meng-import nltk/Sastrawi (dan tidak melakukan download apa pun);
+# Sastrawi baru dimuat saat query pertama
 from search import BSBI_instance
-import os
+from suggest import TermSuggester
+from generations import current_generation
+from planner import QueryPlanner
+from pagination import CandidateCache
+_startup_phase("import_search")
 
-basedir = os.path.abspath(os.path.dirname(__file__))
-data_file = os.path.join(basedir, 'collection/')
+# resource punkt diperiksa saat startup, bukan saat query pertama: worker tanpa
+# punkt gagal start dengan pesan yang jelas alih-alih menjawab 500. Pemeriksaan
+# hanya melihat file di disk; nltk tetap baru di-import saat query pertama
+from bsbi import find_punkt
+if find_punkt() is None:
+        raise LookupError("resource nltk 'punkt' tidak ditemukan secara lokal; jalankan "
+                          "'python -m nltk.downloader -d nltk_data punkt' saat build")
+_startup_phase("check_nltk")
 
-WORDS = []
-with open(data_file, "r") as file:
-    for line in file.readlines():
-        WORDS.append(line.rstrip())
+# jika index/ berisi generasi (lihat generations.py), generasi baru di-warm dan
+# di-hot-swap tanpa restart worker; warm-up queries diambil dari file WARM_QUERIES
+# (log JSONL atau file queries, lihat querylog.load_requests)
+SEARCHER = None
+SUGGESTER = None
+if current_generation(BSBI_instance.output_dir) is not None:
+        from generations import GenerationSearcher
+        from querylog import load_requests
+        warm_queries = []
+        if os.environ.get("WARM_QUERIES"):
+                warm_queries = [params["q"] for (path, params) in load_requests(os.environ["WARM_QUERIES"])
+                                if path == "/search" and params.get("q")]
+        SEARCHER = GenerationSearcher(BSBI_instance.output_dir, BSBI_instance.postings_encoding,
+                                      warm_queries = warm_queries).start()
+else:
+        SUGGESTER = TermSuggester(BSBI_instance.output_dir).load()
+_startup_phase("load_suggester")
  
 app = Flask(__name__)
 CORS(app)
+
+# recording mode: jika env QUERY_LOG berisi path file, proporsi QUERY_LOG_SAMPLE
+# (default semua) dari request ke LOGGED_PATHS dicatat ke file JSONL tersebut
+# (lihat querylog.py; bisa di-replay dengan replay.py)
+QUERY_LOG = None
+if os.environ.get("QUERY_LOG"):
+        from querylog import QueryLogRecorder
+        QUERY_LOG = QueryLogRecorder(os.environ["QUERY_LOG"], float(os.environ.get("QUERY_LOG_SAMPLE", "1")))
+LOGGED_PATHS = {"/search", "/suggest", "/similar", "/semantic"}
+QUERY_PLAN_LOG = os.environ.get("QUERY_PLAN_LOG")
+# daftar kandidat per query untuk /search?page=..&size=.. dan search_after
+CANDIDATES = CandidateCache()
+MAX_PAGE_SIZE = 100
+_startup_phase("create_app")
+STARTUP_TIMES["total"] = round(time.perf_counter() - _startup_begin, 4)
+print("startup:", " ".join(f"{name}={seconds:.3f}s" for name, seconds in STARTUP_TIMES.items()), file = sys.stderr)
  
+@app.before_request
+def start_timer():
+        if QUERY_LOG is not None:
+                g.request_start = (time.time(), time.perf_counter())
+
+@app.after_request
+def record_request(response):
+        if QUERY_LOG is not None and request.path in LOGGED_PATHS and QUERY_LOG.sampled():
+                timestamp, start = g.request_start
+                QUERY_LOG.record(request.path, request.args.to_dict(), response.status_code,
+                                 time.perf_counter() - start, timestamp)
+        return response
+
+@contextlib.contextmanager
+def current_index():
+        """(BSBIIndex, TermSuggester) yang dipakai sebuah request; generasi dipegang sampai request selesai"""
+        if SEARCHER is None:
+                yield BSBI_instance, SUGGESTER
+                return
+        with SEARCHER.acquire() as generation:
+                yield generation.bsbi_index, generation.suggester
+
 @app.route("/")
 def home_view():
         return "<h1>Welcome to good med search service</h1>"
 
+@app.route("/status")
+def status():
+        result = {"startup_times": STARTUP_TIMES}
+        if QUERY_LOG is not None:
+                result["query_log"] = {"recorded": QUERY_LOG.recorded, "dropped": QUERY_LOG.dropped}
+        if SEARCHER is not None:
+                result["index"] = SEARCHER.status()
+        result["candidate_cache"] = {"queries": len(CANDIDATES.entries), **CANDIDATES.stats}
+        response = jsonify(result)
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        return response
+
+@app.route("/memory")
+def memory():
+        if not MEMORY_PROFILE:
+                response = jsonify({"error": "memory profiling tidak aktif (MEMORY_PROFILE=1)"})
+                response.status_code = 404
+                return response
+        try:
+                top = int(request.args.get("top", 10))
+                if top < 1:
+                        raise ValueError("top harus >= 1")
+        except ValueError as e:
+                response = jsonify({"error": str(e)})
+                response.status_code = 400
+                response.headers.add('Access-Control-Allow-Origin', '*')
+                return response
+        from memprofile import deep_sizeof, index_components, rss_bytes, top_allocations
+        rss, rss_peak = rss_bytes()
+        python_current, python_peak = tracemalloc.get_traced_memory()
+        with current_index() as (bsbi_index, suggester):
+                components = index_components(bsbi_index)
+                components["suggester"] = deep_sizeof(suggester)
+        components["candidate_cache"] = deep_sizeof(CANDIDATES.entries)
+        components["semantic"] = deep_sizeof(_semantic)
+        components["tiered"] = deep_sizeof(_tiered)
+        result = {"rss": rss, "rss_peak": rss_peak, "python": python_current, "python_peak": python_peak,
+                  "components": components,
+                  "top": top_allocations(tracemalloc.take_snapshot(), top)}
+        response = jsonify(result)
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        return response
+
+# tier 1 (lihat tiering.py) untuk /search?tiered=1, dimuat saat pertama kali
+# dipakai dan dimuat ulang jika generasi index berganti; metadata tier 1 dan
+# tier 2 tetap di memory. BSBIIndex bersama tidak diubah (enable_tiering tidak
+# dipanggil), sehingga retrieve_bm25 di endpoint lain tetap membaca index lengkap
+_tiered = {}
+
+def tiered_index(bsbi_index):
+        if _tiered.get("output_dir") != bsbi_index.output_dir:
+                from tiering import TieredIndex
+                _tiered["index"] = TieredIndex(bsbi_index).load()
+                _tiered["output_dir"] = bsbi_index.output_dir
+        return _tiered["index"]
+
 @app.route("/search")
 def search():
-        args_dict = request.args.to_dict()
+        with current_index() as (bsbi_index, _):
+                return search_response(bsbi_index, request.args.to_dict())
+
+def search_response(bsbi_index, args_dict):
         query = args_dict.get("q")
-        tfidf = BSBI_instance.retrieve_tfidf(query, k = 10)
+        # filter subset dokumen, misal filter=block:1 OR block:2 (lihat filters.py)
+        filters = args_dict.get("filter")
+        try:
+                bsbi_index.get_filter(filters)
+        except ValueError as e:
+                response = jsonify({"error": str(e)})
+                response.status_code = 400
+                response.headers.add('Access-Control-Allow-Origin', '*')
+                return response
+        if args_dict.get("snippets") == "1":
+                # hasil BM25 beserta snippet dengan term query yang di-highlight
+                result = []
+                for (score, doc, snippet) in bsbi_index.retrieve_with_snippets(query, k = 10, filters = filters):
+                        result.append({"doc": doc, "score": score, "snippet": snippet})
+                response = jsonify(result)
+                response.headers.add('Access-Control-Allow-Origin', '*')
+                return response
+        if "budget_ms" in args_dict:
+                # BM25 dengan batas waktu; header X-Result-Exact menandai hasil parsial
+                try:
+                        budget_ms = float(args_dict["budget_ms"])
+                        if not budget_ms > 0 or budget_ms == float("inf"):
+                                raise ValueError("budget_ms harus bilangan positif")
+                except ValueError as e:
+                        response = jsonify({"error": str(e)})
+                        response.status_code = 400
+                        response.headers.add('Access-Control-Allow-Origin', '*')
+                        return response
+                bm25, exact = bsbi_index.retrieve_bm25_anytime(query, k = 10, filters = filters,
+                                                               time_budget = budget_ms / 1000)
+                response = jsonify([doc for (score, doc) in bm25])
+                response.headers.add('X-Result-Exact', 'true' if exact else 'false')
+                response.headers.add('Access-Control-Allow-Origin', '*')
+                return response
+        if args_dict.get("rm3") == "1":
+                # BM25 dengan query expansion RM3 (pseudo-relevance feedback)
+                response = jsonify([doc for (score, doc) in bsbi_index.retrieve_bm25(query, k = 10, rm3 = True,
+                                                                                     filters = filters)])
+                response.headers.add('Access-Control-Allow-Origin', '*')
+                return response
+        if args_dict.get("tiered") == "1":
+                # BM25 yang membaca tier 1 lebih dulu (static pruning, lihat tiering.py);
+                # hasilnya sama dengan BM25 pada index lengkap
+                try:
+                        tiered = tiered_index(bsbi_index)
+                except FileNotFoundError:
+                        response = jsonify({"error": "tier 1 belum dibangun (BSBIIndex(tiered = True))"})
+                        response.status_code = 404
+                        response.headers.add('Access-Control-Allow-Origin', '*')
+                        return response
+                if filters is None:
+                        bm25, _ = tiered.retrieve(query, k = 10)
+                else:
+                        # tier 1 tidak mendukung filter; dijawab dari index lengkap
+                        bm25 = bsbi_index.retrieve_bm25(query, k = 10, filters = filters)
+                response = jsonify([doc for (score, doc) in bm25])
+                response.headers.add('Access-Control-Allow-Origin', '*')
+                return response
+        if args_dict.get("plan") == "1":
+                # BM25 dengan strategi eksekusi dari cost-based planner (lihat planner.py);
+                # plan dicatat ke file JSONL QUERY_PLAN_LOG jika diberikan
+                planner = QueryPlanner(bsbi_index, log_path = QUERY_PLAN_LOG)
+                bm25, plan = planner.retrieve(query, k = 10, filters = filters)
+                response = jsonify([doc for (score, doc) in bm25])
+                response.headers.add('X-Query-Plan', planner.log[-1]["executed"])
+                response.headers.add('Access-Control-Allow-Origin', '*')
+                return response
+        if "page" in args_dict or "size" in args_dict or "search_after" in args_dict:
+                # pagination dari daftar kandidat yang di-cache (lihat pagination.py);
+                # cursor halaman berikutnya dikembalikan di header X-Search-After
+                try:
+                        size = int(args_dict.get("size", 10))
+                        page = int(args_dict.get("page", 1))
+                        if not 1 <= size <= MAX_PAGE_SIZE or page < 1:
+                                raise ValueError("page harus >= 1 dan size di antara 1 dan %d" % MAX_PAGE_SIZE)
+                        items, cursor = CANDIDATES.page((bsbi_index.output_dir, query, filters),
+                                                        lambda k: bsbi_index.retrieve_tfidf(query, k = k, filters = filters),
+                                                        size, offset = (page - 1) * size,
+                                                        search_after = args_dict.get("search_after"))
+                except ValueError as e:
+                        response = jsonify({"error": str(e)})
+                        response.status_code = 400
+                        response.headers.add('Access-Control-Allow-Origin', '*')
+                        return response
+                response = jsonify([doc for (score, doc) in items])
+                if cursor is not None:
+                        response.headers.add('X-Search-After', cursor)
+                response.headers.add('Access-Control-Allow-Origin', '*')
+                return response
+        tfidf = bsbi_index.retrieve_tfidf(query, k = 10, filters = filters)
         result = []
         for (score, doc) in tfidf:
                 result.append(doc)
         response = jsonify(result)
         response.headers.add('Access-Control-Allow-Origin', '*')
-        return response
\ No newline at end of file
+        return response
+
+@app.route("/suggest")
+def suggest():
+        args_dict = request.args.to_dict()
+        prefix = args_dict.get("prefix", "")
+        try:
+                n = int(args_dict.get("n", 10))
+                if n < 1:
+                        raise ValueError("n harus >= 1")
+        except ValueError as e:
+                response = jsonify({"error": str(e)})
+                response.status_code = 400
+                response.headers.add('Access-Control-Allow-Origin', '*')
+                return response
+        with current_index() as (_, suggester):
+                result = [term for (term, df) in suggester.suggest(prefix, n)]
+        response = jsonify(result)
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        return response
+
+@app.route("/similar")
+def similar():
+        args_dict = request.args.to_dict()
+        doc = args_dict.get("doc", "")
+        try:
+                k = int(args_dict.get("k", 10))
+                if k < 1:
+                        raise ValueError("k harus >= 1")
+        except ValueError as e:
+                response = jsonify({"error": str(e)})
+                response.status_code = 400
+                response.headers.add('Access-Control-Allow-Origin', '*')
+                return response
+        with current_index() as (bsbi_index, _):
+                result = [doc for (score, doc) in bsbi_index.similar(doc, k = k)]
+        response = jsonify(result)
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        return response
+
+# komponen semantic search dimuat saat /semantic pertama kali dipanggil, dan
+# dimuat ulang jika generasi index berganti
+_semantic = {}
+
+def semantic_components(bsbi_index):
+        if _semantic.get("output_dir") != bsbi_index.output_dir:
+                from letor import Letor
+                from ann import IVFIndex
+                letor = Letor()
+                letor.load_lsi(bsbi_index.output_dir)
+                _semantic["letor"] = letor
+                _semantic["ivf"] = IVFIndex(bsbi_index.output_dir).load()
+                _semantic["output_dir"] = bsbi_index.output_dir
+                bsbi_index.load()
+        return _semantic["letor"], _semantic["ivf"]
+
+@app.route("/semantic")
+def semantic():
+        args_dict = request.args.to_dict()
+        query = args_dict.get("q", "")
+        try:
+                k = int(args_dict.get("k", 10))
+                nprobe = int(args_dict.get("nprobe", 8))
+                if k < 1 or nprobe < 1:
+                        raise ValueError("k dan nprobe harus >= 1")
+        except ValueError as e:
+                response = jsonify({"error": str(e)})
+                response.status_code = 400
+                response.headers.add('Access-Control-Allow-Origin', '*')
+                return response
+        with current_index() as (bsbi_index, _):
+                try:
+                        letor, ivf = semantic_components(bsbi_index)
+                except (OSError, ImportError) as e:
+                        # model LSI / IVF belum dibangun untuk index ini (embedding.py lalu ann.py)
+                        response = jsonify({"error": "semantic search belum tersedia: " + str(e)})
+                        response.status_code = 503
+                        response.headers.add('Access-Control-Allow-Origin', '*')
+                        return response
+                query_vector = letor.vector_rep(query.lower().split())
+                scores, doc_ids = ivf.search(query_vector, k = k, nprobe = nprobe)
+                result = []
+                for (score, doc_id) in zip(scores[0], doc_ids[0]):
+                        if doc_id >= 0:
+                                result.append(bsbi_index.doc_id_map[int(doc_id)])
+        response = jsonify(result)
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        return response
@@ -0,0 +1,259 @@
+"""
+Entry point serving berbasis asyncio, alternatif dari wsgi.py (Flask +
+gunicorn) untuk trafik yang bursty:
+
+    python async_server.py --port 8000 --workers 4 --max-queue 64
+
+Retrieval (CPU-bound) dijalankan di process pool berukuran tetap, sehingga
+event loop tetap responsif. Request dengan query identik yang datang saat
+query tersebut masih diproses tidak dihitung ulang: semuanya menunggu hasil
+komputasi yang sama (single-flight). Jika jumlah komputasi yang sedang
+berjalan + mengantri mencapai max_queue, request baru langsung dijawab 503
+(backpressure), alih-alih menumpuk sampai server kolaps.
+
+Hanya memakai standard library (HTTP/1.1 GET sederhana dengan keep-alive).
+Body request (Content-Length) dibaca dan dibuang agar tidak terbaca sebagai
+request berikutnya di koneksi yang sama; Transfer-Encoding (chunked) tidak
+didukung dan dijawab 501 lalu koneksi ditutup.
+
+Self-test (SingleFlight, 503, body request):
+
+    python async_server.py test
+"""
+import sys
+import json
+import asyncio
+import argparse
+import multiprocessing
+import concurrent.futures
+from urllib.parse import urlsplit, parse_qs
+
+from search import BSBI_instance
+from suggest import TermSuggester
+
+def search_worker(query, snippets):
+    """Dijalankan di process pool; hasil sama seperti /search di app/main.py"""
+    if snippets:
+        return [{"doc": doc, "score": score, "snippet": snippet}
+                for (score, doc, snippet) in BSBI_instance.retrieve_with_snippets(query, k = 10)]
+    return [doc for (score, doc) in BSBI_instance.retrieve_tfidf(query, k = 10)]
+
+
+class Overloaded(Exception):
+    """Antrian komputasi penuh; request dijawab 503"""
+
+
+class SingleFlight:
+    """
+    Menggabungkan komputasi identik yang sedang berjalan: pemanggil pertama
+    untuk sebuah key menjalankan komputasi, pemanggil berikutnya (selama
+    komputasi belum selesai) hanya menunggu future yang sama.
+
+    Hanya pemanggil pertama yang dihitung terhadap max_pending, karena hanya
+    dia yang menambah pekerjaan di executor.
+    """
+    def __init__(self, max_pending):
+        self.max_pending = max_pending
+        self.in_flight = {}
+        self.stats = {"computed": 0, "coalesced": 0, "rejected": 0}
+
+    async def run(self, key, compute):
+        if key in self.in_flight:
+            self.stats["coalesced"] += 1
+            # shield: pemanggil yang dibatalkan tidak ikut membatalkan komputasi bersama
+            return await asyncio.shield(self.in_flight[key])
+        if len(self.in_flight) >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise Overloaded()
+        future = asyncio.ensure_future(compute())
+        self.in_flight[key] = future
+        self.stats["computed"] += 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                self.in_flight.pop(key, None)
+            else:
+                future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+
+
+class SearchServer:
+    def __init__(self, workers = None, max_queue = 64):
+        # spawn (bukan fork): worker tidak mewarisi state event loop yang sedang
+        # berjalan; import search di worker tetap murah karena import bsbi ringan
+        self.executor = concurrent.futures.ProcessPoolExecutor(max_workers = workers,
+                                                               mp_context = multiprocessing.get_context("spawn"))
+        self.single_flight = SingleFlight(max_queue)
+        self.suggester = TermSuggester(BSBI_instance.output_dir).load()
+
+    async def search(self, params):
+        query = params.get("q", "")
+        snippets = params.get("snippets") == "1"
+        loop = asyncio.get_running_loop()
+        return await self.single_flight.run(("search", query, snippets),
+                                            lambda: loop.run_in_executor(self.executor, search_worker, query, snippets))
+
+    async def route(self, path, params):
+        """Mengembalikan (status, body)"""
+        if path == "/":
+            return 200, "<h1>Welcome to good med search service</h1>"
+        if path == "/search":
+            return 200, await self.search(params)
+        if path == "/suggest":
+            try:
+                n = int(params.get("n", 10))
+                if n < 1:
+                    raise ValueError("n harus >= 1")
+            except ValueError as e:
+                return 400, {"error": str(e)}
+            return 200, [term for (term, df) in self.suggester.suggest(params.get("prefix", ""), n)]
+        if path == "/status":
+            return 200, {"in_flight": len(self.single_flight.in_flight), **self.single_flight.stats}
+        return 404, {"error": "not found"}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                method, target, version = (lines[0].split(" ") + ["", ""])[:3]
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                # batas request harus jelas sebelum request berikutnya dibaca dari koneksi yang sama
+                if "transfer-encoding" in headers:
+                    await self.respond(writer, 501, {"error": "transfer-encoding not supported"}, False)
+                    break
+                try:
+                    content_length = int(headers.get("content-length", "0"))
+                    if content_length < 0:
+                        raise ValueError()
+                except ValueError:
+                    await self.respond(writer, 400, {"error": "invalid content-length"}, False)
+                    break
+                if content_length > 0:
+                    try:
+                        await reader.readexactly(content_length)
+                    except (asyncio.IncompleteReadError, ConnectionError):
+                        break
+
+                url = urlsplit(target)
+                params = {name: values[0] for name, values in parse_qs(url.query).items()}
+                if method != "GET":
+                    status, body = 405, {"error": "method not allowed"}
+                else:
+                    try:
+                        status, body = await self.route(url.path, params)
+                    except Overloaded:
+                        status, body = 503, {"error": "server overloaded, retry later"}
+                    except Exception as e:
+                        status, body = 500, {"error": str(e)}
+                await self.respond(writer, status, body, keep_alive)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def respond(self, writer, status, body, keep_alive):
+        if isinstance(body, str):
+            payload, content_type = body.encode("utf-8"), "text/html; charset=utf-8"
+        else:
+            payload, content_type = json.dumps(body).encode("utf-8"), "application/json"
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                  500: "Internal Server Error", 501: "Not Implemented", 503: "Service Unavailable"}[status]
+        headers = [f"HTTP/1.1 {status} {reason}",
+                   f"Content-Type: {content_type}",
+                   f"Content-Length: {len(payload)}",
+                   "Access-Control-Allow-Origin: *",
+                   "Connection: " + ("keep-alive" if keep_alive else "close")]
+        if status == 503:
+            headers.append("Retry-After: 1")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + payload)
+        await writer.drain()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"serving on {host}:{port}", file = sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+
+async def self_test():
+    # single-flight: tiga request identik hanya dihitung sekali
+    single_flight = SingleFlight(max_pending = 1)
+    computed = []
+    async def compute():
+        computed.append(1)
+        await asyncio.sleep(0.05)
+        return "hasil"
+    results = await asyncio.gather(*[single_flight.run("q", compute) for _ in range(3)])
+    assert results == ["hasil"] * 3 and len(computed) == 1, "single-flight salah"
+    assert single_flight.stats == {"computed": 1, "coalesced": 2, "rejected": 0}, "stats single-flight salah"
+    assert not single_flight.in_flight, "in_flight seharusnya kosong"
+
+    # key lain saat antrian penuh ditolak
+    first = asyncio.ensure_future(single_flight.run("a", compute))
+    await asyncio.sleep(0)
+    try:
+        await single_flight.run("b", compute)
+        assert False, "seharusnya Overloaded"
+    except Overloaded:
+        pass
+    assert await first == "hasil" and single_flight.stats["rejected"] == 1, "backpressure salah"
+
+    # lewat HTTP: max_queue 0 sehingga /search selalu 503; body request dibuang,
+    # bukan dibaca sebagai request berikutnya
+    search_server = SearchServer(workers = 1, max_queue = 0)
+    server = await asyncio.start_server(search_server.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        smuggled = b"GET /status HTTP/1.1\r\n\r\n"
+        writer.write(b"GET /search?q=a HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(smuggled) + smuggled +
+                     b"GET / HTTP/1.1\r\nConnection: close\r\n\r\n")
+        await writer.drain()
+        responses = (await reader.read()).split(b"HTTP/1.1 ")[1:]
+        assert [response[:3] for response in responses] == [b"503", b"200"], "respons salah: " + str(responses)
+        assert b"Retry-After: 1" in responses[0] and b"Welcome" in responses[1], "respons salah"
+        writer.close()
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+                     b"1e\r\nGET /status HTTP/1.1\r\n\r\n\r\n0\r\n\r\n")
+        await writer.drain()
+        response = await reader.read()
+        assert response.startswith(b"HTTP/1.1 501") and response.count(b"HTTP/1.1 ") == 1 and \
+               b"Connection: close" in response, "chunked seharusnya ditolak"
+        writer.close()
+
+        for n in ["0", "abc"]:
+            status, body = await search_server.route("/suggest", {"prefix": "a", "n": n})
+            assert status == 400 and "error" in body, "n tidak valid seharusnya 400"
+    search_server.executor.shutdown()
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) > 1 and sys.argv[1] == "test":
+        asyncio.run(self_test())
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default = "127.0.0.1")
+    parser.add_argument("--port", type = int, default = 8000)
+    parser.add_argument("--workers", type = int, default = None, help = "ukuran process pool (default: jumlah CPU)")
+    parser.add_argument("--max-queue", type = int, default = 64, help = "batas komputasi berjalan + mengantri sebelum 503")
+    args = parser.parse_args()
+
+    asyncio.run(SearchServer(args.workers, args.max_queue).serve(args.host, args.port))
@@ -0,0 +1,203 @@
+import re
+
+from util import galloping_intersect, galloping_difference, sorted_union
+
+class BooleanQuery:
+    """
+    Parser dan executor untuk boolean query dengan operator AND, OR, NOT dan
+    tanda kurung, misal:
+
+        (cerebrospinal OR spinal) AND fluid AND NOT rat
+
+    Dua operand yang bersebelahan tanpa operator dianggap AND. Prioritas
+    operator: NOT > AND > OR.
+
+    Hasil parsing adalah tree berupa nested tuples:
+        ('TERM', word)
+        ('AND', [child, ...])
+        ('OR', [child, ...])
+        ('NOT', child)
+
+    Saat dieksekusi, setiap konjungsi (AND) diproses dari operand dengan
+    estimasi df terkecil, intersection dilakukan dengan galloping search, dan
+    evaluasi langsung berhenti (operand sisanya tidak dibaca dari index) begitu
+    hasil sementara kosong. Dengan begitu biaya filter yang presisi sebanding
+    dengan term yang paling jarang.
+    """
+
+    TOKEN_PATTERN = re.compile(r'\(|\)|[^\s()]+')
+
+    def __init__(self, query):
+        self.query = query
+        self.tokens = self.TOKEN_PATTERN.findall(query)
+        self.pos = 0
+        self.tree = self.parse_or() if self.tokens else ('OR', [])
+        if self.pos < len(self.tokens):
+            raise ValueError("boolean query tidak valid: " + query)
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == 'OR':
+            self.pos += 1
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else ('OR', children)
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while self.peek() is not None and self.peek() not in ('OR', ')'):
+            if self.peek() == 'AND':
+                self.pos += 1
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else ('AND', children)
+
+    def parse_not(self):
+        token = self.peek()
+        if token is None or token in ('AND', 'OR', ')'):
+            raise ValueError("boolean query tidak valid: " + self.query)
+        self.pos += 1
+        if token == 'NOT':
+            return ('NOT', self.parse_not())
+        if token == '(':
+            node = self.parse_or()
+            if self.peek() != ')':
+                raise ValueError("kurung tidak seimbang: " + self.query)
+            self.pos += 1
+            return node
+        return ('TERM', token)
+
+    def execute(self, index, term_id_map, preprocess):
+        """
+        Mengevaluasi query terhadap sebuah InvertedIndexReader yang sedang
+        terbuka.
+
+        Parameters
+        ----------
+        index: InvertedIndexReader
+        term_id_map: IdMap
+        preprocess: Callable[[str], List[str]]
+            Pipeline analisis yang sama dengan indexing (BSBIIndex.preprocess);
+            sebuah kata bisa menjadi nol token (stopword) atau beberapa token.
+
+        Returns
+        -------
+        List[int]
+            Sorted list doc IDs yang memenuhi query
+        """
+        return BooleanExecutor(index, term_id_map, preprocess).evaluate(self.tree)
+
+
+class BooleanExecutor:
+    """
+    Mengeksekusi tree hasil BooleanQuery terhadap sebuah InvertedIndexReader.
+    Postings list setiap term dibaca paling banyak sekali per query.
+    """
+    def __init__(self, index, term_id_map, preprocess):
+        self.index = index
+        self.term_id_map = term_id_map
+        self.preprocess = preprocess
+        self.postings_cache = {}
+        self.all_doc_ids = None
+
+    def analyze(self, word):
+        """Token hasil analisis sebuah kata; None jika kata hanya berisi stopwords"""
+        tokens = self.preprocess(word)
+        return tokens if tokens else None
+
+    def universe(self):
+        """Semua doc ID di index, dipakai untuk NOT yang tidak punya pasangan AND"""
+        if self.all_doc_ids is None:
+            self.all_doc_ids = sorted(self.index.doc_length.keys())
+        return self.all_doc_ids
+
+    def postings(self, token):
+        if token not in self.term_id_map:
+            return []
+        if token not in self.postings_cache:
+            postings_list, _ = self.index.get_postings_list(self.term_id_map[token])
+            self.postings_cache[token] = postings_list
+        return self.postings_cache[token]
+
+    def df(self, token):
+        if token not in self.term_id_map:
+            return 0
+        return self.index.postings_dict[self.term_id_map[token]][1]
+
+    def estimate(self, node):
+        """
+        Estimasi banyaknya dokumen hasil sebuah node, hanya dari df di
+        postings_dict (tanpa membaca postings list).
+        """
+        kind = node[0]
+        if kind == 'TOKEN':
+            return self.df(node[1])
+        if kind == 'TERM':
+            tokens = self.analyze(node[1])
+            if tokens is None:
+                return len(self.index.doc_length)
+            return min(self.df(token) for token in tokens)
+        if kind == 'AND':
+            return min(self.estimate(child) for child in node[1])
+        if kind == 'OR':
+            return sum(self.estimate(child) for child in node[1])
+        return len(self.index.doc_length) - self.estimate(node[1])
+
+    def evaluate(self, node):
+        kind = node[0]
+        if kind == 'TERM':
+            tokens = self.analyze(node[1])
+            if tokens is None:
+                # kata yang seluruhnya stopword tidak membatasi hasil
+                return self.universe()
+            return self.conjunction([('TOKEN', token) for token in tokens])
+        if kind == 'AND':
+            return self.conjunction(node[1])
+        if kind == 'OR':
+            result = []
+            for child in node[1]:
+                result = sorted_union(result, self.evaluate(child))
+            return result
+        if kind == 'NOT':
+            return galloping_difference(self.universe(), self.evaluate(node[1]))
+        # ('TOKEN', token): token yang sudah dianalisis
+        return self.postings(node[1])
+
+    def conjunction(self, children):
+        """
+        AND dari beberapa node. Operand positif diproses terurut dari estimasi
+        df terkecil; operand NOT diproses terakhir sebagai difference. Berhenti
+        lebih awal jika hasil sementara kosong.
+        """
+        positives = [child for child in children if child[0] != 'NOT']
+        negatives = [child[1] for child in children if child[0] == 'NOT']
+        positives.sort(key = self.estimate)
+
+        result = None
+        for child in positives:
+            postings = self.evaluate(child)
+            result = postings if result is None else galloping_intersect(result, postings)
+            if not result:
+                return []
+        if result is None:
+            result = self.universe()
+        for child in sorted(negatives, key = self.estimate):
+            result = galloping_difference(result, self.evaluate(child))
+            if not result:
+                return []
+        return result
+
+
+if __name__ == "__main__":
+
+    assert BooleanQuery("a AND b").tree == ('AND', [('TERM', 'a'), ('TERM', 'b')]), "parser salah"
+    assert BooleanQuery("a b OR c").tree == ('OR', [('AND', [('TERM', 'a'), ('TERM', 'b')]), ('TERM', 'c')]), "parser salah"
+    assert BooleanQuery("(a OR b) AND NOT c").tree == ('AND', [('OR', [('TERM', 'a'), ('TERM', 'b')]), ('NOT', ('TERM', 'c'))]), "parser salah"
+    assert BooleanQuery("NOT NOT a").tree == ('NOT', ('NOT', ('TERM', 'a'))), "parser salah"
+    for invalid in ["a AND", "(a OR b", "a )", "OR a"]:
+        try:
+            BooleanQuery(invalid)
+            assert False, "query tidak valid seharusnya ditolak: " + invalid
+        except ValueError:
+            pass
@@ -1,62 +1,298 @@
 import os
+import json
 import pickle
 import contextlib
 import heapq
 import time
 import math
 
-import nltk
-nltk.download('punkt')
-from nltk import word_tokenize
-
-from index import InvertedIndexReader, InvertedIndexWriter
-from util import IdMap, sorted_merge_posts_and_tfs
+from index import InvertedIndexReader, InvertedIndexWriter, ForwardIndexReader, ForwardIndexWriter
+from util import IdMap, DocTable, external_doc_id, sorted_merge_posts_and_tfs, sorted_merge_postings_positions, \
+                 sorted_intersect, phrase_positions, min_window_span, galloping_search
+from boolean_query import BooleanQuery
+from suggest import TermSuggester
+from spelling import SpellingCorrector
+from docstore import DocumentStoreReader, DocumentStoreWriter, make_snippet
+from corpus import DirectoryCorpus, open_corpus, read_ahead, content_defined_blocks
+from buildcache import BuildManifest, block_hash
+from filters import FilterIndex
 from compression import StandardPostings, VBEPostings
-from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
-from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
-from tqdm import tqdm
+
+# resource nltk yang dibundel bersama repo (jika ada) dicari lebih dulu
+NLTK_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_data')
+
+def nltk_data_dirs():
+    """
+    Directory yang dicari nltk.data.find, dengan urutan yang sama (NLTK_DATA_DIR
+    lebih dulu, lalu env NLTK_DATA, lalu lokasi default nltk), tanpa import nltk.
+    """
+    import sys
+    dirs = [NLTK_DATA_DIR]
+    dirs += [path for path in os.environ.get('NLTK_DATA', '').split(os.pathsep) if path]
+    dirs.append(os.path.expanduser('~/nltk_data'))
+    dirs += [os.path.join(sys.prefix, name) for name in ('nltk_data', 'share/nltk_data', 'lib/nltk_data')]
+    dirs += ['/usr/share/nltk_data', '/usr/local/share/nltk_data', '/usr/lib/nltk_data', '/usr/local/lib/nltk_data']
+    return dirs
+
+def find_punkt():
+    """
+    Path resource punkt pertama yang ada di disk (directory atau .zip), atau
+    None. Cukup os.path.exists, jadi bisa dipanggil saat startup service tanpa
+    biaya import nltk; nltk sendiri baru di-import oleh load_word_tokenize.
+    """
+    for directory in nltk_data_dirs():
+        for name in ('punkt', 'punkt.zip'):
+            path = os.path.join(directory, 'tokenizers', name)
+            if os.path.exists(path):
+                return path
+    return None
+
+def load_word_tokenize():
+    """
+    Import nltk dan memastikan resource tokenizer (punkt) tersedia secara lokal.
+    Tidak pernah melakukan download: resource di-install saat build (nltk.txt)
+    atau dibundel di NLTK_DATA_DIR. Dipanggil saat preprocess pertama kali,
+    bukan saat modul ini di-import (startup service hanya memanggil find_punkt).
+    """
+    import nltk
+    if os.path.isdir(NLTK_DATA_DIR) and NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+    try:
+        nltk.data.find('tokenizers/punkt')
+    except LookupError:
+        raise LookupError("resource nltk 'punkt' tidak ditemukan secara lokal; jalankan "
+                          "'python -m nltk.downloader -d nltk_data punkt' saat build") from None
+    return nltk.word_tokenize
+
+def bm25_score(tf, doc_length, avg_doc_length, idf, k1, b):
+    """Kontribusi score BM25 sebuah term untuk sebuah dokumen"""
+    return (((k1 + 1) * tf) / (k1 * (1 - b) + b * doc_length / avg_doc_length + tf)) * idf
+
+def restrict_postings(postings, allowed_doc_ids):
+    """
+    Membatasi (postings_list, tf_list) hanya ke doc IDs di allowed_doc_ids
+    (sorted). Mengembalikan 3-tuple (postings_list, tf_list, df asli).
+    Setiap doc yang diizinkan dicari di postings dengan galloping search,
+    sehingga filter yang kecil tidak perlu menyapu seluruh postings.
+    """
+    postings_list, tf_list = postings
+    restricted_postings, restricted_tfs = [], []
+    j = 0
+    for doc_id in allowed_doc_ids:
+        j = galloping_search(postings_list, doc_id, j)
+        if j == len(postings_list):
+            break
+        if postings_list[j] == doc_id:
+            restricted_postings.append(doc_id)
+            restricted_tfs.append(tf_list[j])
+    return restricted_postings, restricted_tfs, len(postings_list)
+
+def doc_positions(index, term_id, postings, doc_ids = None):
+    """
+    {doc ID -> positions} untuk sebuah term. postings harus (postings_list,
+    tf_list) lengkap hasil get_postings_list: positions di file .pos dipecah per
+    posting berdasarkan tf_list, jadi tf_list yang sudah dibatasi filter akan
+    memecah di offset yang salah. Pembatasan ke doc_ids dilakukan setelahnya.
+    """
+    positions = dict(zip(postings[0], index.get_positions_list(term_id, postings[1])))
+    if doc_ids is not None:
+        positions = {doc_id: positions[doc_id] for doc_id in doc_ids}
+    return positions
+
+def shift_doc_ids(index, doc_id_base):
+    """
+    Iterasi sebuah intermediate index (docIDs lokal block) dengan docIDs
+    digeser menjadi docIDs global (ditambah doc_id_base)
+    """
+    for item in index:
+        yield (item[0], [doc_id + doc_id_base for doc_id in item[1]]) + tuple(item[2:])
 
 class BSBIIndex:
     """
     Attributes
     ----------
     term_id_map(IdMap): Untuk mapping terms ke termIDs
-    doc_id_map(IdMap): Untuk mapping relative paths dari dokumen (misal,
-                    /collection/0/gamma.txt) to docIDs
-    data_dir(str): Path ke data
+    doc_id_map(DocTable): Untuk mapping relative paths dari dokumen (relatif
+                    terhadap data_dir, misal 0/gamma.txt) to docIDs, beserta
+                    external ID dokumen (lihat util.DocTable)
+    data_dir(str): Path ke data: directory collection, atau file dump (TSV,
+                    JSONL, boleh .gz); lihat corpus.py
     output_dir(str): Path ke output index files
     postings_encoding: Lihat di compression.py, kandidatnya adalah StandardPostings,
                     VBEPostings, dsb.
     index_name(str): Nama dari file yang berisi inverted index
+    positional(bool): Jika True, index juga menyimpan posisi setiap token
+                    (dibutuhkan untuk phrase/proximity query)
+    spelling_correction(bool): Jika True, token query yang tidak ada di
+                    vocabulary dikoreksi dengan SpellingCorrector (spelling.py)
+    block_size(int): Ukuran sebuah block saat indexing, dalam jumlah karakter
+                    teks dokumen (lihat corpus.content_defined_blocks)
+    immutable(bool): Jika True, isi output_dir dianggap tidak pernah berubah
+                    (misal sebuah generasi index, lihat generations.py), sehingga
+                    load() cukup membaca terms.dict dan docs.table sekali
+    doc_tags(str): Path file JSON {nama tag: [doc_key, ...]} yang di-compile
+                    menjadi filter "tag:<nama>" saat indexing (lihat filters.py)
+    tiered(bool): Jika True, index() juga membangun tier 1 (postings dengan
+                    score BM25 terbesar setiap term) untuk tiering.TieredIndex
     """
-    def __init__(self, data_dir, output_dir, postings_encoding, index_name = "main_index"):
+    # dinaikkan setiap kali preprocess(..) berubah, supaya intermediate index
+    # di build cache (buildcache.py) yang dibuat dengan analyzer lama tidak dipakai
+    ANALYZER_VERSION = 1
+
+    def __init__(self, data_dir, output_dir, postings_encoding, index_name = "main_index", positional = False,
+                 spelling_correction = True, block_size = 1 << 20, immutable = False, doc_tags = None, tiered = False):
         self.term_id_map = IdMap()
-        self.doc_id_map = IdMap()
+        self.doc_id_map = DocTable()
         self.data_dir = data_dir
         self.output_dir = output_dir
         self.index_name = index_name
         self.postings_encoding = postings_encoding
+        self.positional = positional
+        self.stemmer = None
+        self.stop_word_remover = None
+        self.word_tokenize = None
+        self.spelling_correction = spelling_correction
+        self.spelling_corrector = None
+        self.block_size = block_size
+        self.immutable = immutable
+        self.loaded = False
+        self.doc_tags = doc_tags
+        self.filter_index = None
+        self.parallel_scorer = None
+        self.tiered = tiered
+        # tiering.TieredIndex; jika diisi (enable_tiering), retrieve_bm25 membaca tier 1 lebih dulu
+        self.tiered_index = None
+        # memprofile.MemoryProfiler; jika diisi, index() mencatat memory setiap tahap
+        self.memory_profiler = None
 
         # Untuk menyimpan nama-nama file dari semua intermediate inverted index
         self.intermediate_indices = []
 
     def save(self):
-        """Menyimpan doc_id_map and term_id_map ke output directory via pickle"""
+        """
+        Menyimpan term_id_map ke output directory via pickle, dan doc_id_map
+        sebagai DocTable (docs.table)
+        """
 
         with open(os.path.join(self.output_dir, 'terms.dict'), 'wb') as f:
             pickle.dump(self.term_id_map, f)
-        with open(os.path.join(self.output_dir, 'docs.dict'), 'wb') as f:
-            pickle.dump(self.doc_id_map, f)
+        self.doc_id_map.save(os.path.join(self.output_dir, 'docs.table'))
 
     def load(self):
-        """Memuat doc_id_map and term_id_map dari output directory"""
+        """
+        Memuat doc_id_map and term_id_map dari output directory. Index lama yang
+        belum punya docs.table masih bisa dimuat dari docs.dict (IdMap).
+        """
+        if self.immutable and self.loaded:
+            return
 
         with open(os.path.join(self.output_dir, 'terms.dict'), 'rb') as f:
             self.term_id_map = pickle.load(f)
-        with open(os.path.join(self.output_dir, 'docs.dict'), 'rb') as f:
-            self.doc_id_map = pickle.load(f)
+        doc_table_path = os.path.join(self.output_dir, 'docs.table')
+        if os.path.exists(doc_table_path):
+            self.doc_id_map = DocTable.load(doc_table_path)
+        else:
+            with open(os.path.join(self.output_dir, 'docs.dict'), 'rb') as f:
+                self.doc_id_map = pickle.load(f)
+        self.loaded = True
+
+    def preprocess(self, text):
+        """
+        Stemming, buang stopwords, lalu tokenisasi sebuah teks. Dipakai baik
+        saat indexing (parse_block) maupun saat memproses query, sehingga
+        term di query dan di index selalu melalui pipeline yang sama.
+
+        Sastrawi dan nltk baru di-import saat method ini pertama kali dipanggil.
+        """
+        if self.stemmer is None:
+            from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+            from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
+            self.word_tokenize = load_word_tokenize()
+            self.stemmer = StemmerFactory().create_stemmer()
+            self.stop_word_remover = StopWordRemoverFactory().create_stop_word_remover()
+        stemmed = self.stemmer.stem(text)
+        cleaned = self.stop_word_remover.remove(stemmed)
+        return self.word_tokenize(cleaned)
+
+    def analyze_query(self, query):
+        """
+        preprocess(..) untuk query, ditambah koreksi ejaan: token yang tidak ada
+        di term_id_map diganti dengan term terdekat di vocabulary (jika ada),
+        alih-alih diabaikan begitu saja.
+        """
+        tokenized = self.preprocess(query)
+        if not self.spelling_correction:
+            return tokenized
+        if self.spelling_corrector is None:
+            corrector = SpellingCorrector(self.output_dir)
+            self.spelling_corrector = corrector.load() if os.path.exists(corrector.file_path) else False
+        if not self.spelling_corrector:
+            return tokenized
+        for i, token in enumerate(tokenized):
+            if token not in self.term_id_map:
+                corrected = self.spelling_corrector.correct(token)
+                if corrected is not None:
+                    tokenized[i] = corrected
+        return tokenized
+
+    def get_filter(self, filters):
+        """
+        RoaringBitmap doc IDs untuk expression filter, misal "block:1 OR tag:review"
+        (lihat filters.FilterIndex); None jika filters None.
+        """
+        if filters is None:
+            return None
+        if self.filter_index is None:
+            self.filter_index = FilterIndex(self.output_dir).load()
+        return self.filter_index.get(filters)
 
-    def parse_block(self, block_dir_relative):
+    def enable_parallel(self, workers = None, partitions = None, min_cost = None):
+        """
+        Mengaktifkan intra-query parallelism (lihat parallel.py) untuk
+        retrieve_bm25 dan retrieve_tfidf: query dengan jumlah df paling tidak
+        min_cost di-score per range doc ID di process pool berisi `workers` proses.
+        """
+        from parallel import ParallelScorer
+        if self.parallel_scorer is not None:
+            self.parallel_scorer.close()
+        self.parallel_scorer = ParallelScorer(self.index_name, self.postings_encoding, self.output_dir,
+                                              workers = workers, partitions = partitions,
+                                              min_cost = ParallelScorer.MIN_COST if min_cost is None else min_cost)
+        return self
+
+    def enable_tiering(self):
+        """
+        Mengaktifkan tier 1 (lihat tiering.py) untuk retrieve_bm25: query tanpa
+        filter dan proximity, dengan k1 dan b yang sama seperti saat tier 1
+        dibangun, dijawab TieredIndex.retrieve (hasilnya identik). Raise
+        FileNotFoundError jika tier 1 belum dibangun (BSBIIndex(tiered = True)).
+        """
+        if self.tiered_index is None:
+            from tiering import TieredIndex
+            self.tiered_index = TieredIndex(self).load()
+        return self.tiered_index
+
+    def close(self):
+        """
+        Melepas resource index yang sudah dimuat: mmap docs.table, filter
+        index, dan process pool intra-query parallelism (jika aktif).
+        """
+        if isinstance(self.doc_id_map, DocTable):
+            self.doc_id_map.close()
+        self.filter_index = None
+        self.tiered_index = None
+        if self.parallel_scorer is not None:
+            self.parallel_scorer.close()
+            self.parallel_scorer = None
+        self.loaded = False
+
+    def profile_stage(self, name):
+        """Context manager stage memprofile.MemoryProfiler, atau no-op jika profiling tidak aktif"""
+        if self.memory_profiler is None:
+            return contextlib.nullcontext()
+        return self.memory_profiler.stage(name)
+
+    def parse_block(self, block_dir_relative, doc_store = None):
         """
         Lakukan parsing terhadap text file sehingga menjadi sequence of
         <termID, docID> pairs.
@@ -77,6 +313,9 @@ class BSBIIndex:
             CATAT bahwa satu folder di collection dianggap merepresentasikan satu block.
             Konsep block di soal tugas ini berbeda dengan konsep block yang terkait
             dengan operating systems.
+        doc_store : DocumentStoreWriter
+            Jika diberikan, teks asli setiap dokumen juga ditulis ke doc_store
+            (untuk snippet di hasil pencarian).
 
         Returns
         -------
@@ -85,30 +324,43 @@ class BSBIIndex:
             Mengembalikan semua pasangan <termID, docID> dari sebuah block (dalam hal
             ini sebuah sub-direktori di dalam folder collection)
 
+            Untuk positional index, setiap elemen berupa <termID, docID, position>,
+            dengan position adalah urutan token (mulai dari 0) di dokumen.
+
         Harus menggunakan self.term_id_map dan self.doc_id_map untuk mendapatkan
         termIDs dan docIDs. Dua variable ini harus 'persist' untuk semua pemanggilan
         parse_block(...).
         """
-        block_full_path = os.path.join(self.data_dir, block_dir_relative)
-        stemmer = StemmerFactory().create_stemmer()
-        stop_word_remover = StopWordRemoverFactory().create_stop_word_remover()
+        return self.parse_documents(DirectoryCorpus(self.data_dir).block_documents(block_dir_relative), doc_store)
+
+    def parse_documents(self, documents, doc_store = None, doc_id_base = 0):
+        """
+        Sama seperti parse_block(..), namun untuk sembarang iterable pasangan
+        (doc_key, text) dari sebuah corpus adapter (corpus.py). doc_key dipakai
+        sebagai key di doc_id_map; untuk DirectoryCorpus berupa path relatif
+        terhadap data_dir (bukan hanya nama file), supaya file bernama sama di
+        sub-directory berbeda tidak bertabrakan.
 
+        docID di td_pairs dikurangi doc_id_base (docID lokal block, lihat
+        index()); doc_store tetap memakai docID global.
+        """
         td_pairs = []
-        for doc_file_name in next(os.walk(block_full_path))[2]:
-            doc_id = self.doc_id_map[doc_file_name]
-            doc_path = os.path.join(block_full_path, doc_file_name)
-            with open(doc_path, "r") as file:
-                sentence = file.read()
-                stemmed = stemmer.stem(sentence)
-                cleaned = stop_word_remover.remove(stemmed)
-                tokenized = word_tokenize(cleaned)
-                for token in tokenized:
-                    term_id = self.term_id_map[token]
+        for doc_key, text in documents:
+            doc_id = self.doc_id_map.add(doc_key, external_doc_id(doc_key))
+            if doc_store is not None:
+                doc_store.add(doc_id, text)
+            doc_id -= doc_id_base
+            tokenized = self.preprocess(text)
+            for position, token in enumerate(tokenized):
+                term_id = self.term_id_map[token]
+                if self.positional:
+                    td_pairs.append((term_id, doc_id, position))
+                else:
                     td_pairs.append((term_id, doc_id))
 
         return td_pairs
 
-    def invert_write(self, td_pairs, index):
+    def invert_write(self, td_pairs, index, forward_index = None):
         """
         Melakukan inversion td_pairs (list of <termID, docID> pairs) dan
         menyimpan mereka ke index. Disini diterapkan konsep BSBI dimana 
@@ -126,27 +378,53 @@ class BSBIIndex:
         Parameters
         ----------
         td_pairs: List[Tuple[Int, Int]]
-            List of termID-docID pairs
+            List of termID-docID pairs (atau termID-docID-position untuk
+            positional index)
         index: InvertedIndexWriter
             Inverted index pada disk (file) yang terkait dengan suatu "block"
+        forward_index: ForwardIndexWriter
+            Jika diberikan, term vector setiap dokumen di block juga ditulis ke
+            forward index (dipakai RM3 dan similar)
         """
         # inisialisasi term dictionary (di-maintain satu dictionary besar untuk keseluruhan block)
         term_dict = {}
-        for term_id, doc_id in td_pairs:
+        # positions per term per dokumen, hanya diisi untuk positional index
+        positions_dict = {}
+        for td_pair in td_pairs:
+            term_id, doc_id = td_pair[0], td_pair[1]
             if term_id not in term_dict:
                 # inisialisasi dictionary dengan key term id
                 term_dict[term_id] = {}
+                positions_dict[term_id] = {}
             if doc_id not in term_dict[term_id]:
                 # menambahkan term frequency dalam dictionary dengan key nya adalah doc_id
                 term_dict[term_id][doc_id] = 0
+                positions_dict[term_id][doc_id] = []
             # lakukan incrementasi term frequency
             term_dict[term_id][doc_id] += 1
+            if index.positional:
+                positions_dict[term_id][doc_id].append(td_pair[2])
         for term_id in sorted(term_dict.keys()):
-            # disimpan juga list of tf
-            term_dict[term_id].keys()
-            index.append(term_id, list(term_dict[term_id].keys()), list(term_dict[term_id].values()))
+            # disimpan juga list of tf; postings harus terurut berdasarkan doc id
+            postings_list = sorted(term_dict[term_id].keys())
+            tf_list = [term_dict[term_id][doc_id] for doc_id in postings_list]
+            if index.positional:
+                positions_lists = [positions_dict[term_id][doc_id] for doc_id in postings_list]
+                index.append(term_id, postings_list, tf_list, positions_lists)
+            else:
+                index.append(term_id, postings_list, tf_list)
+
+        if forward_index is not None:
+            # term_dict dibalik menjadi docID -> {termID -> tf}
+            doc_dict = {}
+            for term_id, postings in term_dict.items():
+                for doc_id, tf in postings.items():
+                    doc_dict.setdefault(doc_id, {})[term_id] = tf
+            for doc_id in sorted(doc_dict.keys()):
+                term_list = sorted(doc_dict[doc_id].keys())
+                forward_index.append(doc_id, term_list, [doc_dict[doc_id][term_id] for term_id in term_list])
 
-    def merge(self, indices, merged_index):
+    def merge(self, indices, merged_index, renumber_term = None):
         """
         Lakukan merging ke semua intermediate inverted indices menjadi
         sebuah single index.
@@ -165,7 +443,17 @@ class BSBIIndex:
         merged_index: InvertedIndexWriter
             Instance InvertedIndexWriter object yang merupakan hasil merging dari
             semua intermediate InvertedIndexWriter objects.
+
+        renumber_term: Callable[[int], int]
+            Jika diberikan, termID di merged index adalah renumber_term(termID);
+            dipanggil sekali per term dengan termID yang terurut naik.
         """
+        if renumber_term is None:
+            renumber_term = lambda term_id: term_id
+        if merged_index.positional:
+            self.merge_positional(indices, merged_index, renumber_term)
+            return
+
         # kode berikut mengasumsikan minimal ada 1 term
         merged_iter = heapq.merge(*indices, key = lambda x: x[0])
         curr, postings, tf_list = next(merged_iter) # first item
@@ -176,11 +464,28 @@ class BSBIIndex:
                 postings = [doc_id for (doc_id, _) in zip_p_tf]
                 tf_list = [tf for (_, tf) in zip_p_tf]
             else:
-                merged_index.append(curr, postings, tf_list)
+                merged_index.append(renumber_term(curr), postings, tf_list)
                 curr, postings, tf_list = t, postings_, tf_list_
-        merged_index.append(curr, postings, tf_list)
+        merged_index.append(renumber_term(curr), postings, tf_list)
+
+    def merge_positional(self, indices, merged_index, renumber_term):
+        """
+        Versi merge(..) untuk positional index: setiap item dari intermediate
+        index berupa (term, postings_list, tf_list, positions_lists), dan
+        positions ikut digabung bersama postings dan TF.
+        """
+        merged_iter = heapq.merge(*indices, key = lambda x: x[0])
+        curr, postings, tf_list, positions_lists = next(merged_iter) # first item
+        merged = list(zip(postings, tf_list, positions_lists))
+        for t, postings_, tf_list_, positions_lists_ in merged_iter: # from the second item
+            if t == curr:
+                merged = sorted_merge_postings_positions(merged, list(zip(postings_, tf_list_, positions_lists_)))
+            else:
+                merged_index.append(renumber_term(curr), *map(list, zip(*merged)))
+                curr, merged = t, list(zip(postings_, tf_list_, positions_lists_))
+        merged_index.append(renumber_term(curr), *map(list, zip(*merged)))
 
-    def retrieve_tfidf(self, query, k = 10):
+    def retrieve_tfidf(self, query, k = 10, filters = None):
         """
         Melakukan Ranked Retrieval dengan skema TaaT (Term-at-a-Time).
         Method akan mengembalikan top-K retrieval results.
@@ -205,6 +510,9 @@ class BSBIIndex:
 
             contoh: Query "universitas indonesia depok" artinya ada
             tiga terms: universitas, indonesia, dan depok
+        filters: str
+            Expression filter (lihat get_filter); dokumen di luar filter
+            dilewati di dalam loop scoring, tidak pernah di-score
 
         Result
         ------
@@ -218,12 +526,9 @@ class BSBIIndex:
         """
         self.load()
         doc_length = 0
-        stemmer = StemmerFactory().create_stemmer()
-        stop_word_remover = StopWordRemoverFactory().create_stop_word_remover()
-        stemmed = stemmer.stem(query)
-        cleaned = stop_word_remover.remove(stemmed)
-        tokenized = word_tokenize(cleaned)
+        tokenized = self.analyze_query(query)
         list_of_postings_list = []
+        allowed = self.get_filter(filters)
 
         with InvertedIndexReader(self.index_name, self.postings_encoding, self.output_dir) as index:
             doc_length = index.doc_length
@@ -238,6 +543,12 @@ class BSBIIndex:
         # informasi N bisa didapat dari doc_length pada merged index
         N = len(doc_length)
 
+        if self.parallel_scorer is not None and self.parallel_scorer.should_parallelize(list_of_postings_list):
+            terms = [(postings_list, tf_list, math.log(N / len(postings_list)))
+                     for (postings_list, tf_list) in list_of_postings_list]
+            return [(score, self.doc_id_map[doc_id])
+                    for (score, doc_id) in self.parallel_scorer.score('tfidf', terms, k, allowed = allowed)]
+
         # Iterasi setiap terms
         for i in range(len(list_of_postings_list)):
             # posting list dari term ke-i dan frequency list dari term ke-i
@@ -254,6 +565,8 @@ class BSBIIndex:
             posts_tfs2 = []
             for j in range(DF):
                 doc_id = posting_list_of_term_i[j]
+                if allowed is not None and doc_id not in allowed:
+                    continue
                 tf = frequency_list_of_term_i[j]
                 score = (1 + math.log(tf)) * idf
                 posts_tfs2.append((doc_id, score))
@@ -272,29 +585,93 @@ class BSBIIndex:
         #     result.append(post_tf[1], self.doc_id_map[post_tf[0]])
         return result
 
-    def retrieve_bm25(self, query, k = 10, k1=1.4, b=0.75):
+    def retrieve_bm25(self, query, k = 10, k1=1.4, b=0.75, proximity_weight = 0., filter_query = None, rm3 = False,
+                      filters = None, tiered = True):
+        """
+        Melakukan Ranked Retrieval dengan skema TaaT (Term-at-a-Time) dan
+        scoring BM25. Method akan mengembalikan top-K retrieval results.
+
+        Parameters
+        ----------
+        query: str
+            Query tokens yang dipisahkan oleh spasi
+        k1, b: float
+            Parameter BM25
+        proximity_weight: float
+            Jika > 0 (butuh positional index), dokumen yang memuat m >= 2 term
+            query mendapat tambahan score proximity_weight * m / span, dengan
+            span panjang window terkecil yang memuat semua term tersebut.
+            Nilai tambahan ini maksimal proximity_weight (term bersebelahan).
+        filter_query: str
+            Boolean query (lihat boolean_query.py), misal "fluid AND NOT rat".
+            Jika diberikan, hanya dokumen yang memenuhi filter yang di-score.
+        rm3: bool
+            Jika True, query diperluas dengan pseudo-relevance feedback RM3
+            (lihat retrieve_rm3, yang juga menerapkan filters);
+            proximity_weight dan filter_query diabaikan.
+        filters: str
+            Expression filter yang sudah di-compile saat indexing (lihat
+            get_filter), misal "block:1 OR block:2"; dokumen di luar filter
+            dilewati di dalam loop scoring.
+        tiered: bool
+            Jika False, tier 1 tidak dipakai walaupun enable_tiering() sudah
+            dipanggil (misal untuk membandingkan hasil dengan index lengkap).
 
+        Result
+        ------
+        List[(int, str)]
+            List of tuple: elemen pertama adalah score similarity, dan yang
+            kedua adalah nama dokumen.
+            Daftar Top-K dokumen terurut mengecil BERDASARKAN SKOR.
+        """
+        if rm3:
+            return self.retrieve_rm3(query, k = k, k1 = k1, b = b, filters = filters)
+        tiered_index = self.tiered_index
+        if tiered and tiered_index is not None and proximity_weight == 0 and filter_query is None \
+                and filters is None and (k1, b) == (tiered_index.k1, tiered_index.b):
+            return tiered_index.retrieve(query, k = k)[0]
         self.load()
         doc_length = 0
-        stemmer = StemmerFactory().create_stemmer()
-        stop_word_remover = StopWordRemoverFactory().create_stop_word_remover()
-        stemmed = stemmer.stem(query)
-        cleaned = stop_word_remover.remove(stemmed)
-        tokenized = word_tokenize(cleaned)
+        tokenized = self.analyze_query(query)
         list_of_postings_list = []
+        # term ID -> {doc ID -> positions}, hanya untuk proximity boost
+        term_positions = {}
+        allowed = self.get_filter(filters)
 
         with InvertedIndexReader(self.index_name, self.postings_encoding, self.output_dir) as index:
             doc_length = index.doc_length
+            allowed_doc_ids = None
+            if filter_query is not None:
+                allowed_doc_ids = BooleanQuery(filter_query).execute(index, self.term_id_map, self.preprocess)
+                if not allowed_doc_ids:
+                    return []
             for token in tokenized:
                 if token in self.term_id_map:
-                    postings_list = index.get_postings_list(self.term_id_map[token])
+                    term_id = self.term_id_map[token]
+                    full_postings = index.get_postings_list(term_id)
+                    postings_list = full_postings
+                    if allowed_doc_ids is not None:
+                        postings_list = restrict_postings(full_postings, allowed_doc_ids)
+                        if not postings_list[0]:
+                            continue
                     list_of_postings_list.append(postings_list)
+                    if proximity_weight > 0 and term_id not in term_positions:
+                        term_positions[term_id] = doc_positions(index, term_id, full_postings, postings_list[0])
             
         list_of_postings_list.sort(key=lambda x: len(x[0]))
         posts_tfs = [] # list of tuple
 
         # informasi N bisa didapat dari doc_length pada merged index
         N = len(doc_length)
+        # rata-rata panjang dokumen cukup dihitung sekali per query
+        avg_doc_length = sum(doc_length.values()) / N if N > 0 else 0
+
+        if allowed_doc_ids is None and not term_positions and self.parallel_scorer is not None \
+                and self.parallel_scorer.should_parallelize(list_of_postings_list):
+            terms = [(postings_list, tf_list, math.log(N / len(postings_list)))
+                     for (postings_list, tf_list) in list_of_postings_list]
+            return [(score, self.doc_id_map[doc_id]) for (score, doc_id)
+                    in self.parallel_scorer.score('bm25', terms, k, avg_doc_length, k1, b, allowed)]
 
         # Iterasi setiap terms
         for i in range(len(list_of_postings_list)):
@@ -303,22 +680,33 @@ class BSBIIndex:
             frequency_list_of_term_i = list_of_postings_list[i][1]
             
             # mendapatkan df dari panjang posting list term ke-i
-            DF = len(posting_list_of_term_i)
+            # (untuk postings yang sudah difilter, df tetap diambil dari index)
+            DF = list_of_postings_list[i][2] if allowed_doc_ids is not None else len(posting_list_of_term_i)
 
             # dengan menggunakan formula w(t, Q) = IDF = log (N / df(t))
             idf = math.log(N / DF)
 
             # inisialisasi pasangan doc id dengan score
             posts_tfs2 = []
-            for j in range(DF):
+            for j in range(len(posting_list_of_term_i)):
                 doc_id = posting_list_of_term_i[j]
+                if allowed is not None and doc_id not in allowed:
+                    continue
                 tf = frequency_list_of_term_i[j]
 
                 # bm-25 score
-                score = (((k1 + 1) * tf) / (k1 * (1 - b) + b * doc_length[doc_id] / (sum(doc_length.values()) / len(doc_length)) + tf)) * idf
+                score = bm25_score(tf, doc_length[doc_id], avg_doc_length, idf, k1, b)
                 posts_tfs2.append((doc_id, score))
             # merge sehingga hasil dari penggabungan yang sudah terurut
             posts_tfs = sorted_merge_posts_and_tfs(posts_tfs, posts_tfs2)
+
+        if len(term_positions) >= 2:
+            for i in range(len(posts_tfs)):
+                doc_id, score = posts_tfs[i]
+                positions_lists = [positions[doc_id] for positions in term_positions.values() if doc_id in positions]
+                if len(positions_lists) >= 2:
+                    span = min_window_span(positions_lists)
+                    posts_tfs[i] = (doc_id, score + proximity_weight * len(positions_lists) / span)
             
         # diurutkan berdasarkan score dari yang terbesar ke yang terkecil
         result = sorted(posts_tfs, key=lambda x: x[1], reverse=True)
@@ -332,37 +720,486 @@ class BSBIIndex:
         #     result.append(post_tf[1], self.doc_id_map[post_tf[0]])
         return result
 
+    # term yang muncul di lebih dari proporsi ini dari seluruh dokumen tidak
+    # dipakai sebagai term ekspansi (praktis stopword di collection ini)
+    FEEDBACK_MAX_DF_RATIO = 0.1
+
+    @staticmethod
+    def score_weighted(index, term_weights, k1, b, exclude_doc_id = None, allowed = None):
+        """
+        Score BM25 dengan bobot per term: score(d) = sum_t w_t * BM25(t, d),
+        dihitung TaaT dengan accumulator dictionary. Term diproses dari yang
+        df-nya paling kecil.
+
+        Parameters
+        ----------
+        index: InvertedIndexReader
+        term_weights: Dict[int, float]
+            termID -> bobot term di query
+        exclude_doc_id: int
+            Dokumen yang tidak ikut di-score (misal dokumen sumber di similar)
+        allowed: RoaringBitmap
+            Jika diberikan (lihat get_filter), hanya dokumen di dalamnya yang di-score
+
+        Returns
+        -------
+        Dict[int, float]
+            docID -> score
+        """
+        doc_length = index.doc_length
+        N = len(doc_length)
+        avg_doc_length = sum(doc_length.values()) / N if N > 0 else 0
+        scores = {}
+        for term_id in sorted(term_weights, key = lambda term_id: index.postings_dict[term_id][1]):
+            postings_list, tf_list = index.get_postings_list(term_id)
+            idf = math.log(N / len(postings_list))
+            weight = term_weights[term_id]
+            for doc_id, tf in zip(postings_list, tf_list):
+                if doc_id != exclude_doc_id and (allowed is None or doc_id in allowed):
+                    scores[doc_id] = scores.get(doc_id, 0.) + weight * bm25_score(tf, doc_length[doc_id], avg_doc_length, idf, k1, b)
+        return scores
+
+    def top_k_documents(self, scores, k):
+        """Top-k (score, nama dokumen) dari accumulator docID -> score; seri dipecah dengan docID"""
+        top = heapq.nsmallest(k, scores.items(), key = lambda item: (-item[1], item[0]))
+        return [(score, self.doc_id_map[doc_id]) for (doc_id, score) in top]
+
+    def retrieve_rm3(self, query, k = 10, k1=1.4, b=0.75, fb_docs = 10, fb_terms = 10, original_query_weight = 0.5,
+                     filters = None):
+        """
+        BM25 dengan pseudo-relevance feedback RM3:
+
+        1. Query asli di-score dengan BM25; fb_docs dokumen teratas dianggap
+           relevan.
+        2. Relevance model P(t|R) = sum_d P(d|q) * tf(t, d) / |d|, dengan P(d|q)
+           score BM25 dokumen yang dinormalisasi di antara dokumen feedback.
+           Term vector dokumen dibaca dari forward index, bukan dari teks
+           dokumen.
+        3. fb_terms term dengan P(t|R) terbesar (tanpa term yang df-nya lebih
+           dari FEEDBACK_MAX_DF_RATIO * N) diinterpolasi dengan query asli:
+           w_t = original_query_weight * P(t|q) + (1 - original_query_weight) * P(t|R)
+        4. Query yang sudah diperluas di-score ulang dengan BM25 berbobot.
+
+        Jika filters diberikan (lihat get_filter), kedua tahap scoring hanya
+        men-score dokumen di dalam filter, jadi dokumen feedback juga diambil
+        dari subset tersebut.
+
+        Result
+        ------
+        List[(int, str)]
+            Sama seperti retrieve_bm25
+        """
+        self.load()
+        allowed = self.get_filter(filters)
+        tokenized = [token for token in self.analyze_query(query) if token in self.term_id_map]
+        if not tokenized:
+            return []
+        query_weights = {}
+        for token in tokenized:
+            term_id = self.term_id_map[token]
+            query_weights[term_id] = query_weights.get(term_id, 0) + 1 / len(tokenized)
+
+        with InvertedIndexReader(self.index_name, self.postings_encoding, self.output_dir) as index, \
+             ForwardIndexReader(self.index_name, self.postings_encoding, self.output_dir) as forward_index:
+            scores = self.score_weighted(index, query_weights, k1, b, allowed = allowed)
+            feedback = heapq.nsmallest(fb_docs, scores.items(), key = lambda item: (-item[1], item[0]))
+            total_score = sum(score for (_, score) in feedback)
+            if total_score <= 0:
+                return self.top_k_documents(scores, k)
+
+            relevance_model = {}
+            for doc_id, score in feedback:
+                term_list, tf_list = forward_index.get_term_vector(doc_id)
+                doc_length = index.doc_length[doc_id]
+                for term_id, tf in zip(term_list, tf_list):
+                    relevance_model[term_id] = relevance_model.get(term_id, 0.) + (score / total_score) * tf / doc_length
+
+            max_df = self.FEEDBACK_MAX_DF_RATIO * len(index.doc_length)
+            candidates = [(weight, term_id) for term_id, weight in relevance_model.items()
+                          if index.postings_dict[term_id][1] <= max_df]
+            expansion = heapq.nlargest(fb_terms, candidates)
+            expansion_total = sum(weight for (weight, _) in expansion)
+
+            term_weights = {term_id: original_query_weight * weight for term_id, weight in query_weights.items()}
+            for weight, term_id in expansion:
+                term_weights[term_id] = term_weights.get(term_id, 0.) + (1 - original_query_weight) * weight / expansion_total
+            return self.top_k_documents(self.score_weighted(index, term_weights, k1, b, allowed = allowed), k)
+
+    def similar(self, doc, k = 10, n_terms = 20, k1=1.4, b=0.75):
+        """
+        More-like-this: dokumen-dokumen yang paling mirip dengan dokumen `doc`.
+        Term vector doc diambil dari forward index, lalu hanya n_terms term
+        dengan bobot tf-idf terbesar yang dipakai sebagai query (berbobot
+        tf-idf yang dinormalisasi), sehingga query tetap murah walaupun
+        dokumennya panjang. Dokumen doc sendiri tidak ikut dikembalikan.
+
+        Parameters
+        ----------
+        doc: str
+            Nama dokumen (key di doc_id_map, misal "1/13.txt")
+
+        Result
+        ------
+        List[(int, str)]
+            Sama seperti retrieve_bm25; kosong jika doc tidak ada di index
+        """
+        self.load()
+        if doc not in self.doc_id_map:
+            return []
+        doc_id = self.doc_id_map[doc]
+        with InvertedIndexReader(self.index_name, self.postings_encoding, self.output_dir) as index, \
+             ForwardIndexReader(self.index_name, self.postings_encoding, self.output_dir) as forward_index:
+            term_list, tf_list = forward_index.get_term_vector(doc_id)
+            N = len(index.doc_length)
+            weighted = [(tf * math.log(N / index.postings_dict[term_id][1]), term_id)
+                        for term_id, tf in zip(term_list, tf_list)]
+            top_terms = [(weight, term_id) for (weight, term_id) in heapq.nlargest(n_terms, weighted) if weight > 0]
+            if not top_terms:
+                return []
+            total = sum(weight for (weight, _) in top_terms)
+            term_weights = {term_id: weight / total for (weight, term_id) in top_terms}
+            return self.top_k_documents(self.score_weighted(index, term_weights, k1, b, exclude_doc_id = doc_id), k)
+
+    def build_forward_index(self):
+        """
+        Membangun forward index dari merged inverted index yang sudah ada,
+        untuk index yang dibuat sebelum forward index ditulis saat indexing.
+        Seluruh term vector ditampung di memori sebelum ditulis.
+        """
+        doc_dict = {}
+        with InvertedIndexReader(self.index_name, self.postings_encoding, self.output_dir) as index:
+            for term_id, postings_list, tf_list in index:
+                for doc_id, tf in zip(postings_list, tf_list):
+                    term_list, doc_tf_list = doc_dict.setdefault(doc_id, ([], []))
+                    term_list.append(term_id)
+                    doc_tf_list.append(tf)
+        # termIDs sudah terurut karena inverted index diiterasi terurut berdasarkan termID
+        with ForwardIndexWriter(self.index_name, self.postings_encoding, directory = self.output_dir) as forward_index:
+            for doc_id in sorted(doc_dict.keys()):
+                forward_index.append(doc_id, *doc_dict[doc_id])
+
+    # estimasi awal biaya (detik) membaca + men-score satu posting, sebelum
+    # ada pengukuran dari query yang sedang berjalan
+    SECONDS_PER_POSTING = 1e-6
+
+    def retrieve_bm25_anytime(self, query, k = 10, time_budget = 0.05, k1=1.4, b=0.75, filters = None):
+        """
+        BM25 TaaT dengan batas waktu per request (anytime retrieval).
+
+        Term query diproses terurut dari IDF terbesar (df terkecil), sama seperti
+        urutan akumulasi retrieve_bm25(..), dengan akumulator score per dokumen.
+        Sebelum membaca postings sebuah term, biayanya diestimasi dari df term
+        tersebut dan waktu per posting yang terukur sejauh ini; jika estimasi
+        tersebut melewati deadline, pemrosesan berhenti dan top-K dari term-term
+        yang sudah diproses dikembalikan (term pertama selalu diproses). Term
+        yang dilewati adalah term dengan df terbesar, yang kontribusi
+        score-nya paling kecil namun paling mahal.
+
+        Jika semua term sempat diproses, hasilnya identik dengan retrieve_bm25(..).
+
+        Parameters
+        ----------
+        time_budget: float
+            Batas waktu dalam detik, dihitung sejak method ini dipanggil
+        filters: str
+            Sama seperti di retrieve_bm25
+
+        Result
+        ------
+        Tuple[List[(int, str)], bool]
+            (top-K (score, nama dokumen), exact), dengan exact False jika ada
+            term yang tidak diproses karena deadline.
+        """
+        start = time.perf_counter()
+        deadline = start + time_budget
+        self.load()
+        tokenized = self.analyze_query(query)
+        allowed = self.get_filter(filters)
+
+        with InvertedIndexReader(self.index_name, self.postings_encoding, self.output_dir) as index:
+            doc_length = index.doc_length
+            N = len(doc_length)
+            avg_doc_length = sum(doc_length.values()) / N if N > 0 else 0
+            term_ids = [self.term_id_map[token] for token in tokenized if token in self.term_id_map]
+            term_ids.sort(key = lambda term_id: index.postings_dict[term_id][1])
+
+            scores = {}
+            exact = True
+            seconds_per_posting = self.SECONDS_PER_POSTING
+            postings_processed = 0
+            scoring_start = time.perf_counter()
+            for term_id in term_ids:
+                df = index.postings_dict[term_id][1]
+                # term pertama (df terkecil, paling murah) selalu diproses supaya
+                # hasil tidak pernah kosong hanya karena deadline
+                if postings_processed > 0 and time.perf_counter() + df * seconds_per_posting > deadline:
+                    exact = False
+                    break
+                postings_list, tf_list = index.get_postings_list(term_id)
+                idf = math.log(N / df)
+                for doc_id, tf in zip(postings_list, tf_list):
+                    if allowed is not None and doc_id not in allowed:
+                        continue
+                    scores[doc_id] = scores.get(doc_id, 0) + bm25_score(tf, doc_length[doc_id], avg_doc_length, idf, k1, b)
+                postings_processed += df
+                seconds_per_posting = (time.perf_counter() - scoring_start) / postings_processed
+
+        top = heapq.nsmallest(k, scores.items(), key = lambda x: (-x[1], x[0]))
+        return [(score, self.doc_id_map[doc_id]) for (doc_id, score) in top], exact
+
+    def retrieve_with_snippets(self, query, k = 10, window = 30, highlight = ('<b>', '</b>'), **bm25_kwargs):
+        """
+        retrieve_bm25(..) ditambah snippet untuk setiap hasil, diambil dari
+        DocumentStoreReader (lihat docstore.py). Teks top-k dokumen dibaca sekaligus,
+        satu kali baca per block di store.
+
+        Result
+        ------
+        List[(int, str, str)]
+            Top-K (score, nama dokumen, snippet), terurut mengecil berdasarkan
+            score. Kata-kata yang cocok dengan query diapit oleh highlight.
+        """
+        result = self.retrieve_bm25(query, k = k, **bm25_kwargs)
+        if not result:
+            return []
+        query_terms = set(self.analyze_query(query))
+        doc_ids = [self.doc_id_map[doc] for (_, doc) in result]
+        with DocumentStoreReader(self.output_dir) as doc_store:
+            texts = doc_store.get_many(doc_ids)
+        return [(score, doc, make_snippet(texts[doc_id], query_terms, self.preprocess, window, highlight))
+                for (score, doc), doc_id in zip(result, doc_ids)]
+
+    def boolean_search(self, query):
+        """
+        Mengembalikan nama-nama dokumen (terurut berdasarkan doc ID) yang
+        memenuhi boolean query, misal "(cerebrospinal OR spinal) AND fluid".
+        """
+        self.load()
+        with InvertedIndexReader(self.index_name, self.postings_encoding, self.output_dir) as index:
+            doc_ids = BooleanQuery(query).execute(index, self.term_id_map, self.preprocess)
+        return [self.doc_id_map[doc_id] for doc_id in doc_ids]
+
+    def get_postings_with_positions(self, tokenized):
+        """
+        Mengambil (postings_list, tf_list, positions_lists) untuk setiap token,
+        dengan urutan yang sama seperti tokenized. Mengembalikan None jika ada
+        token yang tidak ada di collection (frasa/proximity pasti tidak match).
+        """
+        if not tokenized or any(token not in self.term_id_map for token in tokenized):
+            return None, {}
+        with InvertedIndexReader(self.index_name, self.postings_encoding, self.output_dir) as index:
+            terms = []
+            for token in tokenized:
+                term_id = self.term_id_map[token]
+                postings_list, tf_list = index.get_postings_list(term_id)
+                terms.append((postings_list, tf_list, index.get_positions_list(term_id, tf_list)))
+            return terms, index.doc_length
+
+    def retrieve_phrase(self, phrase, k = 10, k1=1.4, b=0.75):
+        """
+        Exact phrase query, misal "cerebrospinal fluid" (butuh positional index).
+
+        Kandidat adalah dokumen yang memuat semua term frasa (intersection
+        postings, dimulai dari term dengan df terkecil); lalu positions setiap
+        kandidat di-intersect untuk mencari kemunculan frasa. Dokumen di-ranking
+        dengan BM25 yang memperlakukan frasa sebagai satu "term": TF adalah
+        banyaknya kemunculan frasa dan DF banyaknya dokumen yang memuat frasa.
+
+        Result
+        ------
+        List[(int, str)]
+            Top-K (score, nama dokumen), terurut mengecil berdasarkan score.
+        """
+        self.load()
+        terms, doc_length = self.get_postings_with_positions(self.analyze_query(phrase))
+        if terms is None:
+            return []
+
+        phrase_tfs = []
+        for doc_id, positions_lists in self.intersect_positions(terms):
+            tf = len(phrase_positions(positions_lists))
+            if tf > 0:
+                phrase_tfs.append((doc_id, tf))
+        if not phrase_tfs:
+            return []
+
+        N = len(doc_length)
+        avg_doc_length = sum(doc_length.values()) / N
+        idf = math.log(N / len(phrase_tfs))
+        result = [(bm25_score(tf, doc_length[doc_id], avg_doc_length, idf, k1, b), doc_id) for doc_id, tf in phrase_tfs]
+        result = heapq.nlargest(k, result, key = lambda x: x[0])
+        return [(score, self.doc_id_map[doc_id]) for (score, doc_id) in result]
+
+    def retrieve_proximity(self, query, window, k = 10, k1=1.4, b=0.75):
+        """
+        Window-proximity query (butuh positional index): hanya dokumen yang
+        memuat semua term query di dalam satu window sepanjang paling banyak
+        `window` token yang dikembalikan, di-ranking dengan BM25 biasa.
+
+        Result
+        ------
+        List[(int, str)]
+            Top-K (score, nama dokumen), terurut mengecil berdasarkan score.
+        """
+        self.load()
+        terms, doc_length = self.get_postings_with_positions(self.analyze_query(query))
+        if terms is None:
+            return []
+
+        N = len(doc_length)
+        avg_doc_length = sum(doc_length.values()) / N
+        idfs = [math.log(N / len(postings_list)) for (postings_list, _, _) in terms]
+        tf_maps = [dict(zip(postings_list, tf_list)) for (postings_list, tf_list, _) in terms]
+
+        result = []
+        for doc_id, positions_lists in self.intersect_positions(terms):
+            if min_window_span(positions_lists) <= window:
+                score = 0
+                for idf, tf_map in zip(idfs, tf_maps):
+                    score += bm25_score(tf_map[doc_id], doc_length[doc_id], avg_doc_length, idf, k1, b)
+                result.append((score, doc_id))
+        result = heapq.nlargest(k, result, key = lambda x: x[0])
+        return [(score, self.doc_id_map[doc_id]) for (score, doc_id) in result]
+
+    @staticmethod
+    def intersect_positions(terms):
+        """
+        Generator (doc ID, [positions term ke-0, positions term ke-1, ...]) untuk
+        setiap dokumen yang memuat semua term. terms adalah keluaran
+        get_postings_with_positions(..).
+        """
+        order = sorted(range(len(terms)), key = lambda i: len(terms[i][0]))
+        doc_ids = terms[order[0]][0]
+        for i in order[1:]:
+            if not doc_ids:
+                return
+            doc_ids = sorted_intersect(doc_ids, terms[i][0])
+        positions_maps = [dict(zip(postings_list, positions_lists)) for (postings_list, _, positions_lists) in terms]
+        for doc_id in doc_ids:
+            yield doc_id, [positions[doc_id] for positions in positions_maps]
+
+    def build_config(self):
+        """Konfigurasi yang menentukan isi intermediate index (lihat buildcache.BuildManifest)"""
+        from importlib import metadata
+        config = {"analyzer": self.ANALYZER_VERSION,
+                  "postings_encoding": self.postings_encoding.__name__,
+                  "positional": self.positional}
+        for package in ['nltk', 'Sastrawi']:
+            try:
+                config[package] = metadata.version(package)
+            except metadata.PackageNotFoundError:
+                config[package] = None
+        return config
+
     def index(self):
         """
         Base indexing code
         BAGIAN UTAMA untuk melakukan Indexing dengan skema BSBI (blocked-sort
         based indexing)
 
-        Method ini scan terhadap semua data di collection, memanggil parse_block
+        Method ini scan terhadap semua data di collection, memanggil parse_documents
         untuk parsing dokumen dan memanggil invert_write yang melakukan inversion
         di setiap block dan menyimpannya ke index yang baru.
+
+        Dokumen dibaca secara streaming dari corpus adapter (corpus.py) dengan
+        read-ahead terbatas, dan block dibentuk berdasarkan ukuran
+        (self.block_size) dengan batas yang ditentukan isi corpus
+        (corpus.content_defined_blocks), bukan berdasarkan sub-directory.
+
+        Intermediate index setiap block disimpan berdasarkan hash isinya di
+        build cache (buildcache.BuildManifest): block yang tidak berubah sejak
+        build sebelumnya (atau yang sudah selesai sebelum build terputus) tidak
+        di-parse dan di-invert ulang; hanya merge terakhir yang selalu diulang.
         """
-        # loop untuk setiap sub-directory di dalam folder collection (setiap block)
-        for block_dir_relative in tqdm(sorted(next(os.walk(self.data_dir))[1])):
-            td_pairs = self.parse_block(block_dir_relative)
-            index_id = 'intermediate_index_'+block_dir_relative
-            self.intermediate_indices.append(index_id)
-            with InvertedIndexWriter(index_id, self.postings_encoding, directory = self.output_dir) as index:
-                self.invert_write(td_pairs, index)
-                td_pairs = None
-    
-        self.save()
-
-        with InvertedIndexWriter(self.index_name, self.postings_encoding, directory = self.output_dir) as merged_index:
+        from tqdm import tqdm
+
+        manifest = BuildManifest(self.output_dir, self.build_config()).load()
+        # termIDs di intermediate index berasal dari term_id_map build yang persisten
+        self.term_id_map = manifest.term_id_map
+        # (block_hash, doc_id_base) untuk setiap block, terurut sesuai corpus
+        blocks = []
+        documents = read_ahead(iter(open_corpus(self.data_dir)))
+        with DocumentStoreWriter(self.output_dir) as doc_store:
+            for block in tqdm(content_defined_blocks(documents, self.block_size)):
+                current_hash = block_hash(block)
+                index_id = manifest.index_id(current_hash)
+                doc_id_base = len(self.doc_id_map)
+                blocks.append((current_hash, doc_id_base))
+                if current_hash in manifest.blocks and \
+                   os.path.exists(os.path.join(self.output_dir, index_id + '.dict')):
+                    # block tidak berubah: cukup assign docIDs, tanpa parsing dan inversion
+                    for doc_key, text in block:
+                        doc_store.add(self.doc_id_map.add(doc_key, external_doc_id(doc_key)), text)
+                    continue
+                with self.profile_stage("parse"):
+                    td_pairs = self.parse_documents(block, doc_store, doc_id_base)
+                number_of_documents = len(block)
+                block = None
+                with self.profile_stage("invert"), \
+                     InvertedIndexWriter(index_id, self.postings_encoding, directory = self.output_dir,
+                                         positional = self.positional) as index, \
+                     ForwardIndexWriter(index_id, self.postings_encoding, directory = self.output_dir) as forward_index:
+                    self.invert_write(td_pairs, index, forward_index)
+                    td_pairs = None
+                manifest.add_block(current_hash, number_of_documents)
+        self.intermediate_indices = [manifest.index_id(current_hash) for (current_hash, _) in blocks]
+
+        # termID build -> termID di index; hanya term yang masih ada di collection
+        # yang mendapat termID, terurut sesuai termID build
+        term_ids = {}
+        with self.profile_stage("merge"), \
+             InvertedIndexWriter(self.index_name, self.postings_encoding, directory = self.output_dir,
+                                 positional = self.positional) as merged_index:
             with contextlib.ExitStack() as stack:
-                indices = [stack.enter_context(InvertedIndexReader(index_id, self.postings_encoding, directory=self.output_dir))
-                               for index_id in self.intermediate_indices]
-                self.merge(indices, merged_index)
+                indices = [shift_doc_ids(stack.enter_context(InvertedIndexReader(index_id, self.postings_encoding, directory=self.output_dir,
+                                                                                 positional = self.positional)), doc_id_base)
+                               for (index_id, (_, doc_id_base)) in zip(self.intermediate_indices, blocks)]
+                self.merge(indices, merged_index, lambda term_id: term_ids.setdefault(term_id, len(term_ids)))
+
+        with self.profile_stage("forward_index"), \
+             ForwardIndexWriter(self.index_name, self.postings_encoding, directory = self.output_dir) as forward_index:
+            for (index_id, (_, doc_id_base)) in zip(self.intermediate_indices, blocks):
+                with ForwardIndexReader(index_id, self.postings_encoding, self.output_dir) as block_forward_index:
+                    for doc_id in sorted(block_forward_index.doc_dict.keys()):
+                        term_list, tf_list = block_forward_index.get_term_vector(doc_id)
+                        forward_index.append(doc_id_base + doc_id, [term_ids[term_id] for term_id in term_list], tf_list)
+
+        manifest.prune({current_hash for (current_hash, _) in blocks})
+        with self.profile_stage("save"):
+            self.term_id_map = IdMap()
+            for term_id in term_ids:
+                self.term_id_map[manifest.term_id_map[term_id]]
+            self.save()
 
+            # filter block:<nama> dan tag:<nama> di-compile menjadi bitmap doc IDs
+            tags = None
+            if self.doc_tags is not None:
+                with open(self.doc_tags, 'r', encoding = 'utf-8') as f:
+                    tags = json.load(f)
+            FilterIndex(self.output_dir).build(self.doc_id_map, tags).save()
+            self.filter_index = None
+
+        if self.tiered:
+            with self.profile_stage("tiers"):
+                # tier 1 berisi postings dengan score BM25 terbesar setiap term (lihat tiering.py)
+                from tiering import TieredIndex
+                TieredIndex(self).build()
+
+        # sorted term array untuk autocomplete (/suggest) dan deletion index untuk koreksi ejaan
+        with self.profile_stage("suggest"):
+            TermSuggester(self.output_dir).build(self.term_id_map, merged_index.postings_dict).save()
+            SpellingCorrector(self.output_dir).build(self.term_id_map, merged_index.postings_dict).save()
+            self.spelling_corrector = None
 
 if __name__ == "__main__":
 
     BSBI_instance = BSBIIndex(data_dir = 'collection', \
                               postings_encoding = VBEPostings, \
                               output_dir = 'index')
-    BSBI_instance.index() # memulai indexing!
+
+    import sys
+    if "--forward-index" in sys.argv:
+        # hanya membangun forward index untuk index yang sudah ada
+        BSBI_instance.build_forward_index()
+    else:
+        BSBI_instance.index() # memulai indexing!
@@ -0,0 +1,113 @@
+import os
+import pickle
+import hashlib
+
+from util import IdMap
+
+class BuildManifest:
+    """
+    Manifest build untuk BSBIIndex.index(), disimpan di <output_dir>/build.manifest,
+    supaya rebuild bisa memakai ulang block yang isinya tidak berubah dan
+    melanjutkan build yang terputus.
+
+    Setiap block diidentifikasi dengan hash isinya (block_hash). Intermediate
+    index sebuah block (beserta forward index-nya) disimpan dengan nama
+    index_id(block_hash) dan ditulis dengan docID lokal block (0, 1, ...),
+    sehingga bisa dipakai ulang walaupun posisi block di collection bergeser;
+    docID global baru ditambahkan saat merge.
+
+    termIDs di intermediate index berasal dari term_id_map build yang
+    persisten (append-only) dan ikut disimpan di manifest, sehingga termIDs
+    block lama tetap valid di build berikutnya.
+
+    Attributes
+    ----------
+    config: Dict
+        Konfigurasi analyzer/codec saat block-block dibuat. Jika berbeda dengan
+        konfigurasi build sekarang, semua block dianggap tidak valid.
+    term_id_map: IdMap
+        term_id_map build (termIDs di semua intermediate index)
+    blocks: Dict[str, int]
+        block_hash -> banyaknya dokumen, untuk block yang intermediate index-nya
+        sudah lengkap ditulis
+    """
+    def __init__(self, output_dir, config):
+        self.file_path = os.path.join(output_dir, 'build.manifest')
+        self.output_dir = output_dir
+        self.config = config
+        self.term_id_map = IdMap()
+        self.blocks = {}
+
+    def load(self):
+        """Memuat manifest jika ada dan konfigurasinya sama; jika tidak, manifest kosong"""
+        if os.path.exists(self.file_path):
+            with open(self.file_path, 'rb') as f:
+                config, term_id_map, blocks = pickle.load(f)
+            if config == self.config:
+                self.term_id_map, self.blocks = term_id_map, blocks
+        return self
+
+    def save(self):
+        """
+        Ditulis ke file sementara lalu di-rename, sehingga build yang terputus
+        tidak pernah meninggalkan manifest yang rusak.
+        """
+        temporary_path = self.file_path + '.tmp'
+        with open(temporary_path, 'wb') as f:
+            pickle.dump([self.config, self.term_id_map, self.blocks], f)
+        os.replace(temporary_path, self.file_path)
+
+    @staticmethod
+    def index_id(block_hash):
+        return 'intermediate_' + block_hash
+
+    def add_block(self, block_hash, number_of_documents):
+        """Dipanggil setelah intermediate index block selesai ditulis (checkpoint)"""
+        self.blocks[block_hash] = number_of_documents
+        self.save()
+
+    def prune(self, used_hashes):
+        """Menghapus block (beserta file-filenya) yang tidak dipakai oleh build terakhir"""
+        for block_hash in list(self.blocks):
+            if block_hash in used_hashes:
+                continue
+            del self.blocks[block_hash]
+            for extension in ['.index', '.dict', '.pos', '.posdict', '.fwd', '.fwddict']:
+                file_path = os.path.join(self.output_dir, self.index_id(block_hash) + extension)
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+        self.save()
+
+
+def block_hash(block):
+    """Hash isi sebuah block, list of (doc_key, text)"""
+    digest = hashlib.blake2b(digest_size = 16)
+    for doc_key, text in block:
+        for part in (doc_key, text):
+            encoded = part.encode('utf-8')
+            digest.update(len(encoded).to_bytes(8, 'little'))
+            digest.update(encoded)
+    return digest.hexdigest()
+
+
+if __name__ == "__main__":
+
+    import tempfile
+
+    assert block_hash([("1.txt", "ab"), ("2.txt", "c")]) != block_hash([("1.txt", "a"), ("2.txt", "bc")]), "hash salah"
+    assert block_hash([("1.txt", "ab")]) == block_hash([("1.txt", "ab")]), "hash salah"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = BuildManifest(tmp, {"codec": "VBEPostings"}).load()
+        manifest.term_id_map["halo"]
+        manifest.add_block("a" * 32, 3)
+        manifest.add_block("b" * 32, 5)
+        open(os.path.join(tmp, BuildManifest.index_id("b" * 32) + '.index'), 'wb').close()
+
+        manifest = BuildManifest(tmp, {"codec": "VBEPostings"}).load()
+        assert manifest.blocks == {"a" * 32: 3, "b" * 32: 5} and manifest.term_id_map["halo"] == 0, "load salah"
+        manifest.prune({"a" * 32})
+        assert manifest.blocks == {"a" * 32: 3}, "prune salah"
+        assert not os.path.exists(os.path.join(tmp, BuildManifest.index_id("b" * 32) + '.index')), "prune salah"
+
+        assert BuildManifest(tmp, {"codec": "StandardPostings"}).load().blocks == {}, "config berbeda seharusnya tidak dipakai"
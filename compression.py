@@ -88,6 +88,37 @@ class StandardPostings:
         """
         return StandardPostings.decode(encoded_tf_list)
 
+    @staticmethod
+    def encode_positions(positions_lists):
+        """
+        Encode positions (posisi token) untuk setiap posting menjadi stream of bytes.
+        Posisi semua posting cukup disambung, karena banyaknya posisi untuk
+        posting ke-i sama dengan TF ke-i.
+
+        Parameters
+        ----------
+        positions_lists: List[List[int]]
+            positions_lists[i] adalah sorted list posisi term di dokumen ke-i
+            pada postings list
+
+        Returns
+        -------
+        bytes
+        """
+        return StandardPostings.encode([p for positions in positions_lists for p in positions])
+
+    @staticmethod
+    def decode_positions(encoded_positions, tf_list):
+        """
+        Decodes positions dari sebuah stream of bytes; tf_list diperlukan untuk
+        memecah kembali positions per posting.
+
+        Returns
+        -------
+        List[List[int]]
+        """
+        return split_by_tf(StandardPostings.decode(encoded_positions), tf_list)
+
 class VBEPostings:
     """ 
     Berbeda dengan StandardPostings, dimana untuk suatu postings list,
@@ -247,6 +278,56 @@ class VBEPostings:
         """
         return VBEPostings.vb_decode(encoded_tf_list)
 
+    @staticmethod
+    def encode_positions(positions_lists):
+        """
+        Encode positions untuk setiap posting. Seperti docIDs, yang disimpan
+        adalah gap antar posisi di dalam satu dokumen (posisi pertama setiap
+        dokumen disimpan apa adanya), lalu di-encode dengan Variable-Byte Encoding.
+
+        Parameters
+        ----------
+        positions_lists: List[List[int]]
+            positions_lists[i] adalah sorted list posisi term di dokumen ke-i
+            pada postings list
+
+        Returns
+        -------
+        bytes
+        """
+        gaps = []
+        for positions in positions_lists:
+            prev = 0
+            for position in positions:
+                gaps.append(position - prev)
+                prev = position
+        return VBEPostings.vb_encode(gaps)
+
+    @staticmethod
+    def decode_positions(encoded_positions, tf_list):
+        """
+        Decodes positions dari sebuah stream of bytes; tf_list diperlukan untuk
+        memecah kembali positions per posting.
+
+        Returns
+        -------
+        List[List[int]]
+        """
+        positions_lists = split_by_tf(VBEPostings.vb_decode(encoded_positions), tf_list)
+        for positions in positions_lists:
+            for i in range(1, len(positions)):
+                positions[i] += positions[i - 1]
+        return positions_lists
+
+def split_by_tf(numbers, tf_list):
+    """Memecah list numbers menjadi potongan-potongan dengan panjang tf_list[i]"""
+    result = []
+    start = 0
+    for tf in tf_list:
+        result.append(numbers[start:start + tf])
+        start += tf
+    return result
+
 if __name__ == '__main__':
     
     postings_list = [34, 67, 89, 454, 2345738]
@@ -266,4 +347,9 @@ if __name__ == '__main__':
         print("hasil decoding (TF list) : ", decoded_tf_list)
         assert decoded_posting_list == postings_list, "hasil decoding tidak sama dengan postings original"
         assert decoded_tf_list == tf_list, "hasil decoding tidak sama dengan postings original"
+
+        positions_lists = [[3, 9, 10] + list(range(20, 29)), list(range(7, 17)), [1, 5, 130], [2, 4, 6, 8], [500]]
+        encoded_positions = Postings.encode_positions(positions_lists)
+        print("ukuran encoded positions  : ", len(encoded_positions), "bytes")
+        assert Postings.decode_positions(encoded_positions, tf_list) == positions_lists, "hasil decoding positions salah"
         print()
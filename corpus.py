@@ -0,0 +1,229 @@
+import os
+import io
+import gzip
+import zlib
+import json
+import queue
+import threading
+
+# buffer besar supaya pembacaan file dump berukuran besar tetap sekuensial
+BUFFER_SIZE = 1 << 20
+
+def open_text(path):
+    """Membuka file teks UTF-8 untuk dibaca; file berakhiran .gz di-decompress on the fly"""
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(io.BufferedReader(gzip.open(path, 'rb'), BUFFER_SIZE), encoding = 'utf-8')
+    return open(path, 'r', encoding = 'utf-8', buffering = BUFFER_SIZE)
+
+class Corpus:
+    """
+    Adapter sumber dokumen untuk indexing. Setiap corpus adalah iterable
+    (generator) dari pasangan (doc_key, text), dengan doc_key string yang unik
+    di corpus (dipakai sebagai key di BSBIIndex.doc_id_map). Dokumen dibaca
+    satu per satu, sehingga corpus sebesar apa pun tidak perlu muat di memori.
+    """
+    def __iter__(self):
+        raise NotImplementedError
+
+
+class DirectoryCorpus(Corpus):
+    """
+    Layout awal collection: data_dir berisi sub-directory, setiap
+    sub-directory berisi satu file per dokumen (boleh .gz). doc_key adalah
+    path relatif terhadap data_dir, misal "1/13.txt". Sub-directory dan file
+    diiterasi terurut berdasarkan nama (urutan os.walk bergantung pada file
+    system), sehingga doc IDs hasil indexing selalu sama.
+    """
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+
+    def block_documents(self, block_dir_relative):
+        block_full_path = os.path.join(self.data_dir, block_dir_relative)
+        for doc_file_name in sorted(next(os.walk(block_full_path))[2]):
+            with open_text(os.path.join(block_full_path, doc_file_name)) as file:
+                yield os.path.join(block_dir_relative, doc_file_name), file.read()
+
+    def __iter__(self):
+        for block_dir_relative in sorted(next(os.walk(self.data_dir))[1]):
+            yield from self.block_documents(block_dir_relative)
+
+
+class TsvCorpus(Corpus):
+    """
+    Satu dokumen per baris, kolom dipisah tab, misal format NFCorpus
+    (train.docs): "<doc_id>\t<content>". Baris yang kolomnya kurang dilewati.
+    """
+    def __init__(self, path, id_column = 0, text_column = 1):
+        self.path = path
+        self.id_column = id_column
+        self.text_column = text_column
+
+    def __iter__(self):
+        with open_text(self.path) as file:
+            for line in file:
+                columns = line.rstrip('\n').split('\t')
+                if len(columns) > max(self.id_column, self.text_column):
+                    yield columns[self.id_column], columns[self.text_column]
+
+
+class JsonlCorpus(Corpus):
+    """
+    Satu dokumen (JSON object) per baris, misal {"id": .., "title": .., "text": ..}.
+    Isi dokumen adalah gabungan field-field text_fields yang ada.
+    """
+    def __init__(self, path, id_field = 'id', text_fields = ('title', 'text')):
+        self.path = path
+        self.id_field = id_field
+        self.text_fields = text_fields
+
+    def __iter__(self):
+        with open_text(self.path) as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                document = json.loads(line)
+                text = '\n'.join(str(document[field]) for field in self.text_fields if document.get(field))
+                yield str(document[self.id_field]), text
+
+
+def open_corpus(path):
+    """
+    Memilih adapter berdasarkan path: directory -> DirectoryCorpus,
+    .tsv/.docs -> TsvCorpus, .jsonl -> JsonlCorpus (masing-masing boleh
+    ditambah .gz).
+    """
+    if os.path.isdir(path):
+        return DirectoryCorpus(path)
+    name = path[:-3] if path.endswith('.gz') else path
+    extension = os.path.splitext(name)[1]
+    if extension in ('.tsv', '.docs'):
+        return TsvCorpus(path)
+    if extension in ('.jsonl', '.json'):
+        return JsonlCorpus(path)
+    raise ValueError("format corpus tidak dikenal: " + path)
+
+def read_ahead(documents, max_documents = 256):
+    """
+    Membaca documents di thread terpisah, paling banyak max_documents di depan
+    konsumen, sehingga I/O (dan decompress gzip) berjalan bersamaan dengan
+    parsing tanpa memori yang tidak terbatas. Exception dari pembaca
+    diteruskan ke konsumen.
+    """
+    buffer = queue.Queue(maxsize = max_documents)
+    stopped = threading.Event()
+    end = object()
+
+    def put(item):
+        # berhenti menunggu jika konsumen sudah berhenti membaca
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout = 0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for document in documents:
+                if not put(document):
+                    return
+            put(end)
+        except BaseException as e:
+            put(e)
+
+    producer = threading.Thread(target = produce, daemon = True)
+    producer.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is end:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stopped.set()
+
+def size_blocks(documents, block_size):
+    """
+    Mengelompokkan (doc_key, text) menjadi blocks (list) berdasarkan ukuran:
+    sebuah block ditutup begitu total panjang teksnya mencapai block_size
+    karakter. Dengan begitu ukuran block (dan memori per block saat inversion)
+    tidak bergantung pada layout file corpus.
+    """
+    block, size = [], 0
+    for doc_key, text in documents:
+        block.append((doc_key, text))
+        size += len(text)
+        if size >= block_size:
+            yield block
+            block, size = [], 0
+    if block:
+        yield block
+
+def content_defined_blocks(documents, block_size, anchor_modulus = 8):
+    """
+    Seperti size_blocks, namun batas block ditentukan oleh isi corpus: setelah
+    block mencapai block_size // 2 karakter, block ditutup setelah dokumen
+    "anchor" berikutnya (dokumen dengan crc32(doc_key) % anchor_modulus == 0),
+    dan dipaksa ditutup pada 2 * block_size karakter.
+
+    Dengan size_blocks, perubahan panjang satu dokumen menggeser batas semua
+    block setelahnya. Di sini batas block kembali ke anchor yang sama tidak
+    lama setelah dokumen yang berubah, sehingga block-block berikutnya tetap
+    identik dan bisa dipakai ulang oleh build cache (buildcache.py).
+    """
+    block, size = [], 0
+    for doc_key, text in documents:
+        block.append((doc_key, text))
+        size += len(text)
+        if size >= 2 * block_size or \
+           (size >= block_size // 2 and zlib.crc32(doc_key.encode('utf-8')) % anchor_modulus == 0):
+            yield block
+            block, size = [], 0
+    if block:
+        yield block
+
+
+if __name__ == "__main__":
+
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with gzip.open(os.path.join(tmp, 'docs.tsv.gz'), 'wt', encoding = 'utf-8') as f:
+            f.write("MED-1\tcerebrospinal fluid\nrusak\nMED-2\tlens\n")
+        assert list(open_corpus(os.path.join(tmp, 'docs.tsv.gz'))) == [("MED-1", "cerebrospinal fluid"), ("MED-2", "lens")], "TsvCorpus salah"
+
+        with open(os.path.join(tmp, 'docs.jsonl'), 'w') as f:
+            f.write('{"id": 7, "title": "judul", "text": "isi"}\n\n{"id": 8, "text": "isi saja"}\n')
+        assert list(open_corpus(os.path.join(tmp, 'docs.jsonl'))) == [("7", "judul\nisi"), ("8", "isi saja")], "JsonlCorpus salah"
+
+        for block in ['1', '2']:
+            os.mkdir(os.path.join(tmp, block))
+            with open(os.path.join(tmp, block, '1.txt'), 'w') as f:
+                f.write("dokumen " + block)
+        assert list(open_corpus(tmp)) == [("1/1.txt", "dokumen 1"), ("2/1.txt", "dokumen 2")], "DirectoryCorpus salah"
+
+    documents = [(str(i), "x" * i) for i in range(1, 11)]
+    assert list(read_ahead(iter(documents), 2)) == documents, "read_ahead salah"
+    assert [[key for key, _ in block] for block in size_blocks(documents, 10)] == \
+           [["1", "2", "3", "4"], ["5", "6"], ["7", "8"], ["9", "10"]], "size_blocks salah"
+
+    documents = [(str(i), "x" * (i % 7 + 1)) for i in range(1000)]
+    blocks = list(content_defined_blocks(documents, 40))
+    assert [document for block in blocks for document in block] == documents, "content_defined_blocks salah"
+    edited = list(documents)
+    edited[100] = ("100", "x" * 30)
+    edited_blocks = list(content_defined_blocks(edited, 40))
+    # hanya block di sekitar dokumen yang berubah yang berbeda
+    assert len([block for block in edited_blocks if block not in blocks]) <= 3, "batas block seharusnya kembali sama"
+
+    def broken():
+        yield ("1", "a")
+        raise IOError("gagal membaca")
+    try:
+        list(read_ahead(broken()))
+        assert False, "exception pembaca seharusnya diteruskan"
+    except IOError:
+        pass
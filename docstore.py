@@ -0,0 +1,230 @@
+import os
+import re
+import zlib
+import array
+import pickle
+
+class DocumentStore:
+    """
+    Penyimpanan teks asli dokumen, supaya hasil pencarian bisa menampilkan
+    isi (snippet) tanpa membuka collection/<block>/<n>.txt untuk setiap hit.
+
+    Dokumen ditulis berurutan dan dikelompokkan menjadi block-block berukuran
+    sekitar block_size bytes (sebelum kompresi); setiap block dikompres dengan
+    zlib dan ditulis ke file <name>.store. Metadata (<name>.storedict) berisi
+    tabel offset:
+
+        block_offsets: array('Q'), block ke-i berada di file pada
+                       [block_offsets[i], block_offsets[i + 1])
+        doc_locations: Dictionary mapping
+                       docID -> (block_number, start_in_block, length_in_bytes)
+
+    Seperti InvertedIndex, class ini dipakai lewat subclass-nya:
+    DocumentStoreWriter saat indexing dan DocumentStoreReader saat query.
+    """
+    def __init__(self, output_dir, name = "docstore", block_size = 64 * 1024):
+        self.file_path = os.path.join(output_dir, name + '.store')
+        self.metadata_file_path = os.path.join(output_dir, name + '.storedict')
+        self.block_size = block_size
+        self.block_offsets = array.array('Q', [0])
+        self.doc_locations = {}
+        self.store_file = None
+
+    def close(self):
+        if self.store_file is not None:
+            self.store_file.close()
+            self.store_file = None
+
+
+class DocumentStoreWriter(DocumentStore):
+    """Menulis dokumen ke store; metadata disimpan saat keluar dari context"""
+    def __init__(self, output_dir, name = "docstore", block_size = 64 * 1024):
+        super().__init__(output_dir, name, block_size)
+        # buffer block yang sedang ditulis
+        self.buffer = []
+        self.buffer_size = 0
+
+    def __enter__(self):
+        self.store_file = open(self.file_path, 'wb')
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.flush()
+        self.close()
+        with open(self.metadata_file_path, 'wb') as f:
+            pickle.dump([self.block_size, self.block_offsets, self.doc_locations], f)
+
+    def add(self, doc_id, text):
+        """Menambahkan teks sebuah dokumen ke block yang sedang ditulis"""
+        encoded = text.encode('utf-8')
+        self.doc_locations[doc_id] = (len(self.block_offsets) - 1, self.buffer_size, len(encoded))
+        self.buffer.append(encoded)
+        self.buffer_size += len(encoded)
+        if self.buffer_size >= self.block_size:
+            self.flush()
+
+    def flush(self):
+        """Mengompres dan menulis block yang sedang di-buffer"""
+        if not self.buffer:
+            return
+        self.store_file.write(zlib.compress(b''.join(self.buffer)))
+        self.block_offsets.append(self.store_file.tell())
+        self.buffer = []
+        self.buffer_size = 0
+
+
+class DocumentStoreReader(DocumentStore):
+    """
+    Membaca dokumen dari store. Membaca satu dokumen berarti satu seek + satu
+    decompress block; get_many(..) mengelompokkan doc IDs berdasarkan block
+    sehingga setiap block cukup dibaca dan di-decompress sekali.
+    """
+    def __enter__(self):
+        with open(self.metadata_file_path, 'rb') as f:
+            self.block_size, self.block_offsets, self.doc_locations = pickle.load(f)
+        self.store_file = open(self.file_path, 'rb')
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def read_block(self, block_number):
+        start = self.block_offsets[block_number]
+        self.store_file.seek(start)
+        return zlib.decompress(self.store_file.read(self.block_offsets[block_number + 1] - start))
+
+    def get(self, doc_id):
+        """Teks dokumen doc_id"""
+        return self.get_many([doc_id])[doc_id]
+
+    def get_many(self, doc_ids):
+        """
+        Teks beberapa dokumen sekaligus, sebagai Dictionary docID -> str. Setiap
+        block yang dibutuhkan dibaca dan di-decompress tepat sekali.
+        """
+        by_block = {}
+        for doc_id in doc_ids:
+            block_number, start, length = self.doc_locations[doc_id]
+            by_block.setdefault(block_number, []).append((doc_id, start, length))
+        result = {}
+        for block_number in sorted(by_block):
+            block = self.read_block(block_number)
+            for doc_id, start, length in by_block[block_number]:
+                result[doc_id] = block[start:start + length].decode('utf-8')
+        return result
+
+
+WORD_PATTERN = re.compile(r'\w+')
+
+def make_snippet(text, query_terms, analyze, window = 30, highlight = ('<b>', '</b>')):
+    """
+    Memilih window sepanjang `window` kata di text yang paling cocok dengan
+    query, lalu menandai kata-kata yang cocok.
+
+    Window terbaik adalah yang memuat paling banyak term query yang berbeda;
+    jika sama, yang memuat paling banyak kemunculan term query; jika masih
+    sama, yang paling awal. Dicari dengan sliding window, O(banyaknya kata).
+
+    Parameters
+    ----------
+    text: str
+        Teks asli dokumen
+    query_terms: Set[str]
+        Term query yang sudah dianalisis (keluaran BSBIIndex.analyze_query)
+    analyze: Callable[[str], List[str]]
+        Pipeline analisis yang sama dengan indexing (BSBIIndex.preprocess),
+        dipanggil per kata (unik) di dokumen untuk mencocokkannya ke query_terms
+    window: int
+        Panjang snippet dalam kata
+    highlight: Tuple[str, str]
+        Penanda awal dan akhir kata yang cocok
+
+    Returns
+    -------
+    str
+        Snippet dengan whitespace dinormalisasi; diawali/diakhiri "..." jika
+        snippet bukan awal/akhir dokumen.
+    """
+    words = list(WORD_PATTERN.finditer(text))
+    if not words:
+        return ''
+
+    # term query yang dicocokkan oleh setiap kata (None jika tidak ada)
+    analyzed = {}
+    matches = []
+    for word in words:
+        key = word.group().lower()
+        if key not in analyzed:
+            terms = [term for term in analyze(key) if term in query_terms]
+            analyzed[key] = terms[0] if terms else None
+        matches.append(analyzed[key])
+
+    best, best_key = 0, (-1, -1)
+    counts = {}
+    total = 0
+    for i, term in enumerate(matches):
+        if term is not None:
+            counts[term] = counts.get(term, 0) + 1
+            total += 1
+        start = i - window + 1
+        if start > 0 and matches[start - 1] is not None:
+            dropped = matches[start - 1]
+            counts[dropped] -= 1
+            total -= 1
+            if counts[dropped] == 0:
+                del counts[dropped]
+        key = (len(counts), total)
+        if key > best_key:
+            best, best_key = max(0, start), key
+
+    end = min(len(words), best + window)
+    # teks asli di antara kata-kata (tanda baca) tetap dipertahankan
+    parts = []
+    position = words[best].start()
+    for i in range(best, end):
+        word = words[i].group()
+        parts.append(text[position:words[i].start()])
+        parts.append(highlight[0] + word + highlight[1] if matches[i] is not None else word)
+        position = words[i].end()
+    # tanda baca setelah kata terakhir: sampai akhir teks, atau sampai kata berikutnya
+    parts.append(text[position:] if end == len(words) else text[position:words[end].start()])
+    snippet = ' '.join(''.join(parts).split())
+    if best > 0:
+        snippet = '... ' + snippet
+    if end < len(words):
+        snippet = snippet + ' ...'
+    return snippet
+
+
+if __name__ == "__main__":
+
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        texts = {i: "dokumen ke-{} ".format(i) * (i + 1) for i in range(200)}
+        with DocumentStoreWriter(tmp, block_size = 512) as store:
+            for doc_id, text in texts.items():
+                store.add(doc_id, text)
+        with DocumentStoreReader(tmp) as store:
+            assert len(store.block_offsets) > 2, "seharusnya lebih dari satu block"
+            assert store.get(7) == texts[7], "get salah"
+            assert store.get_many([199, 0, 42]) == {i: texts[i] for i in [199, 0, 42]}, "get_many salah"
+
+    text = "a b c fluid d e f g h cerebrospinal fluid i j"
+    analyze = lambda word: [word]
+    assert make_snippet(text, {"cerebrospinal", "fluid"}, analyze, window = 4) == \
+           "... g h <b>cerebrospinal</b> <b>fluid</b> ...", "snippet salah"
+    assert make_snippet(text, {"fluid"}, analyze, window = 4) == "a b c <b>fluid</b> ...", "snippet salah"
+    assert make_snippet(text, {"xyz"}, analyze, window = 100) == text, "snippet salah"
+    assert make_snippet("fluid .\n  (csf)", {"csf"}, analyze) == "fluid . (<b>csf</b>)", "snippet salah"
+
+    import sys
+    if "--build" in sys.argv:
+        from util import DocTable
+        from corpus import open_corpus
+
+        # membangun ulang docstore dari collection dengan doc IDs di index/docs.table
+        doc_id_map = DocTable.load('index/docs.table')
+        with DocumentStoreWriter('index') as store:
+            for doc_key, text in open_corpus('collection'):
+                store.add(doc_id_map[doc_key], text)
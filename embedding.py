@@ -0,0 +1,148 @@
+import os
+
+import numpy as np
+
+from corpus import open_corpus
+
+class DocumentEmbeddings:
+    """
+    Matrix representasi LSI dari semua dokumen di koleksi yang di-precompute
+    sekali saat indexing. Baris ke-i adalah vector dokumen dengan doc ID i
+    (selaras dengan BSBIIndex.doc_id_map), sehingga saat query time fitur
+    similarity cukup berupa row lookup dan dot product.
+
+    Matrix disimpan di disk dalam format .npy dan di-memory-map saat dimuat,
+    jadi hanya baris yang benar-benar dibaca yang masuk ke memori.
+
+    Attributes
+    ----------
+    output_dir(str): Path ke directory index
+    name(str): Prefix nama file matrix
+    quantized(bool): True jika matrix disimpan sebagai int8 dengan satu
+                     faktor skala float32 per baris
+    """
+    def __init__(self, output_dir, name = "doc_vectors"):
+        self.output_dir = output_dir
+        self.name = name
+        self.vectors_file_path = os.path.join(output_dir, name + '.npy')
+        self.scales_file_path = os.path.join(output_dir, name + '.scale.npy')
+        self.vectors = None
+        self.scales = None
+        self.quantized = False
+
+    def __len__(self):
+        return 0 if self.vectors is None else self.vectors.shape[0]
+
+    def build(self, documents, num_docs, vector_rep, dim, quantize = False):
+        """
+        Memproyeksikan setiap dokumen ke ruang LSI dan menuliskannya langsung
+        ke file .npy (baris demi baris lewat memmap, tidak perlu menampung
+        seluruh matrix di memori).
+
+        Parameters
+        ----------
+        documents: Iterable[Tuple[int, List[str]]]
+            Pasangan (doc ID, tokens dokumen)
+        num_docs: int
+            Banyaknya dokumen (jumlah baris matrix), biasanya len(doc_id_map)
+        vector_rep: Callable[[List[str]], List[float]]
+            Fungsi proyeksi LSI, misal Letor.vector_rep
+        dim: int
+            Banyaknya latent topics
+        quantize: bool
+            Jika True, simpan sebagai int8 (symmetric, skala per baris)
+        """
+        dtype = np.int8 if quantize else np.float32
+        vectors = np.lib.format.open_memmap(self.vectors_file_path, mode = 'w+',
+                                            dtype = dtype, shape = (num_docs, dim))
+        scales = np.zeros(num_docs, dtype = np.float32)
+        for doc_id, tokens in documents:
+            v = np.asarray(vector_rep(tokens), dtype = np.float32)
+            if quantize:
+                scale = float(np.abs(v).max()) / 127.
+                if scale > 0.:
+                    vectors[doc_id] = np.round(v / scale).astype(np.int8)
+                scales[doc_id] = scale
+            else:
+                vectors[doc_id] = v
+        vectors.flush()
+        del vectors
+
+        if quantize:
+            np.save(self.scales_file_path, scales)
+        elif os.path.exists(self.scales_file_path):
+            os.remove(self.scales_file_path)
+        self.load()
+
+    def load(self):
+        """Memuat matrix (memory-mapped, read-only) dari output directory"""
+        self.vectors = np.load(self.vectors_file_path, mmap_mode = 'r')
+        self.quantized = self.vectors.dtype == np.int8
+        self.scales = np.load(self.scales_file_path) if self.quantized else None
+        return self
+
+    def __getitem__(self, doc_id):
+        """Vector float32 untuk sebuah doc ID (atau array of doc IDs)"""
+        rows = np.asarray(self.vectors[doc_id], dtype = np.float32)
+        if self.quantized:
+            scales = self.scales[doc_id]
+            rows = rows * (scales[:, None] if rows.ndim == 2 else scales)
+        return rows
+
+    def dot(self, query_vector, doc_ids):
+        """
+        Dot product antara query_vector dan vector dokumen-dokumen doc_ids.
+        Untuk matrix int8, perkalian dilakukan dulu terhadap nilai terkuantisasi
+        lalu dikalikan skala per baris.
+        """
+        q = np.asarray(query_vector, dtype = np.float32)
+        rows = np.asarray(self.vectors[doc_ids], dtype = np.float32)
+        scores = rows @ q
+        if self.quantized:
+            scores *= self.scales[doc_ids]
+        return scores
+
+    def cosine(self, query_vector, doc_ids):
+        """Cosine similarity antara query_vector dan dokumen-dokumen doc_ids"""
+        q = np.asarray(query_vector, dtype = np.float32)
+        rows = self[doc_ids]
+        norms = np.linalg.norm(rows, axis = 1) * np.linalg.norm(q)
+        sims = rows @ q
+        return np.divide(sims, norms, out = np.zeros_like(sims), where = norms > 0)
+
+
+def collection_documents(data_dir, doc_id_map):
+    """
+    Generator (doc ID, tokens) untuk setiap dokumen di collection, dengan urutan
+    dan doc ID yang sama seperti BSBIIndex.index(). Tokenisasi mengikuti format
+    dokumen yang dipakai Letor (lowercase, dipisah whitespace).
+    """
+    for doc_key, text in open_corpus(data_dir):
+        if doc_key in doc_id_map:
+            yield doc_id_map[doc_key], text.lower().split()
+
+
+if __name__ == "__main__":
+
+    import sys
+    from bsbi import BSBIIndex
+    from letor import Letor
+    from compression import VBEPostings
+
+    # tahap indexing tambahan: latih LSI dari koleksi yang sudah di-index, lalu
+    # proyeksikan semua dokumen sekali; IVF untuk /semantic dibangun setelahnya
+    # dengan ann.py
+    BSBI_instance = BSBIIndex(data_dir = 'collection', \
+                              postings_encoding = VBEPostings, \
+                              output_dir = 'index')
+    BSBI_instance.load()
+
+    letor = Letor()
+    letor.build_lsi(tokens for (_, tokens) in collection_documents(BSBI_instance.data_dir, BSBI_instance.doc_id_map))
+    letor.save_lsi(BSBI_instance.output_dir)
+
+    embeddings = DocumentEmbeddings(BSBI_instance.output_dir)
+    embeddings.build(collection_documents(BSBI_instance.data_dir, BSBI_instance.doc_id_map),
+                     len(BSBI_instance.doc_id_map), letor.vector_rep, Letor.NUM_LATENT_TOPICS,
+                     quantize = "--int8" in sys.argv)
+    assert len(embeddings) == len(BSBI_instance.doc_id_map), "jumlah baris embedding salah"
@@ -1,5 +1,4 @@
 import math
-import re
 from bsbi import BSBIIndex
 from compression import VBEPostings
 
@@ -122,11 +121,12 @@ def eval(qrels, query_file = "queries.txt", k = 1000):
       query = " ".join(parts[1:])
 
       # HATI-HATI, doc id saat indexing bisa jadi berbeda dengan doc id
-      # yang tertera di qrels
+      # yang tertera di qrels; doc id qrels disimpan sebagai external ID
+      # di doc_id_map (DocTable) saat indexing
       ranking = []
       for (score, doc) in BSBI_instance.retrieve_bm25(query, k = k):
-        did = int(re.search(r'\.*\.*(.*)\.txt', doc).group(1))
-        ranking.append(qrels[qid][did])
+        did = BSBI_instance.doc_id_map.external_id(BSBI_instance.doc_id_map[doc])
+        ranking.append(qrels[qid].get(did, 0))
       rbp_scores.append(rbp(ranking))
       dcg_scores.append(dcg(ranking))
       ap_scores.append(ap(ranking))
@@ -0,0 +1,284 @@
+import os
+import array
+import bisect
+import pickle
+import collections
+
+from boolean_query import BooleanQuery
+
+class RoaringBitmap:
+    """
+    Himpunan doc IDs terkompresi ala Roaring bitmap: doc ID dipecah menjadi
+    16 bit atas (key container) dan 16 bit bawah. Setiap container menyimpan
+    16 bit bawah dari doc IDs dengan key yang sama, dalam salah satu dari dua
+    bentuk, tergantung mana yang lebih kecil:
+
+        array container  : array('H') terurut, untuk paling banyak
+                           ARRAY_LIMIT elemen (2 byte per doc ID)
+        bitmap container : integer Python 65536 bit (8 KB), untuk container
+                           yang lebih padat; AND/OR antar bitmap container
+                           cukup satu operasi & / | pada integer
+
+    Attributes
+    ----------
+    containers: Dict[int, array.array | int]
+        key -> container
+    """
+
+    ARRAY_LIMIT = 4096
+
+    def __init__(self, containers = None):
+        self.containers = containers if containers is not None else {}
+
+    @classmethod
+    def from_sorted(cls, doc_ids):
+        """Membangun bitmap dari iterable doc IDs yang terurut naik (boleh ada duplikat)"""
+        groups = {}
+        for doc_id in doc_ids:
+            groups.setdefault(doc_id >> 16, []).append(doc_id & 0xFFFF)
+        return cls({key: cls.make_container(sorted(set(lows))) for key, lows in groups.items()})
+
+    @classmethod
+    def make_container(cls, lows):
+        """Container untuk sorted list 16 bit bawah; bitmap jika lebih dari ARRAY_LIMIT elemen"""
+        if len(lows) <= cls.ARRAY_LIMIT:
+            return array.array('H', lows)
+        bits = bytearray(8192)
+        for low in lows:
+            bits[low >> 3] |= 1 << (low & 7)
+        return int.from_bytes(bits, 'little')
+
+    @classmethod
+    def normalize(cls, container):
+        """Container hasil operasi dalam bentuk yang tepat, atau None jika kosong"""
+        if isinstance(container, int):
+            cardinality = bin(container).count('1')
+            if cardinality == 0:
+                return None
+            if cardinality <= cls.ARRAY_LIMIT:
+                return array.array('H', cls.bitmap_lows(container))
+            return container
+        return container if len(container) > 0 else None
+
+    @staticmethod
+    def bitmap_lows(bitmap):
+        """Sorted list 16 bit bawah yang di-set di sebuah bitmap container"""
+        lows = []
+        for byte_index, byte in enumerate(bitmap.to_bytes(8192, 'little')):
+            while byte:
+                lowest = byte & -byte
+                lows.append((byte_index << 3) | (lowest.bit_length() - 1))
+                byte ^= lowest
+        return lows
+
+    @classmethod
+    def as_bitmap(cls, container):
+        return container if isinstance(container, int) else cls.make_container_bits(container)
+
+    @staticmethod
+    def make_container_bits(lows):
+        bits = 0
+        for low in lows:
+            bits |= 1 << low
+        return bits
+
+    def __len__(self):
+        return sum(bin(container).count('1') if isinstance(container, int) else len(container)
+                   for container in self.containers.values())
+
+    def __contains__(self, doc_id):
+        container = self.containers.get(doc_id >> 16)
+        return container is not None and self.container_contains(container, doc_id & 0xFFFF)
+
+    def __iter__(self):
+        """doc IDs terurut naik"""
+        for key in sorted(self.containers):
+            container = self.containers[key]
+            lows = self.bitmap_lows(container) if isinstance(container, int) else container
+            for low in lows:
+                yield (key << 16) | low
+
+    def __eq__(self, other):
+        return isinstance(other, RoaringBitmap) and list(self) == list(other)
+
+    def __and__(self, other):
+        containers = {}
+        for key in self.containers.keys() & other.containers.keys():
+            a, b = self.containers[key], other.containers[key]
+            if isinstance(a, int) and isinstance(b, int):
+                container = a & b
+            else:
+                if isinstance(a, int):
+                    a, b = b, a
+                # a adalah array container; cukup cek setiap elemennya di b
+                container = array.array('H', [low for low in a if self.container_contains(b, low)])
+            container = self.normalize(container)
+            if container is not None:
+                containers[key] = container
+        return RoaringBitmap(containers)
+
+    def __or__(self, other):
+        containers = dict(self.containers)
+        for key, b in other.containers.items():
+            a = containers.get(key)
+            if a is None:
+                containers[key] = b
+            elif isinstance(a, int) or isinstance(b, int) or len(a) + len(b) > self.ARRAY_LIMIT:
+                containers[key] = self.normalize(self.as_bitmap(a) | self.as_bitmap(b))
+            else:
+                containers[key] = array.array('H', sorted(set(a) | set(b)))
+        return RoaringBitmap(containers)
+
+    def __sub__(self, other):
+        containers = {}
+        for key, a in self.containers.items():
+            b = other.containers.get(key)
+            if b is None:
+                containers[key] = a
+                continue
+            if isinstance(a, int):
+                container = a & ~self.as_bitmap(b)
+            else:
+                container = array.array('H', [low for low in a if not self.container_contains(b, low)])
+            container = self.normalize(container)
+            if container is not None:
+                containers[key] = container
+        return RoaringBitmap(containers)
+
+    @staticmethod
+    def container_contains(container, low):
+        if isinstance(container, int):
+            return (container >> low) & 1 == 1
+        i = bisect.bisect_left(container, low)
+        return i < len(container) and container[i] == low
+
+    def size_in_bytes(self):
+        """Perkiraan ukuran data container (tanpa overhead objek Python)"""
+        return sum(8192 if isinstance(container, int) else 2 * len(container)
+                   for container in self.containers.values())
+
+
+class FilterIndex:
+    """
+    Filter (subset dokumen) yang di-compile saat indexing menjadi RoaringBitmap
+    atas doc IDs, disimpan di <output_dir>/filters.dict. Filter yang tersedia:
+
+        block:<nama>  dokumen yang path-nya berada di sub-directory <nama>
+                      (komponen pertama doc_key, misal "block:1" untuk
+                      collection/1/...)
+        tag:<nama>    dokumen yang diberi tag <nama> (lihat build)
+
+    Filter bisa dikombinasikan dengan sintaks BooleanQuery, misal
+    "(block:1 OR block:2) AND NOT tag:retracted". Hasil kombinasi di-cache
+    (LRU), sehingga filter yang sering dipakai tidak dievaluasi ulang.
+    """
+
+    CACHE_SIZE = 256
+
+    def __init__(self, output_dir, name = "filters"):
+        self.file_path = os.path.join(output_dir, name + '.dict')
+        self.bitmaps = {}
+        self.universe = RoaringBitmap()
+        self.cache = collections.OrderedDict()
+
+    def build(self, doc_id_map, tags = None):
+        """
+        Parameters
+        ----------
+        doc_id_map: DocTable
+        tags: Dict[str, Iterable[str]]
+            nama tag -> doc_keys (path dokumen) yang diberi tag tersebut; doc_key
+            yang tidak ada di doc_id_map diabaikan
+        """
+        members = {}
+        for doc_id in range(len(doc_id_map)):
+            doc_key = doc_id_map[doc_id].replace(os.sep, '/')
+            if '/' in doc_key:
+                members.setdefault('block:' + doc_key.split('/', 1)[0], []).append(doc_id)
+        for tag, doc_keys in (tags or {}).items():
+            members['tag:' + tag] = sorted(doc_id_map.find(doc_key) for doc_key in doc_keys
+                                           if doc_id_map.find(doc_key) is not None)
+        self.bitmaps = {name: RoaringBitmap.from_sorted(doc_ids) for name, doc_ids in members.items()}
+        self.universe = RoaringBitmap.from_sorted(range(len(doc_id_map)))
+        self.cache.clear()
+        return self
+
+    def save(self):
+        with open(self.file_path, 'wb') as f:
+            pickle.dump([self.universe, self.bitmaps], f)
+
+    def load(self):
+        with open(self.file_path, 'rb') as f:
+            self.universe, self.bitmaps = pickle.load(f)
+        self.cache.clear()
+        return self
+
+    def remap(self, new_ids):
+        """doc ID lama d menjadi new_ids[d] di semua filter (lihat reorder.py)"""
+        self.bitmaps = {name: RoaringBitmap.from_sorted(sorted(new_ids[doc_id] for doc_id in bitmap))
+                        for name, bitmap in self.bitmaps.items()}
+        self.cache.clear()
+        return self
+
+    def get(self, expression):
+        """RoaringBitmap doc IDs yang memenuhi expression; ValueError untuk filter yang tidak dikenal"""
+        key = ' '.join(expression.split())
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        bitmap = self.evaluate(BooleanQuery(key).tree)
+        self.cache[key] = bitmap
+        if len(self.cache) > self.CACHE_SIZE:
+            self.cache.popitem(last = False)
+        return bitmap
+
+    def evaluate(self, node):
+        kind = node[0]
+        if kind == 'TERM':
+            if node[1] not in self.bitmaps:
+                raise ValueError("filter tidak dikenal: " + node[1])
+            return self.bitmaps[node[1]]
+        if kind == 'NOT':
+            return self.universe - self.evaluate(node[1])
+        if not node[1]:
+            return self.universe
+        children = [self.evaluate(child) for child in node[1]]
+        result = children[0]
+        for child in children[1:]:
+            result = (result & child) if kind == 'AND' else (result | child)
+        return result
+
+
+if __name__ == "__main__":
+
+    import tempfile
+    from util import DocTable
+
+    dense = list(range(0, 20000, 2))
+    sparse = [1, 2, 3, 70000, 70001]
+    a, b = RoaringBitmap.from_sorted(dense), RoaringBitmap.from_sorted(sparse)
+    assert isinstance(a.containers[0], int) and isinstance(b.containers[0], array.array), "jenis container salah"
+    assert list(a) == dense and list(b) == sparse and len(a) == len(dense), "iterasi salah"
+    assert 4 in a and 5 not in a and 70001 in b and 70002 not in b, "__contains__ salah"
+    assert list(a & b) == [2], "AND salah"
+    assert list(a | b) == sorted(set(dense) | set(sparse)), "OR salah"
+    assert list(b - a) == [1, 3, 70000, 70001], "difference salah"
+    assert list(a - RoaringBitmap.from_sorted(range(20000))) == [], "difference salah"
+    assert a.size_in_bytes() < 2 * len(dense), "bitmap container seharusnya lebih kecil"
+
+    doc_table = DocTable()
+    for path in ["1/1.txt", "1/2.txt", "2/3.txt", "3/4.txt"]:
+        doc_table.add(path)
+    with tempfile.TemporaryDirectory() as tmp:
+        FilterIndex(tmp).build(doc_table, {"review": ["2/3.txt", "1/1.txt", "9/9.txt"]}).save()
+        filters = FilterIndex(tmp).load()
+        assert list(filters.get("block:1")) == [0, 1], "filter block salah"
+        assert list(filters.get("block:1 OR block:3")) == [0, 1, 3], "OR salah"
+        assert list(filters.get("tag:review AND NOT block:1")) == [2], "AND NOT salah"
+        assert filters.get("tag:review  AND NOT block:1") is filters.get("tag:review AND NOT block:1"), "cache salah"
+        assert list(filters.remap([3, 2, 1, 0]).get("block:1")) == [2, 3], "remap salah"
+        try:
+            filters.get("block:9")
+            assert False, "filter yang tidak dikenal seharusnya ditolak"
+        except ValueError:
+            pass
@@ -0,0 +1,305 @@
+"""
+Generasi index: setiap rebuild ditulis ke directory baru, lalu diaktifkan
+dengan mengganti pointer secara atomik, sehingga file index yang sedang dibaca
+worker tidak pernah ditimpa dan deploy tidak perlu restart gunicorn.
+
+Layout di bawah root (misal 'index'):
+
+    <root>/generations/<nama>/   semua file index satu generasi (output_dir
+                                 BSBIIndex); tidak pernah diubah setelah publish
+    <root>/CURRENT               nama generasi yang aktif; ditulis ke file
+                                 sementara lalu os.replace(..)
+
+Build generasi baru:
+
+    python generations.py build [--keep 2]
+
+GenerationSearcher (dipakai app/main.py) memeriksa CURRENT secara berkala;
+generasi baru di-warm di background thread (lexicon dimuat, file index dibaca
+ke page cache, warm-up queries dijalankan) sebelum di-swap. Setiap query
+memegang reference ke generasinya, jadi query yang sedang berjalan selesai di
+generasi lama; generasi lama dilepas setelah reference terakhir dikembalikan.
+"""
+import os
+import time
+import shutil
+import threading
+import contextlib
+
+from bsbi import BSBIIndex
+from suggest import TermSuggester
+from filters import FilterIndex
+
+GENERATIONS_DIR = 'generations'
+CURRENT_FILE = 'CURRENT'
+
+def generation_path(root, name):
+    return os.path.join(root, GENERATIONS_DIR, name)
+
+def current_generation(root):
+    """Nama generasi yang aktif, atau None jika root belum memakai generasi"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), 'r', encoding = 'utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def new_generation(root):
+    """
+    Membuat directory generasi baru (kosong selain build cache) dan mengembalikan
+    namanya. Intermediate index dan build.manifest generasi aktif di-hardlink
+    (atau di-copy jika hardlink tidak didukung), sehingga build cache
+    (buildcache.py) tetap berlaku antar generasi. Keduanya aman dibagi: block
+    yang di-cache tidak pernah ditulis ulang dan manifest selalu diganti
+    dengan os.replace(..), bukan ditulis in-place.
+    """
+    name = time.strftime('%Y%m%d-%H%M%S')
+    # nama tetap terurut secara leksikografis walaupun ada beberapa build dalam satu detik
+    suffix = 0
+    while os.path.exists(generation_path(root, name + ('' if suffix == 0 else '-%03d' % suffix))):
+        suffix += 1
+    name += '' if suffix == 0 else '-%03d' % suffix
+    path = generation_path(root, name)
+    os.makedirs(path)
+
+    current = current_generation(root)
+    if current is not None:
+        current_path = generation_path(root, current)
+        for file_name in os.listdir(current_path):
+            if file_name == 'build.manifest' or file_name.startswith('intermediate_'):
+                try:
+                    os.link(os.path.join(current_path, file_name), os.path.join(path, file_name))
+                except OSError:
+                    shutil.copy2(os.path.join(current_path, file_name), os.path.join(path, file_name))
+    return name
+
+def publish_generation(root, name, keep = 2):
+    """
+    Mengaktifkan generasi `name` secara atomik, lalu menghapus generasi lama
+    sehingga tersisa `keep` generasi terbaru. Generasi yang aktif sebelum
+    publish (dan yang lebih baru darinya) tidak pernah dihapus, walaupun
+    melebihi `keep`: worker yang belum sempat swap masih membacanya.
+    """
+    previous = current_generation(root)
+    temporary_path = os.path.join(root, CURRENT_FILE + '.tmp')
+    with open(temporary_path, 'w', encoding = 'utf-8') as f:
+        f.write(name + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary_path, os.path.join(root, CURRENT_FILE))
+
+    names = sorted(os.listdir(os.path.join(root, GENERATIONS_DIR)))
+    for old_name in names[:max(0, len(names) - keep)]:
+        if old_name != name and previous is not None and old_name < previous:
+            shutil.rmtree(generation_path(root, old_name), ignore_errors = True)
+
+
+class Generation:
+    """
+    Satu generasi index yang dibuka oleh searcher: BSBIIndex (immutable) dan
+    TermSuggester-nya, beserta jumlah query yang sedang memakainya.
+    """
+    def __init__(self, root, name, postings_encoding, **bsbi_kwargs):
+        self.name = name
+        self.path = generation_path(root, name)
+        self.bsbi_index = BSBIIndex(data_dir = bsbi_kwargs.pop('data_dir', 'collection'), output_dir = self.path,
+                                    postings_encoding = postings_encoding, immutable = True, **bsbi_kwargs)
+        self.suggester = None
+        self.refs = 0
+        self.retired = False
+
+    def warm(self, warm_queries = ()):
+        """
+        Memuat lexicon (terms.dict, docs.table, suggest.dict, filters.dict), membaca semua
+        file generasi ke page cache OS, lalu menjalankan warm_queries (yang
+        juga menginisialisasi stemmer dan spelling corrector).
+        """
+        self.bsbi_index.load()
+        self.suggester = TermSuggester(self.path).load()
+        filter_index = FilterIndex(self.path)
+        if os.path.exists(filter_index.file_path):
+            self.bsbi_index.filter_index = filter_index.load()
+        for file_name in os.listdir(self.path):
+            if file_name.startswith('intermediate_'):
+                continue
+            with open(os.path.join(self.path, file_name), 'rb') as f:
+                while f.read(1 << 20):
+                    pass
+        for query in warm_queries:
+            self.bsbi_index.retrieve_bm25(query, k = 10)
+        return self
+
+
+class GenerationSearcher:
+    """
+    Memberikan generasi index yang aktif ke setiap query dan melakukan hot-swap
+    ketika CURRENT berubah.
+
+    Pemakaian:
+
+        searcher = GenerationSearcher('index', VBEPostings).start()
+        with searcher.acquire() as generation:
+            generation.bsbi_index.retrieve_bm25(query)
+
+    Parameters
+    ----------
+    root: str
+        Directory yang berisi CURRENT dan generations/
+    warm_queries: List[str]
+        Query yang dijalankan terhadap generasi baru sebelum di-swap
+    bsbi_kwargs:
+        Argumen tambahan untuk BSBIIndex (misal positional)
+    """
+    def __init__(self, root, postings_encoding, warm_queries = (), **bsbi_kwargs):
+        self.root = root
+        self.postings_encoding = postings_encoding
+        self.warm_queries = list(warm_queries)
+        self.bsbi_kwargs = bsbi_kwargs
+        self.lock = threading.Lock()
+        self.active = None
+        self.warming = None
+        self.stats = {"swaps": 0, "released": 0, "warm_seconds": None, "warm_errors": 0}
+        self.stop_event = threading.Event()
+        self.poller = None
+
+        name = current_generation(root)
+        if name is None:
+            raise FileNotFoundError("tidak ada generasi aktif di " + os.path.join(root, CURRENT_FILE))
+        # generasi pertama di-warm tanpa warm_queries, supaya startup tetap cepat
+        self.active = self.open_generation(name).warm()
+
+    def open_generation(self, name):
+        return Generation(self.root, name, self.postings_encoding, **dict(self.bsbi_kwargs))
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """Context manager yang menghasilkan Generation aktif dan memegang reference-nya"""
+        with self.lock:
+            generation = self.active
+            generation.refs += 1
+        try:
+            yield generation
+        finally:
+            with self.lock:
+                generation.refs -= 1
+                self.release_if_unused(generation)
+
+    def release_if_unused(self, generation):
+        """Dipanggil dengan self.lock dipegang"""
+        if generation.retired and generation.refs == 0:
+            # mmap docs.table ditutup sekarang, bukan menunggu garbage collector,
+            # supaya file generasi yang sudah di-prune benar-benar dilepas
+            generation.bsbi_index.close()
+            generation.bsbi_index = None
+            generation.suggester = None
+            self.stats["released"] += 1
+
+    def refresh(self, wait = False):
+        """
+        Memeriksa CURRENT; jika menunjuk generasi lain dan belum ada generasi
+        yang sedang di-warm, generasi tersebut di-warm di background thread lalu
+        di-swap. wait=True menunggu warm + swap selesai (untuk testing).
+        """
+        name = current_generation(self.root)
+        with self.lock:
+            if name is None or name == self.active.name or self.warming is not None:
+                return
+            self.warming = threading.Thread(target = self.warm_and_swap, args = (name,), daemon = True)
+            warming = self.warming
+        warming.start()
+        if wait:
+            warming.join()
+
+    def warm_and_swap(self, name):
+        start = time.perf_counter()
+        try:
+            generation = self.open_generation(name).warm(self.warm_queries)
+        except Exception:
+            # generasi rusak atau terhapus: tetap di generasi lama, dicoba lagi saat refresh berikutnya
+            with self.lock:
+                self.stats["warm_errors"] += 1
+                self.warming = None
+            return
+        with self.lock:
+            old, self.active = self.active, generation
+            old.retired = True
+            self.release_if_unused(old)
+            self.stats["swaps"] += 1
+            self.stats["warm_seconds"] = round(time.perf_counter() - start, 4)
+            self.warming = None
+
+    def start(self, poll_interval = 2.0):
+        """Menjalankan thread yang memanggil refresh() setiap poll_interval detik"""
+        def poll():
+            while not self.stop_event.wait(poll_interval):
+                self.refresh()
+        self.poller = threading.Thread(target = poll, daemon = True)
+        self.poller.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.poller is not None:
+            self.poller.join()
+            self.poller = None
+
+    def status(self):
+        with self.lock:
+            return {"generation": self.active.name, "in_flight": self.active.refs,
+                    "warming": self.warming is not None, **self.stats}
+
+
+if __name__ == "__main__":
+
+    import sys
+    import argparse
+    import tempfile
+    from compression import VBEPostings
+
+    if len(sys.argv) > 1 and sys.argv[1] == "build":
+        parser = argparse.ArgumentParser()
+        parser.add_argument("command")
+        parser.add_argument("--root", default = "index")
+        parser.add_argument("--data-dir", default = "collection")
+        parser.add_argument("--keep", type = int, default = 2, help = "banyaknya generasi yang disimpan")
+        args = parser.parse_args()
+
+        name = new_generation(args.root)
+        BSBIIndex(data_dir = args.data_dir, output_dir = generation_path(args.root, name),
+                  postings_encoding = VBEPostings).index()
+        publish_generation(args.root, name, keep = args.keep)
+        print("generasi aktif:", name)
+        sys.exit(0)
+
+    # generasi dibuat dengan menyalin index yang sudah ada (tanpa build ulang)
+    with tempfile.TemporaryDirectory() as tmp:
+        def copy_index_generation():
+            name = new_generation(tmp)
+            for file_name in ['terms.dict', 'docs.table', 'suggest.dict', 'main_index.index', 'main_index.dict']:
+                shutil.copy2(os.path.join('index', file_name), os.path.join(generation_path(tmp, name), file_name))
+            return name
+
+        first = copy_index_generation()
+        publish_generation(tmp, first)
+        assert current_generation(tmp) == first, "publish salah"
+        searcher = GenerationSearcher(tmp, VBEPostings)
+
+        with searcher.acquire() as generation:
+            assert generation.name == first and searcher.status()["in_flight"] == 1, "acquire salah"
+            second = copy_index_generation()
+            publish_generation(tmp, second)
+            searcher.refresh(wait = True)
+            # query yang sedang berjalan tetap memakai generasi lama
+            assert generation.bsbi_index is not None and generation.bsbi_index.output_dir.endswith(first), "swap terlalu dini"
+            with searcher.acquire() as new_generation_:
+                assert new_generation_.name == second, "swap salah"
+        assert generation.retired and generation.bsbi_index is None, "generasi lama tidak dilepas"
+        assert searcher.status()["swaps"] == 1 and searcher.status()["released"] == 1, "stats salah"
+
+        third = copy_index_generation()
+        publish_generation(tmp, third, keep = 2)
+        assert sorted(os.listdir(os.path.join(tmp, GENERATIONS_DIR))) == sorted([second, third]), "prune salah"
+        # generasi yang aktif sebelum publish tetap disimpan walaupun keep = 1
+        fourth = copy_index_generation()
+        publish_generation(tmp, fourth, keep = 1)
+        assert sorted(os.listdir(os.path.join(tmp, GENERATIONS_DIR))) == sorted([third, fourth]), "prune salah"
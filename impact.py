@@ -0,0 +1,172 @@
+import os
+import math
+import heapq
+import pickle
+
+from index import InvertedIndexReader
+from bsbi import bm25_score
+
+class ImpactIndex:
+    """
+    Layout index alternatif yang impact-ordered, untuk retrieval
+    score-at-a-time (SaaT).
+
+    Saat build, score BM25 setiap posting di-precompute lalu dikuantisasi
+    menjadi integer 1..(2^bits - 1) ("impact"). Postings setiap term
+    dikelompokkan menjadi segment-segment dengan impact yang sama, disimpan
+    dari impact terbesar. Di dalam segment, docIDs terurut dan di-encode dengan
+    postings_encoding (misal VBEPostings, gap-based).
+
+    Saat query, semua segment dari semua term query diproses terurut dari
+    impact terbesar, dengan akumulator integer per dokumen. Tidak ada operasi
+    floating-point per posting. Karena segment ber-impact besar diproses lebih
+    dulu, pemrosesan bisa dihentikan kapan saja (postings budget) dan hasil
+    sementara sudah merupakan aproksimasi yang baik (anytime).
+
+    Attributes
+    ----------
+    segments_dict: Dictionary mapping
+            termID -> List[(impact, number_of_postings, start_position, length_in_bytes)]
+        terurut impact mengecil.
+    """
+    def __init__(self, bsbi_index, name = None, bits = 8):
+        self.bsbi_index = bsbi_index
+        name = name or bsbi_index.index_name
+        self.index_file_path = os.path.join(bsbi_index.output_dir, name + '.impact')
+        self.metadata_file_path = os.path.join(bsbi_index.output_dir, name + '.impactdict')
+        self.postings_encoding = bsbi_index.postings_encoding
+        self.bits = bits
+        self.segments_dict = {}
+        self.index_file = None
+
+    def __enter__(self):
+        return self.load()
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def build(self, k1=1.4, b=0.75):
+        """
+        Membangun impact-ordered index dari merged index BSBIIndex. Dilakukan
+        dua pass: pass pertama mencari score BM25 maksimum (untuk skala
+        kuantisasi), pass kedua menulis segment.
+        """
+        levels = 2 ** self.bits - 1
+        with InvertedIndexReader(self.bsbi_index.index_name, self.postings_encoding, self.bsbi_index.output_dir) as index:
+            doc_length = index.doc_length
+            N = len(doc_length)
+            avg_doc_length = sum(doc_length.values()) / N
+
+            def term_scores(postings_list, tf_list):
+                idf = math.log(N / len(postings_list))
+                return [bm25_score(tf, doc_length[doc_id], avg_doc_length, idf, k1, b)
+                        for doc_id, tf in zip(postings_list, tf_list)]
+
+            max_score = 0.
+            for _, postings_list, tf_list in index:
+                max_score = max(max_score, max(term_scores(postings_list, tf_list)))
+            max_score = max_score or 1.
+
+            index.reset()
+            self.segments_dict = {}
+            with open(self.index_file_path, 'wb') as index_file:
+                for term, postings_list, tf_list in index:
+                    segments = {}
+                    for doc_id, score in zip(postings_list, term_scores(postings_list, tf_list)):
+                        impact = max(1, int(round(score / max_score * levels)))
+                        segments.setdefault(impact, []).append(doc_id)
+                    self.segments_dict[term] = []
+                    for impact in sorted(segments, reverse = True):
+                        encoded = self.postings_encoding.encode(segments[impact])
+                        self.segments_dict[term].append((impact, len(segments[impact]), index_file.tell(), len(encoded)))
+                        index_file.write(encoded)
+
+        with open(self.metadata_file_path, 'wb') as f:
+            pickle.dump(self.segments_dict, f)
+
+    def load(self):
+        with open(self.metadata_file_path, 'rb') as f:
+            self.segments_dict = pickle.load(f)
+        self.index_file = open(self.index_file_path, 'rb')
+        return self
+
+    def close(self):
+        if self.index_file is not None:
+            self.index_file.close()
+            self.index_file = None
+
+    def read_segment(self, start_position, length_in_bytes):
+        self.index_file.seek(start_position)
+        return self.postings_encoding.decode(self.index_file.read(length_in_bytes))
+
+    def retrieve(self, query, k = 10, postings_budget = None):
+        """
+        Score-at-a-time retrieval.
+
+        Parameters
+        ----------
+        query: str
+        k: int
+        postings_budget: int
+            Jika diberikan, berhenti sebelum memproses segment yang membuat
+            jumlah postings yang diproses melebihi budget. Segment pertama
+            (impact terbesar) selalu diproses, walaupun melebihi budget.
+
+        Returns
+        -------
+        Tuple[List[(int, str)], bool]
+            (top-k (score integer, nama dokumen), exhaustive), dengan exhaustive
+            False jika pemrosesan dihentikan oleh budget.
+        """
+        self.bsbi_index.load()
+        query_tf = {}
+        for token in self.bsbi_index.analyze_query(query):
+            if token in self.bsbi_index.term_id_map:
+                term_id = self.bsbi_index.term_id_map[token]
+                if term_id in self.segments_dict:
+                    query_tf[term_id] = query_tf.get(term_id, 0) + 1
+
+        # semua segment dari semua term query, impact (dikali tf di query) terbesar dulu
+        segments = [(impact * qtf, number_of_postings, start_position, length_in_bytes)
+                    for term_id, qtf in query_tf.items()
+                    for (impact, number_of_postings, start_position, length_in_bytes) in self.segments_dict[term_id]]
+        segments.sort(key = lambda x: -x[0])
+
+        accumulators = {}
+        processed = 0
+        exhaustive = True
+        for impact, number_of_postings, start_position, length_in_bytes in segments:
+            if postings_budget is not None and processed > 0 and processed + number_of_postings > postings_budget:
+                exhaustive = False
+                break
+            for doc_id in self.read_segment(start_position, length_in_bytes):
+                accumulators[doc_id] = accumulators.get(doc_id, 0) + impact
+            processed += number_of_postings
+
+        top = heapq.nsmallest(k, accumulators.items(), key = lambda x: (-x[1], x[0]))
+        return [(score, self.bsbi_index.doc_id_map[doc_id]) for (doc_id, score) in top], exhaustive
+
+
+if __name__ == "__main__":
+
+    import time
+    from bsbi import BSBIIndex
+    from compression import VBEPostings
+
+    BSBI_instance = BSBIIndex(data_dir = 'collection', \
+                              postings_encoding = VBEPostings, \
+                              output_dir = 'index')
+    ImpactIndex(BSBI_instance).build()
+
+    # bandingkan top-10 SaaT (dengan dan tanpa budget) terhadap BM25 TaaT biasa
+    with ImpactIndex(BSBI_instance) as impact_index, open("queries.txt") as file:
+        for qline in file:
+            query = " ".join(qline.strip().split()[1:])
+            exact = {doc for _, doc in BSBI_instance.retrieve_bm25(query, k = 10)}
+            for budget in [None, 1000, 200]:
+                start = time.perf_counter()
+                result, exhaustive = impact_index.retrieve(query, k = 10, postings_budget = budget)
+                elapsed = time.perf_counter() - start
+                overlap = len(exact & {doc for _, doc in result}) / max(1, len(exact))
+                print(f"{qline.split()[0]:4} budget={str(budget):5} overlap@10={overlap:.1f} "
+                      f"exhaustive={exhaustive!s:5} {1000 * elapsed:.2f} ms")
@@ -36,8 +36,17 @@ class InvertedIndex:
         List of terms IDs, untuk mengingat urutan terms yang dimasukan ke
         dalam Inverted Index.
 
+    positions_dict: Dictionary mapping (hanya untuk positional index):
+
+            termID -> (start_position_in_positions_file,
+                       length_in_bytes_of_positions)
+
+        Positions disimpan di file terpisah (.pos) dengan metadata terpisah
+        (.posdict), sehingga query yang tidak butuh posisi tidak membaca
+        atau memuat apa pun tentang positions.
+
     """
-    def __init__(self, index_name, postings_encoding, directory=''):
+    def __init__(self, index_name, postings_encoding, directory='', positional=False):
         """
         Parameters
         ----------
@@ -45,10 +54,17 @@ class InvertedIndex:
         postings_encoding : Lihat di compression.py, kandidatnya adalah StandardPostings,
                         GapBasedPostings, dsb.
         directory (str): directory dimana file index berada
+        positional (bool): jika True, writer juga menulis positions setiap posting,
+                        dan reader mengembalikan positions saat iterasi
         """
 
         self.index_file_path = os.path.join(directory, index_name+'.index')
         self.metadata_file_path = os.path.join(directory, index_name+'.dict')
+        self.positions_file_path = os.path.join(directory, index_name+'.pos')
+        self.positions_metadata_file_path = os.path.join(directory, index_name+'.posdict')
+        self.positional = positional
+        self.positions_file = None
+        self.positions_dict = {}
 
         self.postings_encoding = postings_encoding
         self.directory = directory
@@ -93,6 +109,9 @@ class InvertedIndex:
         """Menutup index_file dan menyimpan postings_dict dan terms ketika keluar context"""
         # Menutup index file
         self.index_file.close()
+        if self.positions_file is not None:
+            self.positions_file.close()
+            self.positions_file = None
 
         # Menyimpan metadata (postings dict dan terms) ke file metadata dengan bantuan pickle
         with open(self.metadata_file_path, 'wb') as f:
@@ -107,12 +126,43 @@ class InvertedIndexReader(InvertedIndex):
     def __iter__(self):
         return self
 
+    def __enter__(self):
+        super().__enter__()
+        if self.positional:
+            self.open_positions()
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        """
+        Hanya menutup file. Reader tidak mengubah metadata, jadi metadata tidak
+        ditulis ulang: reader lain (misal worker di parallel.py atau proses
+        gunicorn lain) yang sedang membaca file metadata tidak pernah melihat
+        file yang setengah tertulis.
+        """
+        self.index_file.close()
+        if self.positions_file is not None:
+            self.positions_file.close()
+            self.positions_file = None
+
+    def open_positions(self):
+        """
+        Membuka file positions beserta metadata-nya. Dipanggil otomatis jika
+        reader dibuat dengan positional=True, atau secara lazy saat
+        get_positions_list(..) pertama kali dipanggil.
+        """
+        if self.positions_file is None:
+            self.positions_file = open(self.positions_file_path, 'rb')
+            with open(self.positions_metadata_file_path, 'rb') as f:
+                self.positions_dict = pickle.load(f)
+
     def reset(self):
         """
         Kembalikan file pointer ke awal, dan kembalikan pointer iterator
         term ke awal
         """
         self.index_file.seek(0)
+        if self.positions_file is not None:
+            self.positions_file.seek(0)
         self.term_iter = self.terms.__iter__() # reset term iterator
 
     def __next__(self): 
@@ -129,11 +179,18 @@ class InvertedIndexReader(InvertedIndex):
         PERHATIAN! method ini harus mengembalikan sebagian kecil data dari
         file index yang besar. Mengapa hanya sebagian kecil? karena agar muat
         diproses di memori. JANGAN MEMUAT SEMUA INDEX DI MEMORI!
+
+        Untuk positional index, yang dikembalikan adalah 4-tuple
+        (term, postings_list, tf_list, positions_lists).
         """
         curr_term = next(self.term_iter)
         pos, number_of_postings, len_in_bytes_of_postings, len_in_bytes_of_tf = self.postings_dict[curr_term]
         postings_list = self.postings_encoding.decode(self.index_file.read(len_in_bytes_of_postings))
         tf_list = self.postings_encoding.decode_tf(self.index_file.read(len_in_bytes_of_tf))
+        if self.positional:
+            _, len_in_bytes_of_positions = self.positions_dict[curr_term]
+            positions_lists = self.postings_encoding.decode_positions(self.positions_file.read(len_in_bytes_of_positions), tf_list)
+            return (curr_term, postings_list, tf_list, positions_lists)
         return (curr_term, postings_list, tf_list)
 
     def get_postings_list(self, term):
@@ -160,6 +217,21 @@ class InvertedIndexReader(InvertedIndex):
         tf_list = self.postings_encoding.decode_tf(encoded_tf_list)
         return postings_list, tf_list
 
+    def get_positions_list(self, term, tf_list = None):
+        """
+        Kembalikan positions untuk setiap posting dari sebuah term, berupa
+        List[List[int]] yang sejajar dengan postings list term tersebut.
+        tf_list (hasil get_postings_list) dibutuhkan untuk memecah positions
+        per posting; jika tidak diberikan, akan dibaca dari index.
+        """
+        self.open_positions()
+        if tf_list is None:
+            _, tf_list = self.get_postings_list(term)
+        start_position_in_positions_file, length_in_bytes_of_positions = self.positions_dict[term]
+        self.positions_file.seek(start_position_in_positions_file)
+        encoded_positions = self.positions_file.read(length_in_bytes_of_positions)
+        return self.postings_encoding.decode_positions(encoded_positions, tf_list)
+
 
 class InvertedIndexWriter(InvertedIndex):
     """
@@ -168,9 +240,17 @@ class InvertedIndexWriter(InvertedIndex):
     """
     def __enter__(self):
         self.index_file = open(self.index_file_path, 'wb+')
+        if self.positional:
+            self.positions_file = open(self.positions_file_path, 'wb+')
         return self
 
-    def append(self, term, postings_list, tf_list):
+    def __exit__(self, exception_type, exception_value, traceback):
+        super().__exit__(exception_type, exception_value, traceback)
+        if self.positional:
+            with open(self.positions_metadata_file_path, 'wb') as f:
+                pickle.dump(self.positions_dict, f)
+
+    def append(self, term, postings_list, tf_list, positions_lists = None):
         """
         Menambahkan (append) sebuah term, postings_list, dan juga TF list 
         yang terasosiasi ke posisi akhir index file.
@@ -205,6 +285,9 @@ class InvertedIndexWriter(InvertedIndex):
             List of docIDs dimana term muncul
         tf_list: List[Int]
             List of term frequencies
+        positions_lists: List[List[Int]]
+            (hanya untuk positional index) positions_lists[i] adalah sorted list
+            posisi term di dokumen postings_list[i]; panjangnya sama dengan tf_list[i]
         """
         # Append term pada terms.
         self.terms.append(term)
@@ -232,6 +315,82 @@ class InvertedIndexWriter(InvertedIndex):
         # write ke file index
         self.index_file.write(encoded_postings_list); self.index_file.write(encoded_tf_list)
 
+        # positions ditulis ke stream terpisah
+        if self.positional:
+            encoded_positions = self.postings_encoding.encode_positions(positions_lists)
+            self.positions_dict[term] = (self.positions_file.tell(), len(encoded_positions))
+            self.positions_file.write(encoded_positions)
+
+
+class ForwardIndex:
+    """
+    Forward index: untuk setiap dokumen disimpan term vector-nya, yaitu sorted
+    list of termIDs yang muncul di dokumen beserta TF masing-masing. Dipakai
+    untuk pseudo-relevance feedback (RM3) dan "more like this" tanpa membaca
+    ulang dan men-stem ulang file dokumen.
+
+    Format file sama seperti InvertedIndex dengan peran term dan dokumen
+    ditukar: termIDs di-encode dengan postings_encoding.encode (sudah terurut,
+    jadi gap-based encoding efektif) dan TF dengan encode_tf.
+
+    Attributes
+    ----------
+    doc_dict: Dictionary mapping
+            docID -> (start_position_in_index_file,
+                      number_of_terms,
+                      length_in_bytes_of_term_list,
+                      length_in_bytes_of_tf_list)
+    """
+    def __init__(self, index_name, postings_encoding, directory=''):
+        self.index_file_path = os.path.join(directory, index_name+'.fwd')
+        self.metadata_file_path = os.path.join(directory, index_name+'.fwddict')
+        self.postings_encoding = postings_encoding
+        self.doc_dict = {}
+        self.index_file = None
+
+
+class ForwardIndexReader(ForwardIndex):
+    def __enter__(self):
+        self.index_file = open(self.index_file_path, 'rb')
+        with open(self.metadata_file_path, 'rb') as f:
+            self.doc_dict = pickle.load(f)
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.index_file.close()
+
+    def get_term_vector(self, doc_id):
+        """
+        Kembalikan (term_list, tf_list) dari dokumen doc_id; keduanya kosong
+        jika dokumen tidak punya term (atau tidak ada di index).
+        """
+        if doc_id not in self.doc_dict:
+            return [], []
+        start_position_in_index_file, _, length_in_bytes_of_term_list, length_in_bytes_of_tf_list = self.doc_dict[doc_id]
+        self.index_file.seek(start_position_in_index_file)
+        term_list = self.postings_encoding.decode(self.index_file.read(length_in_bytes_of_term_list))
+        tf_list = self.postings_encoding.decode_tf(self.index_file.read(length_in_bytes_of_tf_list))
+        return term_list, tf_list
+
+
+class ForwardIndexWriter(ForwardIndex):
+    def __enter__(self):
+        self.index_file = open(self.index_file_path, 'wb')
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.index_file.close()
+        with open(self.metadata_file_path, 'wb') as f:
+            pickle.dump(self.doc_dict, f)
+
+    def append(self, doc_id, term_list, tf_list):
+        """Menambahkan term vector dokumen doc_id (term_list harus terurut)"""
+        encoded_term_list = self.postings_encoding.encode(term_list)
+        encoded_tf_list = self.postings_encoding.encode_tf(tf_list)
+        self.doc_dict[doc_id] = (self.index_file.tell(), len(term_list), len(encoded_term_list), len(encoded_tf_list))
+        self.index_file.write(encoded_term_list)
+        self.index_file.write(encoded_tf_list)
+
 
 if __name__ == "__main__":
 
@@ -255,3 +414,33 @@ if __name__ == "__main__":
         index.index_file.seek(index.postings_dict[2][0])
         assert VBEPostings.decode(index.index_file.read(len(VBEPostings.encode([3,4,5])))) == [3,4,5], "terdapat kesalahan"
         assert VBEPostings.decode_tf(index.index_file.read(len(VBEPostings.encode_tf([34,23,56])))) == [34,23,56], "terdapat kesalahan"
+
+    with InvertedIndexWriter('test_pos', postings_encoding=VBEPostings, directory='./tmp/', positional=True) as index:
+        index.append(1, [2, 3], [2, 1], [[4, 9], [0]])
+        index.append(2, [3, 4, 5], [1, 2, 1], [[7], [1, 3], [12]])
+
+    with InvertedIndexReader('test_pos', postings_encoding=VBEPostings, directory='./tmp/') as index:
+        assert index.get_postings_list(2) == ([3, 4, 5], [1, 2, 1]), "terdapat kesalahan"
+        assert index.get_positions_list(2) == [[7], [1, 3], [12]], "positions salah"
+        assert index.get_positions_list(1, [2, 1]) == [[4, 9], [0]], "positions salah"
+
+    with InvertedIndexReader('test_pos', postings_encoding=VBEPostings, directory='./tmp/', positional=True) as index:
+        assert list(index) == [(1, [2, 3], [2, 1], [[4, 9], [0]]),
+                               (2, [3, 4, 5], [1, 2, 1], [[7], [1, 3], [12]])], "iterasi positional index salah"
+
+        # positions dokumen yang lolos filter harus sama dengan positions tanpa filter
+        from bsbi import doc_positions, restrict_postings
+        full_postings = index.get_postings_list(2)
+        unfiltered = doc_positions(index, 2, full_postings)
+        restricted = restrict_postings(full_postings, [4, 5])
+        filtered = doc_positions(index, 2, full_postings, restricted[0])
+        assert filtered == {4: unfiltered[4], 5: unfiltered[5]} == {4: [1, 3], 5: [12]}, \
+            "positions dokumen yang difilter salah"
+
+    with ForwardIndexWriter('test', postings_encoding=VBEPostings, directory='./tmp/') as forward_index:
+        forward_index.append(3, [1, 2], [4, 34])
+        forward_index.append(5, [2], [56])
+    with ForwardIndexReader('test', postings_encoding=VBEPostings, directory='./tmp/') as forward_index:
+        assert forward_index.get_term_vector(5) == ([2], [56]), "forward index salah"
+        assert forward_index.get_term_vector(3) == ([1, 2], [4, 34]), "forward index salah"
+        assert forward_index.get_term_vector(4) == ([], []), "forward index salah"
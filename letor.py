@@ -1,30 +1,43 @@
-import numpy as np
-import lightgbm
+import os
 
-from gensim.models import TfidfModel
-from gensim.models import LsiModel
-from gensim.corpora import Dictionary
-from scipy.spatial.distance import cosine
+import numpy as np
 import random
 
+# gensim dan lightgbm di-import di dalam method yang membutuhkannya, supaya
+# import modul ini (misal oleh search service) tetap ringan
+
 class Letor:
 
+    NUM_LATENT_TOPICS = 200
+    # data training LETOR (NFCorpus); train.docs tidak ikut di repo karena
+    # ukurannya, dan hanya dibutuhkan untuk melatih ranker, bukan untuk LSI
+    # semantic search (lihat embedding.py)
+    TRAIN_DOCS = "nfcorpus/train.docs"
+
     def __init__(self):
+        self.dictionary = None
+        self.model = None
         self.documents = {}
         self.queries = {}
         self.q_docs_rel = {}
         self.X = []
         self.Y = []
         self.group_qid_count = []
+        self.dataset = []
+        # ranker yang sudah dilatih (lihat load), beserta directory LSI-nya
+        self.ranker = None
+        self.lsi_dir = None
 
     def load_dataset(self):
         NUM_NEGATIVES = 1
+        if not os.path.exists(self.TRAIN_DOCS):
+            raise FileNotFoundError(self.TRAIN_DOCS + " tidak ditemukan; unduh NFCorpus untuk melatih ranker")
         with open("nfcorpus/train.vid-desc.queries") as file:
             for line in file:
                 q_id, content = line.split("\t")
                 self.queries[q_id] = content.split()
         
-        with open("nfcorpus/train.docs") as file:
+        with open(self.TRAIN_DOCS) as file:
             for line in file:
                 doc_id, content = line.split("\t")
                 self.documents[doc_id] = content.split()
@@ -37,7 +50,7 @@ class Letor:
                     self.q_docs_rel[q_id].append((doc_id, int(rel)))
 
             # group_qid_count untuk model LGBMRanker
-            dataset = []
+            self.dataset = dataset = []
             for q_id in self.q_docs_rel:
                 docs_rels = self.q_docs_rel[q_id]
                 self.group_qid_count.append(len(docs_rels) + NUM_NEGATIVES)
@@ -46,31 +59,78 @@ class Letor:
                 # tambahkan satu negative (random sampling saja dari documents)
                 dataset.append((self.queries[q_id], random.choice(list(self.documents.values())), 0))
 
-    def build_model(self):
-        self.load_dataset()
-        NUM_LATENT_TOPICS = 200
+    def build_lsi(self, documents = None):
+        """
+        Melatih model LSI (200 latent topics) dari documents (iterable of list
+        of tokens; default self.documents hasil load_dataset). Model dan
+        dictionary disimpan sebagai atribut agar bisa dipakai ulang oleh
+        vector_rep(..) maupun oleh tahap indexing embedding (embedding.py).
+        """
+        from gensim.models import LsiModel
+        from gensim.corpora import Dictionary
+
+        if documents is None:
+            documents = self.documents.values()
+        self.dictionary = Dictionary()
+        bow_corpus = [self.dictionary.doc2bow(doc, allow_update = True) for doc in documents]
+        self.model = LsiModel(bow_corpus, num_topics = self.NUM_LATENT_TOPICS) # 200 latent topics
+
+    def save_lsi(self, directory):
+        """Menyimpan model LSI dan dictionary-nya ke directory (biasanya index/)"""
+        self.model.save(os.path.join(directory, 'lsi.model'))
+        self.dictionary.save(os.path.join(directory, 'lsi.dict'))
+
+    def load_lsi(self, directory):
+        """Memuat model LSI dan dictionary-nya yang disimpan oleh save_lsi(..)"""
+        from gensim.models import LsiModel
+        from gensim.corpora import Dictionary
+
+        self.model = LsiModel.load(os.path.join(directory, 'lsi.model'))
+        self.dictionary = Dictionary.load(os.path.join(directory, 'lsi.dict'))
+
+    def vector_rep(self, text):
+        """
+        Representasi vector LSI dari sebuah list of tokens. Jika model tidak
+        menghasilkan nilai untuk semua topik, dikembalikan zero vector.
+        """
+        rep = [topic_value for (_, topic_value) in self.model[self.dictionary.doc2bow(text)]]
+        return rep if len(rep) == self.NUM_LATENT_TOPICS else [0.] * self.NUM_LATENT_TOPICS
 
-        dictionary = Dictionary()
-        bow_corpus = [dictionary.doc2bow(doc, allow_update = True) for doc in self.documents.values()]
-        model = LsiModel(bow_corpus, num_topics = NUM_LATENT_TOPICS) # 200 latent topics
+    def features(self, query, doc, v_d = None):
+        """
+        Fitur untuk pasangan (query, doc): v_q + v_d + [jaccard] + [cosine_dist].
+
+        Jika v_d diberikan (misal satu baris dari DocumentEmbeddings), proyeksi
+        LSI dokumen tidak dihitung ulang dari teks; cukup row lookup dan dot product.
+        """
+        v_q = self.vector_rep(query)
+        if v_d is None:
+            v_d = self.vector_rep(doc)
+        else:
+            v_d = [float(x) for x in v_d]
+        q = set(query)
+        d = set(doc)
+        cosine_dist = cosine_distance(v_q, v_d)
+        jaccard = len(q & d) / len(q | d)
+        return v_q + v_d + [jaccard] + [cosine_dist]
+
+    def build_model(self, lsi_dir = None):
+        """
+        Menyiapkan X dan Y untuk ranker. Jika lsi_dir diberikan, fitur LSI
+        dihitung dengan model yang disimpan save_lsi(..) di directory tersebut
+        (misal LSI koleksi dari embedding.py), bukan LSI yang dilatih dari NFCorpus.
+        """
+        if not self.dataset:
+            self.load_dataset()
+        if lsi_dir is None:
+            self.build_lsi()
+        else:
+            self.load_lsi(lsi_dir)
 
-        # test melihat representasi vector dari sebuah dokumen & query
-        def vector_rep(text):
-            rep = [topic_value for (_, topic_value) in model[dictionary.doc2bow(text)]]
-            return rep if len(rep) == NUM_LATENT_TOPICS else [0.] * NUM_LATENT_TOPICS
         X = []
         Y = []
-        def features(query, doc):
-            v_q = vector_rep(query)
-            v_d = vector_rep(doc)
-            q = set(query)
-            d = set(doc)
-            cosine_dist = cosine(v_q, v_d)
-            jaccard = len(q & d) / len(q | d)
-            return v_q + v_d + [jaccard] + [cosine_dist]
-
         for (query, doc, rel) in self.dataset:
-            X.append(features(query, doc))
+            X.append(self.features(query, doc))
             Y.append(rel)
 
         # ubah X dan Y ke format numpy array
@@ -78,6 +138,8 @@ class Letor:
         self.Y = np.array(Y)
     
     def train_and_predict(self):
+        import lightgbm
+
         ranker = lightgbm.LGBMRanker(
                     objective="lambdarank",
                     boosting_type = "gbdt",
@@ -96,14 +158,33 @@ class Letor:
         return ranker
 
     
-    def load(self, query, docs):
-        self.build_model()
-        ranker = self.train_and_predict()
+    def load(self, query, docs, embeddings = None, lsi_dir = None):
+        """
+        Melakukan re-ranking terhadap docs, berupa list of (doc id, teks dokumen).
+
+        Jika embeddings (instance DocumentEmbeddings) diberikan, doc id harus
+        berupa doc ID integer pada BSBIIndex.doc_id_map, dan representasi LSI
+        dokumen diambil langsung dari matrix yang sudah di-precompute. LSI untuk
+        query (dan data training ranker) kemudian dimuat dari output directory
+        embeddings, supaya v_q dan v_d berada di ruang LSI yang sama; lsi_dir
+        bisa diberikan secara eksplisit.
+
+        Ranker dilatih sekali pada pemanggilan pertama dan dipakai ulang
+        selama directory LSI-nya tidak berubah.
+        """
+        if lsi_dir is None and embeddings is not None:
+            lsi_dir = embeddings.output_dir
+        if self.ranker is None or self.lsi_dir != lsi_dir:
+            self.build_model(lsi_dir)
+            self.ranker = self.train_and_predict()
+            self.lsi_dir = lsi_dir
+        ranker = self.ranker
         X_unseen = []
         for doc_id, doc in docs:
-            X_unseen.append(self.features(query.split(), doc.split()))
+            v_d = embeddings[doc_id] if embeddings is not None else None
+            X_unseen.append(self.features(query.split(), doc.split(), v_d))
 
-            X_unseen = np.array(X_unseen)
+        X_unseen = np.array(X_unseen)
         scores = ranker.predict(X_unseen)
         did_scores = [x for x in zip([did for (did, _) in docs], scores)]
         sorted_did_scores = sorted(did_scores, key = lambda tup: tup[1], reverse = True)
@@ -113,12 +194,17 @@ class Letor:
         
         for (did, score) in sorted_did_scores:
             print(did, score)
+        return sorted_did_scores
 
-        def features(self, query, doc):
-            v_q = self.vector_rep(query)
-            v_d = self.vector_rep(doc)
-            q = set(query)
-            d = set(doc)
-            cosine_dist = cosine(v_q, v_d)
-            jaccard = len(q & d) / len(q | d)
-            return v_q + v_d + [jaccard] + [cosine_dist]
+
+def cosine_distance(u, v):
+    """
+    Cosine distance (1 - cosine similarity) antara dua vector, dihitung dengan
+    satu dot product. Zero vector dianggap berjarak 1 dari vector apa pun.
+    """
+    u = np.asarray(u, dtype = np.float32)
+    v = np.asarray(v, dtype = np.float32)
+    norm = float(np.linalg.norm(u) * np.linalg.norm(v))
+    if norm == 0.:
+        return 1.
+    return 1. - float(np.dot(u, v)) / norm
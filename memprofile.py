@@ -0,0 +1,238 @@
+"""
+Memory accounting (opt-in) untuk indexing dan serving.
+
+    MemoryProfiler     tracemalloc + RSS per tahap (stage); dipakai
+                       BSBIIndex.index() jika bsbi_index.memory_profiler diisi
+    deep_sizeof        estimasi ukuran sebuah struktur data (jumlah object dan
+                       bytes, rekursif), dengan memory yang di-mmap (DocTable)
+                       dihitung terpisah karena berasal dari page cache file
+    index_components   breakdown per komponen BSBIIndex: IdMap, DocTable,
+                       metadata InvertedIndex (postings_dict, terms,
+                       doc_length), filter, suggester, spelling corrector
+
+Mengukur memory indexing:
+
+    python memprofile.py index [--output-dir index] [--top 10]
+
+Di service (app/main.py), MEMORY_PROFILE=1 menyalakan tracemalloc saat worker
+start, dan /memory mengembalikan breakdown live.
+"""
+import io
+import os
+import sys
+import time
+import types
+import mmap
+import array
+import tracemalloc
+import contextlib
+
+from index import InvertedIndexReader
+
+def rss_bytes():
+    """(RSS sekarang, peak RSS seumur proses) dalam bytes; None jika tidak tersedia"""
+    current = peak = None
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            current = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux melaporkan KB, macOS bytes
+        peak = peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        pass
+    return current, peak
+
+# object yang tidak ikut dihitung: dimiliki bersama oleh seluruh proses
+_SHARED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                 types.MethodType, io.IOBase)
+
+def deep_sizeof(obj):
+    """
+    Estimasi memory sebuah struktur data: sys.getsizeof setiap object yang
+    bisa dicapai (isi dict/list/tuple/set dan atribut object), masing-masing
+    dihitung sekali.
+
+    Returns
+    -------
+    Dict[str, int]
+        {"objects": .., "bytes": .., "mapped": bytes memoryview/mmap (file-backed)}
+    """
+    seen = set()
+    stack = [obj]
+    objects = size = mapped = 0
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, _SHARED_TYPES):
+            continue
+        seen.add(id(o))
+        objects += 1
+        size += sys.getsizeof(o)
+        if isinstance(o, (str, bytes, bytearray, int, float, bool, array.array)) or o is None:
+            continue
+        if isinstance(o, (memoryview, mmap.mmap)):
+            mapped += o.nbytes if isinstance(o, memoryview) else len(o)
+        elif isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif hasattr(o, 'nbytes') and hasattr(o, 'dtype'):
+            # numpy array: getsizeof sudah termasuk buffer jika array memilikinya
+            continue
+        else:
+            if hasattr(o, '__dict__'):
+                stack.append(o.__dict__)
+            for slot in getattr(type(o), '__slots__', ()):
+                if hasattr(o, slot):
+                    stack.append(getattr(o, slot))
+    return {"objects": objects, "bytes": size, "mapped": mapped}
+
+def index_components(bsbi_index, include_metadata = True):
+    """
+    Breakdown memory per komponen sebuah BSBIIndex. Komponen yang belum dimuat
+    (misal spelling corrector sebelum query pertama) tidak dilaporkan.
+
+    Metadata InvertedIndex tidak disimpan di BSBIIndex: setiap query memuatnya
+    dari main_index.dict dan melepasnya lagi. Dengan include_metadata=True
+    metadata dimuat sekali untuk diukur, sebagai ukuran memory per query
+    yang sedang berjalan.
+    """
+    components = {}
+    for name in ['term_id_map', 'doc_id_map', 'filter_index', 'spelling_corrector', 'parallel_scorer']:
+        value = getattr(bsbi_index, name, None)
+        if value is not None:
+            components[name] = deep_sizeof(value)
+    if include_metadata:
+        with InvertedIndexReader(bsbi_index.index_name, bsbi_index.postings_encoding, bsbi_index.output_dir) as index:
+            for name in ['postings_dict', 'terms', 'doc_length']:
+                components["per_query." + name] = deep_sizeof(getattr(index, name))
+    return components
+
+def top_allocations(snapshot, limit = 10, key_type = 'lineno'):
+    """limit lokasi alokasi terbesar di sebuah tracemalloc snapshot"""
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__),
+                                       tracemalloc.Filter(False, '<frozen importlib._bootstrap>')])
+    return [{"location": str(stat.traceback[0]), "bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics(key_type)[:limit]]
+
+
+class MemoryProfiler:
+    """
+    Mencatat memory setiap tahap (stage). Stage dengan nama yang sama
+    (misal "parse" untuk setiap block) digabung: durasi dijumlahkan,
+    peak diambil maksimumnya.
+
+    Untuk setiap stage dicatat:
+        seconds           total durasi
+        python_peak       peak memory yang dialokasikan Python (tracemalloc)
+                          selama stage
+        python_end        memory Python saat stage selesai
+        rss_end           RSS saat stage selesai
+        rss_peak          peak RSS proses saat stage selesai (naik jika
+                          stage ini membuat peak baru)
+        top               lokasi alokasi terbesar yang masih hidup saat stage
+                          selesai (misal td_pairs setelah "parse")
+
+    Parameters
+    ----------
+    frames: int
+        Kedalaman traceback tracemalloc
+    top: int
+        Banyaknya lokasi alokasi yang dicatat per stage (0 untuk mematikan)
+    """
+    def __init__(self, frames = 1, top = 5):
+        self.frames = frames
+        self.top = top
+        self.stages = {}
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        return self
+
+    def stop(self):
+        tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        self.start()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            rss_end, rss_peak = rss_bytes()
+            record = self.stages.setdefault(name, {"calls": 0, "seconds": 0., "python_peak": 0})
+            record["calls"] += 1
+            record["seconds"] = round(record["seconds"] + time.perf_counter() - start, 4)
+            record["python_peak"] = max(record["python_peak"], peak)
+            record["python_end"] = current
+            record["rss_end"] = rss_end
+            record["rss_peak"] = rss_peak
+            if self.top > 0 and peak >= record["python_peak"]:
+                record["top"] = top_allocations(tracemalloc.take_snapshot(), self.top)
+
+    def report(self):
+        lines = []
+        for name, record in self.stages.items():
+            lines.append(f"{name:16} calls={record['calls']:<4} {record['seconds']:8.2f}s "
+                         f"python_peak={record['python_peak'] / 2**20:8.1f}MB "
+                         f"python_end={record['python_end'] / 2**20:8.1f}MB "
+                         f"rss_peak={(record['rss_peak'] or 0) / 2**20:8.1f}MB")
+            for allocation in record.get("top", []):
+                lines.append(f"    {allocation['bytes'] / 2**20:8.2f}MB {allocation['count']:>9} objects  {allocation['location']}")
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+
+    import argparse
+    from util import IdMap
+
+    if len(sys.argv) > 1 and sys.argv[1] == "index":
+        from bsbi import BSBIIndex
+        from compression import VBEPostings
+
+        parser = argparse.ArgumentParser()
+        parser.add_argument("command")
+        parser.add_argument("--data-dir", default = "collection")
+        parser.add_argument("--output-dir", default = "index")
+        parser.add_argument("--top", type = int, default = 5, help = "lokasi alokasi terbesar per stage")
+        args = parser.parse_args()
+
+        BSBI_instance = BSBIIndex(data_dir = args.data_dir, output_dir = args.output_dir,
+                                  postings_encoding = VBEPostings)
+        BSBI_instance.memory_profiler = MemoryProfiler(top = args.top).start()
+        BSBI_instance.index()
+        print(BSBI_instance.memory_profiler.report())
+        for name, size in index_components(BSBI_instance).items():
+            print(f"{name:28} {size['objects']:>9} objects {size['bytes'] / 2**20:8.2f}MB "
+                  f"mapped={size['mapped'] / 2**20:.2f}MB")
+        sys.exit(0)
+
+    id_map = IdMap()
+    for term in ["halo", "semua", "orang"]:
+        id_map[term]
+    size = deep_sizeof(id_map)
+    assert size["objects"] >= 3 + 2 and size["bytes"] > sum(sys.getsizeof(t) for t in ["halo", "semua", "orang"]), \
+        "deep_sizeof IdMap salah"
+    shared = "x" * 1000
+    assert deep_sizeof([shared, shared])["bytes"] == sys.getsizeof([shared, shared]) + sys.getsizeof(shared), \
+        "object yang sama seharusnya dihitung sekali"
+    assert deep_sizeof(memoryview(bytearray(4096)))["mapped"] == 4096, "mapped salah"
+
+    profiler = MemoryProfiler(top = 3)
+    with profiler.stage("alloc"):
+        data = [str(i) * 10 for i in range(100000)]
+    with profiler.stage("free"):
+        data = None
+    assert profiler.stages["alloc"]["python_peak"] > 5 * 2**20, "tracemalloc peak salah"
+    assert profiler.stages["free"]["python_end"] < profiler.stages["alloc"]["python_end"], "python_end salah"
+    assert any("memprofile.py" in allocation["location"] for allocation in profiler.stages["alloc"]["top"]), "top salah"
+    profiler.stop()
+    print(profiler.report())
@@ -0,0 +1,174 @@
+"""
+Pagination hasil /search tanpa menghitung ulang ranking untuk setiap halaman.
+
+Untuk setiap query (beserta generasi index dan filter-nya) disimpan daftar
+kandidat top-N (score, nama dokumen) di CandidateCache (LRU). Halaman
+berikutnya cukup berupa slice dari daftar tersebut; retrieval baru dijalankan
+lagi hanya jika halaman yang diminta melewati ujung daftar, dan saat itu N
+digandakan (paling tidak sampai halaman tersebut), sehingga paging sampai
+kedalaman D hanya butuh O(log D) retrieval.
+
+Dua cara paging:
+
+    page=<p>&size=<n>        halaman ke-p (mulai dari 1)
+    search_after=<cursor>    n hasil setelah cursor; cursor untuk halaman
+                             berikutnya dikembalikan di header X-Search-After
+
+Cursor bersifat opaque (base64 dari score, nama dokumen dan rank hasil
+terakhir). Jika daftar kandidat di-rebuild (misal karena cache eviction atau
+generasi index berganti) dan hasil terakhir tidak lagi berada di rank yang
+sama, halaman berikutnya dimulai tepat setelah posisi barunya (dokumen dengan
+score seri tidak terlewat); hanya jika dokumen tersebut hilang, posisi dicari
+ulang berdasarkan score.
+"""
+import json
+import base64
+import binascii
+import threading
+import collections
+
+def encode_cursor(score, doc, rank):
+    payload = json.dumps([score, doc, rank], separators = (',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """(score, doc, rank) dari cursor; ValueError untuk cursor yang tidak valid"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        score, doc, rank = json.loads(payload.decode('utf-8'))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValueError("search_after tidak valid") from None
+    if not isinstance(score, (int, float)) or not isinstance(doc, str) or not isinstance(rank, int) or rank < 1:
+        raise ValueError("search_after tidak valid")
+    return float(score), doc, rank
+
+
+class CandidateCache:
+    """
+    Cache LRU: key -> [kandidat (score, doc) terurut rank, complete], dengan
+    complete True jika retrieval mengembalikan lebih sedikit dari yang diminta
+    (tidak ada kandidat lain di luar daftar).
+
+    Parameters
+    ----------
+    cache_size: int
+        Banyaknya query yang disimpan
+    initial_depth: int
+        Banyaknya kandidat yang diambil saat query pertama kali diminta
+    """
+
+    CACHE_SIZE = 128
+    INITIAL_DEPTH = 100
+
+    def __init__(self, cache_size = CACHE_SIZE, initial_depth = INITIAL_DEPTH):
+        self.cache_size = cache_size
+        self.initial_depth = initial_depth
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "extensions": 0}
+
+    def candidates(self, key, retrieve, depth):
+        """
+        (daftar kandidat, complete) untuk key, dengan paling tidak `depth`
+        kandidat kecuali complete. retrieve(k) mengembalikan top-k (score, doc)
+        dan dipanggil di luar lock.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                if entry[1] or len(entry[0]) >= depth:
+                    self.stats["hits"] += 1
+                    return entry[0], entry[1]
+                self.stats["extensions"] += 1
+                k = max(depth, 2 * len(entry[0]))
+            else:
+                self.stats["misses"] += 1
+                k = max(depth, self.initial_depth)
+        result = retrieve(k)
+        complete = len(result) < k
+        with self.lock:
+            self.entries[key] = [result, complete]
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.cache_size:
+                self.entries.popitem(last = False)
+        return result, complete
+
+    def page(self, key, retrieve, size, offset = 0, search_after = None):
+        """
+        `size` kandidat mulai dari rank offset + 1, atau setelah cursor
+        search_after (menggantikan offset). Mengembalikan (list of (score,
+        doc), cursor halaman berikutnya atau None jika tidak ada lagi).
+        """
+        if search_after is not None:
+            score, doc, rank = decode_cursor(search_after)
+            candidates, complete = self.candidates(key, retrieve, rank + size)
+            if rank <= len(candidates) and candidates[rank - 1] == (score, doc):
+                offset = rank
+            elif (score, doc) in candidates:
+                # daftar kandidat berubah: lanjut tepat setelah posisi baru hasil terakhir
+                offset = candidates.index((score, doc)) + 1
+            else:
+                # hasil terakhir tidak lagi ada: lanjut dari hasil pertama dengan score lebih kecil
+                offset = next((i for i, (s, d) in enumerate(candidates) if s < score), len(candidates))
+        else:
+            candidates, complete = self.candidates(key, retrieve, offset + size)
+
+        items = candidates[offset:offset + size]
+        last_rank = offset + len(items)
+        more = last_rank < len(candidates) or not complete
+        cursor = encode_cursor(items[-1][0], items[-1][1], last_rank) if items and more else None
+        return items, cursor
+
+
+if __name__ == "__main__":
+
+    ranking = [(float(100 - i), "doc%d" % i) for i in range(250)]
+    calls = []
+    def retrieve(k):
+        calls.append(k)
+        return ranking[:k]
+
+    assert decode_cursor(encode_cursor(1.5, "a/b.txt", 3)) == (1.5, "a/b.txt", 3), "cursor salah"
+    for invalid in ["", "!!!", encode_cursor(1.0, "a", 0)]:
+        try:
+            decode_cursor(invalid)
+            assert False, "cursor tidak valid seharusnya ditolak"
+        except ValueError:
+            pass
+
+    cache = CandidateCache(cache_size = 2, initial_depth = 100)
+    items, cursor = cache.page("q", retrieve, 10)
+    assert items == ranking[:10] and calls == [100], "halaman pertama salah"
+    items, _ = cache.page("q", retrieve, 10, offset = 90)
+    assert items == ranking[90:100] and calls == [100], "halaman dalam cache seharusnya tidak retrieve ulang"
+
+    # search_after sampai habis: daftar kandidat digandakan 100 -> 200 -> 400
+    seen = []
+    cursor = None
+    while True:
+        items, cursor = cache.page("q", retrieve, 30, search_after = cursor)
+        seen.extend(items)
+        if cursor is None:
+            break
+    assert seen == ranking and calls == [100, 200, 400], "search_after salah: " + str(calls)
+
+    # cursor tetap berlaku setelah cache eviction
+    _, cursor = cache.page("q", retrieve, 10)
+    cache.page("a", retrieve, 10)
+    cache.page("b", retrieve, 10)
+    assert "q" not in cache.entries, "LRU salah"
+    items, _ = cache.page("q", retrieve, 5, search_after = cursor)
+    assert items == ranking[10:15], "cursor setelah eviction salah"
+
+    # rank di cursor tidak cocok: posisi dicari berdasarkan score
+    items, _ = cache.page("q", retrieve, 3, search_after = encode_cursor(95.0, "doc5", 2))
+    assert items == ranking[6:9], "fallback cursor salah"
+
+    # score seri dengan hasil terakhir: dokumen setelahnya tidak boleh terlewat
+    tied = [(5.0, "a"), (3.0, "b"), (3.0, "c"), (3.0, "d"), (1.0, "e")]
+    cache = CandidateCache()
+    items, _ = cache.page("t", lambda k: tied[:k], 2, search_after = encode_cursor(3.0, "b", 1))
+    assert items == [(3.0, "c"), (3.0, "d")], "cursor dengan score seri salah: " + str(items)
+    items, _ = cache.page("t", lambda k: tied[:k], 2, search_after = encode_cursor(3.0, "x", 2))
+    assert items == [(1.0, "e")], "fallback score untuk dokumen yang hilang salah"
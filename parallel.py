@@ -0,0 +1,150 @@
+"""
+Intra-query parallelism: ruang doc ID [0, N) dipecah menjadi beberapa range,
+setiap range di-score (TaaT, sama seperti BSBIIndex.retrieve_bm25 /
+retrieve_tfidf) secara bersamaan di process pool, lalu top-k parsial dari
+setiap range digabung.
+
+Postings tidak punya skip data, jadi postings list di-decode sekali di proses
+pemanggil lalu dipotong per range dengan binary search (postings terurut doc
+ID); worker hanya menerima potongan untuk range-nya. doc_length dimuat sekali
+per worker saat pool dibuat, bukan dikirim per query.
+
+Hanya query dengan estimasi cost (jumlah df semua term query) paling tidak
+min_cost yang diparalelkan; query ringan lebih cepat dikerjakan langsung
+daripada membayar overhead pickling dan komunikasi antar proses.
+
+Pemakaian:
+
+    BSBI_instance.enable_parallel(workers = 8)
+    BSBI_instance.retrieve_bm25(query)
+"""
+import os
+import math
+import heapq
+import bisect
+import itertools
+import multiprocessing
+import concurrent.futures
+
+from index import InvertedIndexReader
+from util import sorted_merge_posts_and_tfs
+
+# doc ID -> panjang dokumen, dimuat oleh init_worker di setiap proses worker
+_doc_length = None
+
+def init_worker(index_name, postings_encoding, output_dir):
+    global _doc_length
+    with InvertedIndexReader(index_name, postings_encoding, output_dir) as index:
+        _doc_length = index.doc_length
+
+def score_range(scheme, terms, avg_doc_length, k, k1, b, allowed):
+    """
+    Dijalankan di worker: TaaT untuk potongan postings satu range doc ID.
+
+    terms adalah list of (postings_list, tf_list, idf) yang sudah terurut
+    seperti urutan akumulasi di BSBIIndex (df mengecil ke membesar), sehingga
+    penjumlahan floating-point-nya identik dengan scoring tanpa partisi.
+    Mengembalikan top-k (score, doc ID), terurut score mengecil lalu doc ID.
+    """
+    from bsbi import bm25_score
+    posts_tfs = []
+    for postings_list, tf_list, idf in terms:
+        if scheme == 'bm25':
+            posts_tfs2 = [(doc_id, bm25_score(tf, _doc_length[doc_id], avg_doc_length, idf, k1, b))
+                          for doc_id, tf in zip(postings_list, tf_list) if allowed is None or doc_id in allowed]
+        else:
+            posts_tfs2 = [(doc_id, (1 + math.log(tf)) * idf)
+                          for doc_id, tf in zip(postings_list, tf_list) if allowed is None or doc_id in allowed]
+        posts_tfs = sorted_merge_posts_and_tfs(posts_tfs, posts_tfs2)
+    return heapq.nsmallest(k, [(score, doc_id) for doc_id, score in posts_tfs], key = lambda x: (-x[0], x[1]))
+
+def partition_ranges(num_docs, partitions):
+    """Memecah [0, num_docs) menjadi paling banyak `partitions` range [low, high) yang ukurannya hampir sama"""
+    partitions = max(1, min(partitions, num_docs))
+    bounds = [num_docs * i // partitions for i in range(partitions + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(partitions) if bounds[i] < bounds[i + 1]]
+
+
+class ParallelScorer:
+    """
+    Process pool untuk scoring satu query di beberapa range doc ID sekaligus.
+
+    Parameters
+    ----------
+    workers: int
+        Banyaknya proses worker (default: os.cpu_count())
+    partitions: int
+        Banyaknya range doc ID per query (default: sama dengan workers)
+    min_cost: int
+        Query dengan jumlah df di bawah nilai ini di-score secara serial
+    """
+
+    MIN_COST = 50000
+
+    def __init__(self, index_name, postings_encoding, output_dir, workers = None, partitions = None, min_cost = MIN_COST):
+        workers = workers or os.cpu_count()
+        # spawn (bukan fork), sama seperti async_server.py: aman dipakai dari
+        # proses yang sudah punya thread (gunicorn, GenerationSearcher)
+        self.executor = concurrent.futures.ProcessPoolExecutor(max_workers = workers,
+                                                               mp_context = multiprocessing.get_context("spawn"),
+                                                               initializer = init_worker,
+                                                               initargs = (index_name, postings_encoding, output_dir))
+        self.partitions = partitions or workers
+        self.min_cost = min_cost
+        self.stats = {"parallel": 0, "serial": 0}
+
+    def should_parallelize(self, list_of_postings_list):
+        parallel = sum(len(postings[0]) for postings in list_of_postings_list) >= self.min_cost
+        self.stats["parallel" if parallel else "serial"] += 1
+        return parallel
+
+    def score(self, scheme, terms, k, avg_doc_length = 0., k1 = 1.4, b = 0.75, allowed = None):
+        """
+        Top-k (score, doc ID) untuk terms (list of (postings_list, tf_list,
+        idf), dalam urutan akumulasi) dengan scheme 'bm25' atau 'tfidf'.
+        """
+        terms = [term for term in terms if term[0]]
+        if not terms:
+            return []
+        futures = []
+        for low, high in partition_ranges(max(term[0][-1] for term in terms) + 1, self.partitions):
+            part = []
+            for postings_list, tf_list, idf in terms:
+                start = bisect.bisect_left(postings_list, low)
+                end = bisect.bisect_left(postings_list, high, start)
+                if start < end:
+                    part.append((postings_list[start:end], tf_list[start:end], idf))
+            if part:
+                futures.append(self.executor.submit(score_range, scheme, part, avg_doc_length, k, k1, b, allowed))
+        partial = [future.result() for future in futures]
+        return heapq.nsmallest(k, itertools.chain.from_iterable(partial), key = lambda x: (-x[0], x[1]))
+
+    def close(self):
+        self.executor.shutdown()
+
+
+if __name__ == "__main__":
+
+    import random
+    from bsbi import BSBIIndex
+    from compression import VBEPostings
+
+    assert partition_ranges(10, 3) == [(0, 3), (3, 6), (6, 10)], "partition_ranges salah"
+    assert partition_ranges(2, 4) == [(0, 1), (1, 2)], "partition_ranges salah"
+
+    BSBI_instance = BSBIIndex(data_dir = 'collection', \
+                              postings_encoding = VBEPostings, \
+                              output_dir = 'index')
+    BSBI_instance.load()
+    random.seed(0)
+    queries = [" ".join(BSBI_instance.term_id_map[random.randrange(len(BSBI_instance.term_id_map))] for _ in range(n))
+               for n in [1, 3, 8, 20]]
+    # analyzer whitespace: query di atas sudah berupa term di index
+    BSBI_instance.analyze_query = lambda query: query.split()
+    serial = [(BSBI_instance.retrieve_bm25(query, k = 10), BSBI_instance.retrieve_tfidf(query, k = 10)) for query in queries]
+    BSBI_instance.enable_parallel(workers = 2, partitions = 4, min_cost = 0)
+    for query, (bm25, tfidf) in zip(queries, serial):
+        assert BSBI_instance.retrieve_bm25(query, k = 10) == bm25, "hasil BM25 paralel berbeda"
+        assert BSBI_instance.retrieve_tfidf(query, k = 10) == tfidf, "hasil TF-IDF paralel berbeda"
+    assert BSBI_instance.parallel_scorer.stats["parallel"] == 2 * len(queries), "stats salah"
+    BSBI_instance.parallel_scorer.close()
@@ -0,0 +1,344 @@
+import json
+import math
+import time
+import heapq
+import collections
+
+from index import InvertedIndexReader
+from bsbi import bm25_score
+from util import sorted_merge_posts_and_tfs, galloping_search, galloping_intersect
+
+class QueryPlan:
+    """
+    Rencana eksekusi sebuah query BM25.
+
+    Attributes
+    ----------
+    strategy: str
+        'taat', 'daat' (document-at-a-time dengan MaxScore), atau 'conjunctive'
+        (conjunctive-first dengan fallback ke daat)
+    term_ids: List[int]
+        Term yang dievaluasi, terurut df menaik
+    weights: Dict[int, int]
+        term ID -> banyaknya kemunculan di query (seperti retrieve_bm25, term
+        yang muncul dua kali dijumlahkan dua kali)
+    dropped_term_ids: List[int]
+        Term ber-IDF kecil yang dibuang oleh quality guard
+    estimates: Dict[str, float]
+        Estimasi cost setiap strategi (satuan: operasi per posting)
+    """
+    def __init__(self, strategy, term_ids, weights, dropped_term_ids, estimates):
+        self.strategy = strategy
+        self.term_ids = term_ids
+        self.weights = weights
+        self.dropped_term_ids = dropped_term_ids
+        self.estimates = estimates
+
+    @property
+    def estimated_cost(self):
+        return self.estimates.get(self.strategy, 0.)
+
+
+class QueryPlanner:
+    """
+    Cost-based planner untuk BM25: dari df setiap term di postings_dict (tanpa
+    membaca postings), estimasi cost setiap strategi lalu pilih yang termurah.
+
+    Cost model (satuan "operasi per posting"; semua strategi men-decode semua
+    postings term query, jadi DECODE_COST * sum(df) selalu ikut):
+
+        taat         akumulasi per term dengan sorted merge seperti
+                     BSBIIndex.retrieve_bm25: sum_i (|accumulator| + df_i).
+                     Murah untuk query pendek, membengkak untuk query panjang
+                     karena accumulator di-merge ulang untuk setiap term.
+        daat         MaxScore: dokumen diproses terurut doc ID, term dengan
+                     upper bound kecil hanya di-probe (galloping search) untuk
+                     kandidat yang masih bisa masuk top-k. Diperkirakan
+                     DAAT_SCORED_FRACTION dari postings yang di-score, masing-
+                     masing dengan biaya heap log2(m + 1).
+        conjunctive  intersection dimulai dari term dengan df terkecil, hanya
+                     dokumen yang memuat semua term yang di-score. Hanya dipilih
+                     jika estimasi ukuran intersection (asumsi independen:
+                     N * prod(df_i / N)) paling tidak k; hasilnya dipakai hanya
+                     jika terbukti exact (score ke-k lebih besar dari upper bound
+                     dokumen yang tidak memuat semua term), selain itu fallback
+                     ke daat.
+
+    Quality guard: term dengan IDF terkecil dibuang selama jumlah upper bound
+    kontribusi score-nya (idf * (k1 + 1)) paling banyak max_dropped_share dari
+    jumlah upper bound semua term query, jadi score setiap dokumen berubah
+    paling banyak max_dropped_share dari score maksimum yang mungkin.
+    max_dropped_share = 0 mematikan pembuangan term.
+
+    Setiap query dicatat (self.log, dan file JSONL log_path jika diberikan):
+    strategi, term yang dibuang, estimasi cost semua strategi, cost aktual
+    (dihitung dengan satuan yang sama) dan waktu, untuk tuning koefisien.
+    """
+
+    DECODE_COST = 1.0
+    SCORE_COST = 1.0
+    DAAT_SCORED_FRACTION = 0.6
+    PROBE_COST = 2.0
+    # jumlah record terakhir yang disimpan di self.log
+    LOG_SIZE = 1000
+
+    def __init__(self, bsbi_index, max_dropped_share = 0.02, k1 = 1.4, b = 0.75, log_path = None):
+        self.bsbi_index = bsbi_index
+        self.max_dropped_share = max_dropped_share
+        self.k1 = k1
+        self.b = b
+        self.log_path = log_path
+        self.log = []
+
+    def plan(self, index, term_ids, k):
+        """QueryPlan untuk term_ids (boleh ada duplikat) di InvertedIndexReader index"""
+        N = len(index.doc_length)
+        weights = collections.Counter(term_id for term_id in term_ids if term_id in index.postings_dict)
+        term_ids = sorted(weights, key = lambda term_id: (index.postings_dict[term_id][1], term_id))
+        df = {term_id: index.postings_dict[term_id][1] for term_id in term_ids}
+        idf = {term_id: weights[term_id] * math.log(N / df[term_id]) for term_id in term_ids}
+
+        # quality guard: buang term dengan IDF terkecil (df terbesar) lebih dulu
+        dropped = []
+        total_bound = sum(idf.values())
+        dropped_bound = 0.
+        while len(term_ids) > 1:
+            candidate = term_ids[-1]
+            if dropped_bound + idf[candidate] > self.max_dropped_share * total_bound:
+                break
+            dropped_bound += idf[candidate]
+            dropped.append(term_ids.pop())
+            del weights[candidate]
+
+        dfs = [df[term_id] for term_id in term_ids]
+        m = len(dfs)
+        decode = self.DECODE_COST * sum(dfs)
+        accumulator, taat = 0, 0.
+        for term_df in dfs:
+            taat += accumulator + term_df
+            accumulator = min(N, accumulator + term_df)
+        estimates = {"taat": decode + self.SCORE_COST * taat,
+                     "daat": decode + self.SCORE_COST * self.DAAT_SCORED_FRACTION * sum(dfs) * math.log2(m + 1)}
+        if m >= 2:
+            expected_matches = N * math.prod(term_df / N for term_df in dfs)
+            if expected_matches >= k:
+                probes = dfs[0] * sum(math.log2(term_df / dfs[0] + 1) for term_df in dfs[1:])
+                estimates["conjunctive"] = decode + self.PROBE_COST * probes + self.SCORE_COST * m * expected_matches
+
+        strategy = min(estimates, key = lambda name: (estimates[name], name))
+        return QueryPlan(strategy, term_ids, dict(weights), dropped, estimates)
+
+    def retrieve(self, query, k = 10, filters = None):
+        """
+        Sama seperti BSBIIndex.retrieve_bm25(query, k, filters = filters), dengan
+        strategi eksekusi dipilih oleh plan(..).
+
+        Returns
+        -------
+        Tuple[List[(float, str)], QueryPlan]
+        """
+        self.bsbi_index.load()
+        allowed = self.bsbi_index.get_filter(filters)
+        tokenized = self.bsbi_index.analyze_query(query)
+        term_ids = [self.bsbi_index.term_id_map[token] for token in tokenized if token in self.bsbi_index.term_id_map]
+        start = time.perf_counter()
+        with InvertedIndexReader(self.bsbi_index.index_name, self.bsbi_index.postings_encoding,
+                                 self.bsbi_index.output_dir) as index:
+            plan = self.plan(index, term_ids, k)
+            top, actual_cost, strategy = self.execute(index, plan, k, allowed)
+        self.record(query, plan, strategy, actual_cost, time.perf_counter() - start)
+        return [(score, self.bsbi_index.doc_id_map[doc_id]) for (score, doc_id) in top], plan
+
+    def execute(self, index, plan, k, allowed = None):
+        """
+        Mengeksekusi plan. Mengembalikan (top-k (score, doc ID), cost aktual,
+        strategi yang akhirnya dipakai).
+
+        Jika allowed (RoaringBitmap, lihat BSBIIndex.get_filter) diberikan,
+        postings setiap term dibatasi ke dokumen di dalamnya sebelum strategi
+        mana pun dijalankan; IDF tetap dihitung dari df asli.
+        """
+        if not plan.term_ids:
+            return [], 0., plan.strategy
+        doc_length = index.doc_length
+        N = len(doc_length)
+        avg_doc_length = sum(doc_length.values()) / N
+        terms = []
+        cost = 0.
+        for term_id in plan.term_ids:
+            postings_list, tf_list = index.get_postings_list(term_id)
+            idf = plan.weights[term_id] * math.log(N / len(postings_list))
+            cost += self.DECODE_COST * len(postings_list)
+            if allowed is not None:
+                kept = [(doc_id, tf) for doc_id, tf in zip(postings_list, tf_list) if doc_id in allowed]
+                if not kept:
+                    continue
+                postings_list, tf_list = [doc_id for (doc_id, _) in kept], [tf for (_, tf) in kept]
+            terms.append((postings_list, tf_list, idf))
+        if not terms:
+            return [], cost, plan.strategy
+
+        if plan.strategy == 'taat':
+            top, operations = self.execute_taat(terms, doc_length, avg_doc_length, k)
+            return top, cost + self.SCORE_COST * operations, 'taat'
+        if plan.strategy == 'conjunctive':
+            top, probes, scored, exact = self.execute_conjunctive(terms, doc_length, avg_doc_length, k)
+            cost += self.PROBE_COST * probes + self.SCORE_COST * scored
+            if exact:
+                return top, cost, 'conjunctive'
+        top, operations = self.execute_daat(terms, doc_length, avg_doc_length, k)
+        return top, cost + self.SCORE_COST * operations, 'daat' if plan.strategy == 'daat' else 'conjunctive+daat'
+
+    def score(self, tf, doc_length, avg_doc_length, idf):
+        return bm25_score(tf, doc_length, avg_doc_length, idf, self.k1, self.b)
+
+    def upper_bound(self, tf_list, idf, min_doc_length, avg_doc_length):
+        """Score BM25 maksimum sebuah term: TF maksimum di postings dengan dokumen terpendek"""
+        return self.score(max(tf_list), min_doc_length, avg_doc_length, idf)
+
+    @staticmethod
+    def top_k(scores, k):
+        """Top-k (score, doc ID) dari iterable (doc ID, score); seri dipecah dengan doc ID"""
+        top = heapq.nsmallest(k, scores, key = lambda x: (-x[1], x[0]))
+        return [(score, doc_id) for (doc_id, score) in top]
+
+    def execute_taat(self, terms, doc_length, avg_doc_length, k):
+        """Sama seperti loop di BSBIIndex.retrieve_bm25: sorted merge per term"""
+        posts_tfs = []
+        operations = 0
+        for postings_list, tf_list, idf in terms:
+            scored = [(doc_id, self.score(tf, doc_length[doc_id], avg_doc_length, idf))
+                      for doc_id, tf in zip(postings_list, tf_list)]
+            operations += len(posts_tfs) + len(scored)
+            posts_tfs = sorted_merge_posts_and_tfs(posts_tfs, scored)
+        return self.top_k(posts_tfs, k), operations
+
+    def execute_daat(self, terms, doc_length, avg_doc_length, k):
+        """
+        MaxScore: term diurutkan berdasarkan upper bound; term "non-essential"
+        (prefix dengan jumlah upper bound <= threshold top-k) tidak bisa
+        memasukkan dokumen ke top-k sendirian, sehingga hanya di-probe untuk
+        kandidat dari term essential.
+        """
+        min_doc_length = min(doc_length.values())
+        bounded = sorted(((self.upper_bound(tf_list, idf, min_doc_length, avg_doc_length), postings_list, tf_list, idf)
+                          for (postings_list, tf_list, idf) in terms), key = lambda x: x[0])
+        m = len(bounded)
+        cumulative = []
+        for (bound, _, _, _) in bounded:
+            cumulative.append(bound + (cumulative[-1] if cumulative else 0.))
+        pointers = [0] * m
+        heap = []  # min-heap (score, -doc ID): elemen pertama yang paling mudah tergeser
+        threshold = -1.
+        first_essential = 0
+        operations = 0
+        log_m = math.log2(m + 1)
+        while first_essential < m:
+            candidates = [bounded[i][1][pointers[i]] for i in range(first_essential, m) if pointers[i] < len(bounded[i][1])]
+            if not candidates:
+                break
+            doc_id = min(candidates)
+            score = 0.
+            for i in range(first_essential, m):
+                postings_list = bounded[i][1]
+                if pointers[i] < len(postings_list) and postings_list[pointers[i]] == doc_id:
+                    score += self.score(bounded[i][2][pointers[i]], doc_length[doc_id], avg_doc_length, bounded[i][3])
+                    pointers[i] += 1
+                    operations += log_m
+            for i in range(first_essential - 1, -1, -1):
+                if score + cumulative[i] <= threshold:
+                    break
+                postings_list = bounded[i][1]
+                pointers[i] = galloping_search(postings_list, doc_id, pointers[i])
+                operations += self.PROBE_COST
+                if pointers[i] < len(postings_list) and postings_list[pointers[i]] == doc_id:
+                    score += self.score(bounded[i][2][pointers[i]], doc_length[doc_id], avg_doc_length, bounded[i][3])
+            if len(heap) < k:
+                heapq.heappush(heap, (score, -doc_id))
+            elif score > heap[0][0]:
+                heapq.heapreplace(heap, (score, -doc_id))
+            if len(heap) == k:
+                threshold = heap[0][0]
+                while first_essential < m and cumulative[first_essential] <= threshold:
+                    first_essential += 1
+        return self.top_k([(-neg_doc_id, score) for (score, neg_doc_id) in heap], k), operations
+
+    def execute_conjunctive(self, terms, doc_length, avg_doc_length, k):
+        """
+        Top-k di antara dokumen yang memuat semua term. exact True jika score
+        ke-k lebih besar dari upper bound dokumen lain (semua term kecuali
+        term dengan upper bound terkecil), sehingga top-k disjunctive sama.
+        """
+        ordered = sorted(terms, key = lambda x: len(x[0]))
+        doc_ids = ordered[0][0]
+        probes = 0
+        for postings_list, _, _ in ordered[1:]:
+            probes += len(doc_ids) * math.log2(len(postings_list) / max(1, len(doc_ids)) + 1)
+            doc_ids = galloping_intersect(doc_ids, postings_list)
+            if not doc_ids:
+                break
+        scores = []
+        positions = [0] * len(terms)
+        for doc_id in doc_ids:
+            score = 0.
+            for i, (postings_list, tf_list, idf) in enumerate(terms):
+                positions[i] = galloping_search(postings_list, doc_id, positions[i])
+                score += self.score(tf_list[positions[i]], doc_length[doc_id], avg_doc_length, idf)
+            scores.append((doc_id, score))
+        top = self.top_k(scores, k)
+
+        min_doc_length = min(doc_length.values())
+        bounds = [self.upper_bound(tf_list, idf, min_doc_length, avg_doc_length) for (_, tf_list, idf) in terms]
+        exact = len(top) == k and top[-1][0] > sum(bounds) - min(bounds)
+        return top, probes, len(doc_ids) * len(terms), exact
+
+    def record(self, query, plan, strategy, actual_cost, seconds):
+        item = {"query": query, "planned": plan.strategy, "executed": strategy,
+                "terms": len(plan.term_ids), "dropped": len(plan.dropped_term_ids),
+                "estimates": {name: round(cost, 1) for name, cost in plan.estimates.items()},
+                "estimated_cost": round(plan.estimated_cost, 1), "actual_cost": round(actual_cost, 1),
+                "ms": round(1000 * seconds, 3)}
+        self.log.append(item)
+        del self.log[:-self.LOG_SIZE]
+        if self.log_path is not None:
+            with open(self.log_path, 'a', encoding = 'utf-8') as f:
+                f.write(json.dumps(item) + '\n')
+
+
+if __name__ == "__main__":
+
+    from bsbi import BSBIIndex
+    from compression import VBEPostings
+
+    BSBI_instance = BSBIIndex(data_dir = 'collection', \
+                              postings_encoding = VBEPostings, \
+                              output_dir = 'index')
+    planner = QueryPlanner(BSBI_instance, max_dropped_share = 0.)
+    BSBI_instance.load()
+
+    # tanpa pembuangan term, semua strategi harus memberi top-k yang sama dengan retrieve_bm25
+    with InvertedIndexReader(BSBI_instance.index_name, VBEPostings, BSBI_instance.output_dir) as index:
+        for term_ids in [[3, 50], [10, 200, 3000], list(range(0, 400, 7))]:
+            plan = planner.plan(index, term_ids, 10)
+            results = {}
+            for strategy in ['taat', 'daat', 'conjunctive']:
+                plan.strategy = strategy
+                top, _, executed = planner.execute(index, plan, 10)
+                results[executed] = [(round(score, 9), doc_id) for (score, doc_id) in top]
+            assert len({tuple(top) for top in results.values()}) == 1, "hasil strategi berbeda: " + str(results)
+            # dengan filter, semua strategi harus sama dengan loop TaaT retrieve_bm25 yang memakai allowed
+            allowed = BSBI_instance.get_filter("block:1 OR block:2")
+            results = {}
+            for strategy in ['taat', 'daat', 'conjunctive']:
+                plan.strategy = strategy
+                top, _, executed = planner.execute(index, plan, 10, allowed)
+                assert all(doc_id in allowed for (_, doc_id) in top), "dokumen di luar filter"
+                results[executed] = [(round(score, 9), doc_id) for (score, doc_id) in top]
+            assert len({tuple(top) for top in results.values()}) == 1, "hasil strategi dengan filter berbeda: " + str(results)
+
+    with open("queries.txt") as file:
+        for qline in file:
+            query = " ".join(qline.strip().split()[1:])
+            result, plan = QueryPlanner(BSBI_instance, max_dropped_share = 0.05).retrieve(query, k = 10)
+            print(f"{qline.split()[0]:4} {plan.strategy:12} terms={len(plan.term_ids):2} dropped={len(plan.dropped_term_ids)} "
+                  f"estimated={plan.estimated_cost:9.0f}")
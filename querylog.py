@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import queue
+import random
+import threading
+
+class QueryLogRecorder:
+    """
+    Mencatat request ke service (misal /search) sebagai JSONL, satu record per
+    baris:
+
+        {"ts": 1700000000.123, "path": "/search", "query": "lens",
+         "params": {"q": "lens", "snippets": "1"}, "status": 200, "latency_ms": 12.3}
+
+    Supaya overhead di jalur request minimal, record hanya dimasukkan ke queue
+    (tanpa I/O); thread terpisah yang menulisnya ke file. Jika queue penuh
+    (disk lambat), record dibuang dan dihitung di `dropped`, alih-alih
+    memperlambat request. Hanya proporsi sample_rate dari request yang
+    dicatat.
+
+    Semua record yang sedang mengantri ditulis dengan satu os.write ke file
+    yang dibuka dengan O_APPEND, sehingga beberapa worker (proses gunicorn)
+    boleh menulis ke file log yang sama tanpa baris yang saling terpotong.
+    """
+    def __init__(self, path, sample_rate = 1.0, max_pending = 10000):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.pending = queue.Queue(maxsize = max_pending)
+        self.recorded = 0
+        self.dropped = 0
+        self.writer = threading.Thread(target = self.write_loop, daemon = True)
+        self.writer.start()
+
+    def sampled(self):
+        """True jika request berikutnya perlu dicatat"""
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record(self, path, params, status, latency, timestamp):
+        """
+        Parameters
+        ----------
+        path: str
+            Path endpoint, misal "/search"
+        params: Dict[str, str]
+            Query string request
+        status: int
+            HTTP status response
+        latency: float
+            Waktu memproses request, dalam detik
+        timestamp: float
+            Waktu request diterima (time.time())
+        """
+        item = {"ts": round(timestamp, 6), "path": path, "query": params.get("q"), "params": params,
+                "status": status, "latency_ms": round(latency * 1000, 3)}
+        try:
+            self.pending.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def write_loop(self):
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            closing = False
+            while not closing:
+                items = [self.pending.get()]
+                while True:
+                    try:
+                        items.append(self.pending.get_nowait())
+                    except queue.Empty:
+                        break
+                if items[-1] is None:
+                    closing = True
+                    items.pop()
+                if items:
+                    os.write(fd, ''.join(json.dumps(item) + '\n' for item in items).encode('utf-8'))
+                    self.recorded += len(items)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        """Menunggu semua record yang mengantri tertulis"""
+        self.pending.put(None)
+        self.writer.join()
+
+
+def read_log(path):
+    """Generator (path, params) dari file log hasil QueryLogRecorder"""
+    with open(path, 'r', encoding = 'utf-8') as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                yield record["path"], record["params"]
+
+def read_queries(path):
+    """
+    Generator ("/search", {"q": query}) dari file queries: queries.txt
+    ("Q1 the crystalline lens ...") atau file queries nfcorpus
+    ("PLAIN-2427\tdiet and exercise ...").
+    """
+    with open(path, 'r', encoding = 'utf-8') as file:
+        for line in file:
+            line = line.rstrip('\n')
+            if not line.strip():
+                continue
+            separator = '\t' if '\t' in line else ' '
+            query = line.split(separator, 1)[-1].strip()
+            yield "/search", {"q": query}
+
+def load_requests(path):
+    """List (path, params) dari log JSONL (.jsonl) atau file queries"""
+    if path.endswith('.jsonl'):
+        return list(read_log(path))
+    return list(read_queries(path))
+
+
+if __name__ == "__main__":
+
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, 'log.jsonl')
+        recorder = QueryLogRecorder(log_path)
+        for i in range(100):
+            recorder.record("/search", {"q": "query {}".format(i)}, 200, 0.01, time.time())
+        recorder.close()
+        assert recorder.recorded == 100 and recorder.dropped == 0, "recorder salah"
+        requests = load_requests(log_path)
+        assert len(requests) == 100 and requests[7] == ("/search", {"q": "query 7"}), "read_log salah"
+
+        recorder = QueryLogRecorder(os.path.join(tmp, 'sampled.jsonl'), sample_rate = 0.)
+        assert not recorder.sampled(), "sampling salah"
+        recorder.close()
+
+        queries_path = os.path.join(tmp, 'queries.txt')
+        with open(queries_path, 'w') as f:
+            f.write("Q1 the crystalline lens\n\nPLAIN-2\tdiet and exercise\n")
+        assert load_requests(queries_path) == [("/search", {"q": "the crystalline lens"}),
+                                               ("/search", {"q": "diet and exercise"})], "read_queries salah"
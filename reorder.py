@@ -0,0 +1,387 @@
+"""
+Pass opsional setelah BSBIIndex.index() yang meng-assign ulang doc IDs supaya
+dokumen yang mirip mendapat doc ID berdekatan. Dengan begitu d-gap di postings
+list mengecil sehingga VBEPostings butuh lebih sedikit byte per posting, dan
+postings yang di-decode per query juga lebih pendek.
+
+Doc ID baru ditentukan oleh sebuah "order": list of doc ID lama, terurut
+sesuai doc ID baru (order[doc ID baru] = doc ID lama). Kandidat order:
+
+    path_order          urutan path dokumen (natural sort, "1/2.txt" < "1/10.txt")
+    dominant_term_order dikelompokkan berdasarkan term dengan bobot tf-idf terbesar
+    bisection_order     recursive graph bisection atas term vector dokumen
+
+reorder_index(..) lalu menulis index baru di directory lain, dengan semua
+struktur yang dikunci dengan doc ID ditulis ulang secara konsisten: merged
+index (postings, positions, doc_length), forward index, doc table, document
+store, filter bitmaps, tier 1 dan impact index, serta embedding matrix dan IVF
+index jika ada. File yang tidak bergantung pada doc ID di-hardlink.
+Shard (sharding.py) harus di-build ulang.
+
+Index yang di-serve dengan generasi (generations.py) di-reorder ke generasi
+baru yang di-publish sekali jadi:
+
+    python reorder.py bisection --root index
+"""
+import os
+import re
+import math
+import time
+import pickle
+import shutil
+
+from index import InvertedIndexReader, InvertedIndexWriter, ForwardIndexReader, ForwardIndexWriter
+from util import DocTable
+from filters import FilterIndex
+from bsbi import BSBIIndex
+from tiering import TieredIndex
+from impact import ImpactIndex
+from generations import generation_path, current_generation, new_generation, publish_generation
+from compression import StandardPostings, VBEPostings
+
+def path_order(doc_id_map):
+    """Doc IDs terurut berdasarkan path dokumen, dengan angka dibandingkan sebagai angka"""
+    def natural_key(doc_id):
+        parts = re.split(r'(\d+)', doc_id_map[doc_id])
+        return [(0, int(part), '') if part.isdigit() else (1, 0, part) for part in parts]
+    return sorted(range(len(doc_id_map)), key = natural_key)
+
+def dominant_term_order(term_vectors, df, N):
+    """
+    Doc IDs dikelompokkan berdasarkan dominant term, yaitu term dengan bobot
+    tf * log(N / df) terbesar di dokumen; di dalam kelompok, urutan doc ID lama
+    dipertahankan. Dokumen tanpa term diletakkan di akhir.
+
+    Parameters
+    ----------
+    term_vectors: Dict[int, Tuple[List[int], List[int]]]
+        docID -> (term_list, tf_list), misal dari forward index
+    df: Dict[int, int]
+        termID -> document frequency
+    """
+    def dominant_term(doc_id):
+        term_list, tf_list = term_vectors.get(doc_id, ([], []))
+        if not term_list:
+            return (1, 0)
+        # seri dipecah dengan termID terkecil
+        term_id, _ = max(zip(term_list, tf_list), key = lambda x: (x[1] * math.log(N / df[x[0]]), -x[0]))
+        return (0, term_id)
+    return sorted(range(N), key = lambda doc_id: (dominant_term(doc_id), doc_id))
+
+def move_gains(part, doc_terms, from_degrees, to_degrees, from_size, to_size):
+    """
+    Perkiraan penghematan biaya (dalam bit) jika setiap dokumen di part dipindah
+    ke partisi lain. Biaya sebuah term dengan degree d di partisi berukuran n
+    didekati dengan d * log2(n / (d + 1)), yaitu panjang d-gap rata-rata
+    jika kemunculannya tersebar merata.
+    """
+    def cost(degree, size):
+        return degree * math.log2(size / (degree + 1))
+
+    term_gain = {}
+    gains = []
+    for doc_id in part:
+        gain = 0.
+        for term_id in doc_terms[doc_id]:
+            if term_id not in term_gain:
+                d_from, d_to = from_degrees.get(term_id, 0), to_degrees.get(term_id, 0)
+                term_gain[term_id] = cost(d_from, from_size) + cost(d_to, to_size) - \
+                                     cost(d_from - 1, from_size) - cost(d_to + 1, to_size)
+            gain += term_gain[term_id]
+        gains.append((gain, doc_id))
+    gains.sort(reverse = True)
+    return gains
+
+def term_degrees(part, doc_terms):
+    degrees = {}
+    for doc_id in part:
+        for term_id in doc_terms[doc_id]:
+            degrees[term_id] = degrees.get(term_id, 0) + 1
+    return degrees
+
+def bisection_order(doc_terms, iterations = 10, leaf_size = 16):
+    """
+    Recursive graph bisection (Dhulipala et al., KDD 2016): dokumen dibagi dua
+    sama besar, lalu pasangan dokumen ditukar antar partisi selama total
+    estimasi biaya d-gap (lihat move_gains) masih turun, paling banyak
+    `iterations` kali; kemudian masing-masing partisi dibagi dua lagi sampai
+    ukurannya paling banyak leaf_size.
+
+    Parameters
+    ----------
+    doc_terms: Dict[int, List[int]]
+        docID -> termIDs di dokumen tersebut. Term yang hanya muncul di satu
+        dokumen tidak mempengaruhi d-gap dan sebaiknya dibuang lebih dulu.
+
+    Returns
+    -------
+    List[int]
+        Doc IDs lama, terurut sesuai doc ID baru
+    """
+    order = sorted(doc_terms)
+    # rentang [lo, hi) dari order yang masih perlu dibagi dua
+    stack = [(0, len(order))]
+    while stack:
+        lo, hi = stack.pop()
+        if hi - lo <= leaf_size:
+            order[lo:hi] = sorted(order[lo:hi])
+            continue
+        mid = (lo + hi) // 2
+        left, right = order[lo:mid], order[mid:hi]
+        for _ in range(iterations):
+            left_degrees, right_degrees = term_degrees(left, doc_terms), term_degrees(right, doc_terms)
+            left_gains = move_gains(left, doc_terms, left_degrees, right_degrees, len(left), len(right))
+            right_gains = move_gains(right, doc_terms, right_degrees, left_degrees, len(right), len(left))
+            moved_left, moved_right = set(), set()
+            for (gain_left, doc_left), (gain_right, doc_right) in zip(left_gains, right_gains):
+                if gain_left + gain_right <= 0:
+                    break
+                moved_left.add(doc_left)
+                moved_right.add(doc_right)
+            if not moved_left:
+                break
+            left, right = [doc_id for doc_id in left if doc_id not in moved_left] + sorted(moved_right), \
+                          [doc_id for doc_id in right if doc_id not in moved_right] + sorted(moved_left)
+        order[lo:mid], order[mid:hi] = left, right
+        stack.append((mid, hi))
+        stack.append((lo, mid))
+    return order
+
+def load_term_vectors(bsbi_index):
+    """docID -> (term_list, tf_list) dari forward index; dibangun dulu jika belum ada"""
+    forward_path = os.path.join(bsbi_index.output_dir, bsbi_index.index_name + '.fwddict')
+    if not os.path.exists(forward_path):
+        bsbi_index.build_forward_index()
+    with ForwardIndexReader(bsbi_index.index_name, bsbi_index.postings_encoding, bsbi_index.output_dir) as forward_index:
+        return {doc_id: forward_index.get_term_vector(doc_id) for doc_id in forward_index.doc_dict}
+
+def compute_order(bsbi_index, strategy = 'bisection'):
+    """Order doc IDs untuk salah satu strategi: 'path', 'dominant_term', atau 'bisection'"""
+    bsbi_index.load()
+    N = len(bsbi_index.doc_id_map)
+    if strategy == 'path':
+        return path_order(bsbi_index.doc_id_map)
+    term_vectors = load_term_vectors(bsbi_index)
+    with InvertedIndexReader(bsbi_index.index_name, bsbi_index.postings_encoding, bsbi_index.output_dir) as index:
+        df = {term_id: entry[1] for term_id, entry in index.postings_dict.items()}
+    if strategy == 'dominant_term':
+        return dominant_term_order(term_vectors, df, N)
+    if strategy == 'bisection':
+        doc_terms = {doc_id: [] for doc_id in range(N)}
+        for doc_id, (term_list, _) in term_vectors.items():
+            doc_terms[doc_id] = [term_id for term_id in term_list if df[term_id] >= 2]
+        return bisection_order(doc_terms)
+    raise ValueError("strategi reordering tidak dikenal: " + strategy)
+
+# file yang tidak bergantung pada doc ID: di-hardlink (atau di-copy) apa adanya ke
+# directory hasil reorder; file lain yang tidak ditulis ulang tidak ikut
+SHARED_FILES = ['terms.dict', 'suggest.dict', 'spelling.dict', 'docstore.store', 'build.manifest',
+                'doc_ivf.centroids.npy', 'doc_ivf.offsets.npy', 'doc_ivf.vectors.npy']
+SHARED_PREFIXES = ['intermediate_', 'lsi.']
+
+def link_or_copy(source_path, target_path):
+    try:
+        os.link(source_path, target_path)
+    except OSError:
+        shutil.copy2(source_path, target_path)
+
+def reorder_index(bsbi_index, order, output_dir):
+    """
+    Menulis index dengan doc ID baru ke directory output_dir: dokumen dengan
+    doc ID lama order[i] menjadi doc ID i. Index asal tidak diubah, jadi
+    reader index asal tidak pernah melihat index setengah jadi; untuk index
+    yang sedang di-serve, output_dir adalah generasi baru yang di-publish
+    setelah fungsi ini selesai (lihat reorder_generation).
+
+    Returns
+    -------
+    BSBIIndex
+        Index hasil reorder (output_dir)
+    """
+    bsbi_index.load()
+    N = len(bsbi_index.doc_id_map)
+    if sorted(order) != list(range(N)):
+        raise ValueError("order harus permutasi dari semua doc IDs")
+    new_ids = [0] * N
+    for new_id, old_id in enumerate(order):
+        new_ids[old_id] = new_id
+
+    source_dir, encoding, index_name = bsbi_index.output_dir, bsbi_index.postings_encoding, bsbi_index.index_name
+    os.makedirs(output_dir, exist_ok = True)
+    for file_name in os.listdir(source_dir):
+        if (file_name in SHARED_FILES or any(file_name.startswith(prefix) for prefix in SHARED_PREFIXES)) \
+                and not os.path.exists(os.path.join(output_dir, file_name)):
+            link_or_copy(os.path.join(source_dir, file_name), os.path.join(output_dir, file_name))
+
+    # postings (beserta positions) di-remap lalu diurutkan ulang per term;
+    # doc_length dihitung ulang oleh InvertedIndexWriter.append
+    with InvertedIndexReader(index_name, encoding, source_dir, positional = bsbi_index.positional) as index, \
+         InvertedIndexWriter(index_name, encoding, directory = output_dir, positional = bsbi_index.positional) as reordered:
+        for item in index:
+            postings = sorted(zip(*([new_ids[doc_id] for doc_id in item[1]],) + tuple(item[2:])))
+            reordered.append(item[0], *map(list, zip(*postings)))
+
+    if os.path.exists(os.path.join(source_dir, index_name + '.fwddict')):
+        with ForwardIndexReader(index_name, encoding, source_dir) as forward_index, \
+             ForwardIndexWriter(index_name, encoding, directory = output_dir) as reordered:
+            for new_id, old_id in enumerate(order):
+                if old_id in forward_index.doc_dict:
+                    reordered.append(new_id, *forward_index.get_term_vector(old_id))
+
+    doc_table = DocTable()
+    for old_id in order:
+        doc_table.add(bsbi_index.doc_id_map[old_id], bsbi_index.doc_id_map.external_id(old_id))
+    doc_table.save(os.path.join(output_dir, 'docs.table'))
+
+    # document store: cukup tabel lokasi yang di-remap, teks (docstore.store) di-hardlink
+    store_metadata_path = os.path.join(source_dir, 'docstore.storedict')
+    if os.path.exists(store_metadata_path):
+        with open(store_metadata_path, 'rb') as f:
+            block_size, block_offsets, doc_locations = pickle.load(f)
+        doc_locations = {new_ids[doc_id]: location for doc_id, location in doc_locations.items()}
+        with open(os.path.join(output_dir, 'docstore.storedict'), 'wb') as f:
+            pickle.dump([block_size, block_offsets, doc_locations], f)
+
+    filter_index = FilterIndex(source_dir)
+    if os.path.exists(filter_index.file_path):
+        filter_index.load().remap(new_ids)
+        filter_index.file_path = FilterIndex(output_dir).file_path
+        filter_index.save()
+
+    reordered_index = BSBIIndex(data_dir = bsbi_index.data_dir, output_dir = output_dir, postings_encoding = encoding,
+                                index_name = index_name, positional = bsbi_index.positional)
+    # tier 1 (tiering.py) dan impact index (impact.py) memuat doc IDs: dibangun
+    # ulang dari index yang baru
+    tiered = TieredIndex(bsbi_index)
+    if tiered.exists():
+        tiered.load()
+        TieredIndex(reordered_index).build(tiered.k1, tiered.b)
+    impact_index = ImpactIndex(bsbi_index)
+    if os.path.exists(impact_index.metadata_file_path):
+        with impact_index:
+            # impact terbesar selalu 2^bits - 1 (posting dengan score maksimum)
+            bits = max(impact for segments in impact_index.segments_dict.values()
+                       for (impact, _, _, _) in segments).bit_length()
+        ImpactIndex(reordered_index, bits = bits).build()
+
+    reorder_vectors(source_dir, output_dir, order, new_ids)
+    return reordered_index
+
+def reorder_generation(root, postings_encoding, strategy = 'bisection', keep = 2, **bsbi_kwargs):
+    """
+    Reorder generasi aktif di root (lihat generations.py) ke generasi baru,
+    lalu mengaktifkannya dengan satu os.replace(..) pada CURRENT. Worker
+    berpindah ke index hasil reorder secara utuh, tidak pernah sebagian.
+    Mengembalikan nama generasi baru.
+    """
+    current = generation_path(root, current_generation(root))
+    bsbi_index = BSBIIndex(data_dir = bsbi_kwargs.pop('data_dir', 'collection'), output_dir = current,
+                           postings_encoding = postings_encoding, **bsbi_kwargs)
+    name = new_generation(root)
+    reorder_index(bsbi_index, compute_order(bsbi_index, strategy), generation_path(root, name))
+    publish_generation(root, name, keep = keep)
+    return name
+
+def reorder_vectors(source_dir, output_dir, order, new_ids):
+    """
+    Permutasi baris embedding matrix (embedding.DocumentEmbeddings) dan doc IDs
+    di IVF index (ann.IVFIndex), jika ada. numpy hanya di-import jika dibutuhkan.
+    """
+    vector_names = ['doc_vectors.npy', 'doc_vectors.scale.npy']
+    ivf_ids_name = 'doc_ivf.ids.npy'
+    if not any(os.path.exists(os.path.join(source_dir, name)) for name in vector_names + [ivf_ids_name]):
+        return
+    import numpy as np
+    for name in vector_names:
+        if os.path.exists(os.path.join(source_dir, name)):
+            np.save(os.path.join(output_dir, name),
+                    np.load(os.path.join(source_dir, name))[np.asarray(order, dtype = np.int64)])
+    if os.path.exists(os.path.join(source_dir, ivf_ids_name)):
+        np.save(os.path.join(output_dir, ivf_ids_name),
+                np.asarray(new_ids, dtype = np.int64)[np.load(os.path.join(source_dir, ivf_ids_name))])
+
+def codec_report(bsbi_index, query_term_ids = (), codecs = (StandardPostings, VBEPostings), repeat = 5):
+    """
+    Untuk setiap codec: bits per posting (hanya docIDs; TF tidak dipengaruhi
+    urutan doc ID) atas seluruh merged index, dan waktu decode (ms) postings
+    semua term di query_term_ids, yaitu bagian latency query yang berubah
+    karena reordering. Postings di-encode ulang di memori dengan setiap codec,
+    jadi index tidak perlu di-build ulang per codec.
+
+    Returns
+    -------
+    Dict[str, Dict[str, float]]
+        nama codec -> {"bits_per_posting": .., "decode_ms": ..}
+    """
+    report = {}
+    with InvertedIndexReader(bsbi_index.index_name, bsbi_index.postings_encoding, bsbi_index.output_dir) as index:
+        postings_lists = [postings_list for (_, postings_list, _) in index]
+        query_postings = [index.get_postings_list(term_id)[0] for term_id in query_term_ids
+                          if term_id in index.postings_dict]
+    number_of_postings = sum(len(postings_list) for postings_list in postings_lists)
+    for codec in codecs:
+        total_bytes = sum(len(codec.encode(postings_list)) for postings_list in postings_lists)
+        encoded = [codec.encode(postings_list) for postings_list in query_postings]
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for encoded_postings_list in encoded:
+                codec.decode(encoded_postings_list)
+        report[codec.__name__] = {"bits_per_posting": 8 * total_bytes / max(1, number_of_postings),
+                                  "decode_ms": 1000 * (time.perf_counter() - start) / repeat}
+    return report
+
+
+if __name__ == "__main__":
+
+    import sys
+    import argparse
+
+    # dua kelompok dokumen yang tercampur harus dipisahkan oleh bisection
+    toy = {doc_id: ([1, 2, 3] if doc_id in (0, 1, 2, 4) else [4, 5, 6]) for doc_id in range(8)}
+    toy_order = bisection_order(toy, leaf_size = 4)
+    assert sorted(toy_order) == list(range(8)), "bisection_order harus permutasi"
+    assert toy_order == [0, 1, 2, 4, 3, 5, 6, 7], "bisection_order tidak mengelompokkan"
+    assert dominant_term_order({0: ([1, 2], [1, 5]), 1: ([1], [3]), 2: ([2], [1])}, {1: 2, 2: 2}, 4) == [1, 0, 2, 3], \
+        "dominant_term_order salah"
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("strategy", nargs = "?", default = "bisection", choices = ["path", "dominant_term", "bisection"])
+    parser.add_argument("--root", default = "index")
+    parser.add_argument("--output-dir", default = None, help = "directory index hasil reorder (default: <root>_reordered)")
+    args = parser.parse_args()
+
+    if current_generation(args.root) is not None:
+        print("generasi aktif:", reorder_generation(args.root, VBEPostings, args.strategy))
+        sys.exit(0)
+
+    BSBI_instance = BSBIIndex(data_dir = 'collection', \
+                              postings_encoding = VBEPostings, \
+                              output_dir = args.root)
+    BSBI_instance.load()
+    with open("queries.txt") as file:
+        queries = [" ".join(qline.strip().split()[1:]) for qline in file]
+    query_term_ids = [BSBI_instance.term_id_map[token] for query in queries
+                      for token in BSBI_instance.analyze_query(query) if token in BSBI_instance.term_id_map]
+
+    def query_latency_ms(bsbi_index):
+        start = time.perf_counter()
+        results = [bsbi_index.retrieve_bm25(query, k = 10) for query in queries]
+        return 1000 * (time.perf_counter() - start) / len(queries), results
+
+    before = codec_report(BSBI_instance, query_term_ids)
+    latency_before, results_before = query_latency_ms(BSBI_instance)
+    reordered = reorder_index(BSBI_instance, compute_order(BSBI_instance, args.strategy),
+                              args.output_dir or args.root + '_reordered')
+    after = codec_report(reordered, query_term_ids)
+    latency_after, results_after = query_latency_ms(reordered)
+
+    # reordering tidak boleh mengubah score (urutan dokumen dengan score seri boleh berubah)
+    for result_before, result_after in zip(results_before, results_after):
+        assert [round(score, 9) for score, _ in result_before] == [round(score, 9) for score, _ in result_after], \
+            "score berubah setelah reordering"
+
+    print(f"strategi: {args.strategy}, index hasil reorder: {reordered.output_dir}")
+    for codec in before:
+        print(f"{codec:17} bits/posting {before[codec]['bits_per_posting']:6.2f} -> {after[codec]['bits_per_posting']:6.2f}   "
+              f"decode query postings {before[codec]['decode_ms']:7.2f} ms -> {after[codec]['decode_ms']:7.2f} ms")
+    print(f"retrieve_bm25 ({BSBI_instance.postings_encoding.__name__}) {latency_before:.2f} ms -> {latency_after:.2f} ms per query")
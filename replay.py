@@ -0,0 +1,200 @@
+"""
+Load generator untuk search service: me-replay request dari query log
+(querylog.py), queries.txt, atau file queries nfcorpus, lalu melaporkan
+throughput, latency percentiles dan error rate.
+
+    python replay.py queries.txt --qps 20 --requests 500
+    python replay.py query_log.jsonl --url http://127.0.0.1:8000 --qps 50 --arrivals poisson
+    python replay.py nfcorpus/train.vid-desc.queries --qps 0 --concurrency 4
+
+Tanpa --url, request dikirim ke app Flask (app/main.py) di proses yang sama
+lewat test client; dengan --url, ke server lokal (wsgi.py/gunicorn atau
+async_server.py) lewat HTTP.
+
+Dengan --qps > 0 load bersifat open-loop: request dikirim sesuai jadwal
+(uniform: tepat setiap 1/qps detik, poisson: inter-arrival eksponensial)
+tanpa menunggu response sebelumnya. Latency dihitung dari waktu terjadwal,
+bukan waktu request benar-benar dikirim, sehingga antrian di sisi client saat
+server tidak mampu mengikuti tetap terlihat (tidak ada coordinated omission).
+Dengan --qps 0 load bersifat closed-loop: `concurrency` client mengirim
+request berikutnya begitu response sebelumnya diterima.
+"""
+import json
+import math
+import time
+import random
+import argparse
+import threading
+import concurrent.futures
+import urllib.error
+import urllib.request
+from urllib.parse import urlencode
+
+from querylog import load_requests
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile dari list yang sudah terurut"""
+    if not sorted_values:
+        return float('nan')
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class HttpTarget:
+    """Mengirim request ke server HTTP di base_url"""
+    def __init__(self, base_url, timeout = 10.):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def send(self, path, params):
+        """Mengembalikan HTTP status; exception jaringan diteruskan"""
+        url = self.base_url + path + ('?' + urlencode(params) if params else '')
+        try:
+            with urllib.request.urlopen(url, timeout = self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+class InProcessTarget:
+    """Mengirim request ke app Flask di proses yang sama (satu test client per thread)"""
+    def __init__(self):
+        from app.main import app
+        self.app = app
+        self.local = threading.local()
+
+    def send(self, path, params):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        return client.get(path, query_string = params).status_code
+
+
+def arrival_offsets(n, qps, arrivals, rng):
+    """Waktu kirim (detik sejak mulai) untuk n request"""
+    offset = 0.
+    for _ in range(n):
+        yield offset
+        offset += rng.expovariate(qps) if arrivals == 'poisson' else 1 / qps
+
+def replay(target, requests, n = None, qps = 0., arrivals = 'uniform', concurrency = 16, seed = 0):
+    """
+    Menjalankan load terhadap target.
+
+    Parameters
+    ----------
+    target: HttpTarget atau InProcessTarget
+    requests: List[Tuple[str, Dict[str, str]]]
+        (path, params) yang dikirim berurutan, diulang jika n > len(requests)
+    n: int
+        Banyaknya request yang dikirim (default: len(requests))
+    qps: float
+        Laju kedatangan untuk load open-loop; 0 berarti closed-loop
+    arrivals: str
+        "uniform" atau "poisson" (hanya untuk qps > 0)
+    concurrency: int
+        Banyaknya request yang boleh diproses bersamaan
+
+    Returns
+    -------
+    Dict
+        Laporan: throughput, latency percentiles (ms), error rate, dsb.
+    """
+    n = len(requests) if n is None else n
+    if n > 0 and not requests:
+        raise ValueError("tidak ada request untuk di-replay")
+    latencies = []
+    status_counts = {}
+    lock = threading.Lock()
+
+    def send(i, scheduled):
+        path, params = requests[i % len(requests)]
+        try:
+            status = str(target.send(path, params))
+        except Exception as e:
+            status = type(e).__name__
+        latency = time.perf_counter() - scheduled
+        with lock:
+            latencies.append(latency)
+            status_counts[status] = status_counts.get(status, 0) + 1
+
+    begin = time.perf_counter()
+    if qps > 0:
+        with concurrent.futures.ThreadPoolExecutor(max_workers = concurrency) as executor:
+            for i, offset in enumerate(arrival_offsets(n, qps, arrivals, random.Random(seed))):
+                scheduled = begin + offset
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(send, i, scheduled)
+    else:
+        next_request = iter(range(n))
+
+        def client():
+            while True:
+                with lock:
+                    i = next(next_request, None)
+                if i is None:
+                    return
+                send(i, time.perf_counter())
+        clients = [threading.Thread(target = client) for _ in range(concurrency)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+    duration = time.perf_counter() - begin
+
+    latencies.sort()
+    errors = sum(count for status, count in status_counts.items() if not status.isdigit() or int(status) >= 400)
+    return {"requests": n,
+            "duration_s": round(duration, 3),
+            "offered_qps": qps if qps > 0 else None,
+            "throughput_qps": round(n / duration, 2) if duration > 0 else None,
+            "error_rate": round(errors / n, 4) if n > 0 else 0.,
+            "status_counts": status_counts,
+            "latency_ms": {name: round(value * 1000, 2) for name, value in
+                           [("mean", sum(latencies) / len(latencies) if latencies else float('nan')),
+                            ("p50", percentile(latencies, 50)), ("p90", percentile(latencies, 90)),
+                            ("p99", percentile(latencies, 99)), ("max", percentile(latencies, 100))]}}
+
+
+if __name__ == "__main__":
+
+    assert percentile([1, 2, 3, 4], 50) == 2 and percentile([1, 2, 3, 4], 100) == 4, "percentile salah"
+    try:
+        replay(None, [], n = 5)
+        assert False, "seharusnya ValueError"
+    except ValueError:
+        pass
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source", nargs = "?", default = "queries.txt",
+                        help = "query log (.jsonl), queries.txt, atau file queries nfcorpus")
+    parser.add_argument("--url", default = None, help = "base URL server; default: app Flask in-process")
+    parser.add_argument("--requests", type = int, default = None, help = "banyaknya request (default: isi source)")
+    parser.add_argument("--qps", type = float, default = 0., help = "laju kedatangan open-loop; 0 = closed-loop")
+    parser.add_argument("--arrivals", choices = ["uniform", "poisson"], default = "uniform")
+    parser.add_argument("--concurrency", type = int, default = 16)
+    parser.add_argument("--shuffle", action = "store_true", help = "acak urutan request")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--json", action = "store_true", help = "cetak laporan sebagai JSON")
+    args = parser.parse_args()
+
+    requests = load_requests(args.source)
+    if not requests:
+        parser.error("tidak ada request di " + args.source)
+    if args.shuffle:
+        random.Random(args.seed).shuffle(requests)
+    target = HttpTarget(args.url) if args.url else InProcessTarget()
+    report = replay(target, requests, n = args.requests, qps = args.qps, arrivals = args.arrivals,
+                    concurrency = args.concurrency, seed = args.seed)
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(f"requests={report['requests']} duration={report['duration_s']}s "
+              f"throughput={report['throughput_qps']} qps (offered: {report['offered_qps'] or 'closed-loop'})")
+        print("latency ms: " + " ".join(f"{name}={value}" for name, value in report["latency_ms"].items()))
+        print(f"error rate: {report['error_rate']:.2%}  status: {report['status_counts']}")
@@ -1,5 +1,4 @@
 from bsbi import BSBIIndex
-from letor import Letor
 from compression import VBEPostings
 
 # sebelumnya sudah dilakukan indexing
@@ -8,18 +7,18 @@ BSBI_instance = BSBIIndex(data_dir = 'collection', \
                           postings_encoding = VBEPostings, \
                           output_dir = 'index')
 
-LETOR_instance = Letor()
+if __name__ == "__main__":
 
-queries = ["alkylated with radioactive iodoacetate"]
-for query in queries:
-    print("Query  : ", query)
-    tfidf = BSBI_instance.retrieve_tfidf(query, k = 100)
-    bm25 = BSBI_instance.retrieve_bm25(query, k = 100)
-    print("Results TF-IDF:")
-    for (score, doc) in tfidf:
-        print(f"{doc:30} {score:>.3f}")
-    print()
-    print("Results BM25:")
-    for (score, doc) in bm25:
-        print(f"{doc:30} {score:>.3f}")
-    print()
\ No newline at end of file
+    queries = ["alkylated with radioactive iodoacetate"]
+    for query in queries:
+        print("Query  : ", query)
+        tfidf = BSBI_instance.retrieve_tfidf(query, k = 100)
+        bm25 = BSBI_instance.retrieve_bm25(query, k = 100)
+        print("Results TF-IDF:")
+        for (score, doc) in tfidf:
+            print(f"{doc:30} {score:>.3f}")
+        print()
+        print("Results BM25:")
+        for (score, doc) in bm25:
+            print(f"{doc:30} {score:>.3f}")
+        print()
@@ -0,0 +1,162 @@
+import math
+import heapq
+import contextlib
+import multiprocessing
+
+from index import InvertedIndexReader, InvertedIndexWriter
+from bsbi import bm25_score
+from util import sorted_merge_posts_and_tfs
+
+def shard_name(index_name, shard_id):
+    return index_name + '_shard_' + str(shard_id)
+
+def build_shards(bsbi_index, num_shards):
+    """
+    Memecah merged index milik bsbi_index menjadi num_shards index yang
+    dipartisi berdasarkan dokumen (doc ID i masuk ke shard i % num_shards).
+    Setiap shard adalah inverted index biasa (InvertedIndexWriter) dengan
+    doc_length untuk dokumennya sendiri, sehingga statistik global (df, N,
+    total panjang dokumen) bisa diagregasi ulang dari metadata semua shard.
+    """
+    with InvertedIndexReader(bsbi_index.index_name, bsbi_index.postings_encoding, bsbi_index.output_dir) as merged_index:
+        with contextlib.ExitStack() as stack:
+            shards = [stack.enter_context(InvertedIndexWriter(shard_name(bsbi_index.index_name, i),
+                                                              bsbi_index.postings_encoding,
+                                                              directory = bsbi_index.output_dir))
+                      for i in range(num_shards)]
+            for term, postings_list, tf_list in merged_index:
+                parts = [([], []) for _ in range(num_shards)]
+                for doc_id, tf in zip(postings_list, tf_list):
+                    part = parts[doc_id % num_shards]
+                    part[0].append(doc_id)
+                    part[1].append(tf)
+                for shard, (shard_postings, shard_tfs) in zip(shards, parts):
+                    if shard_postings:
+                        shard.append(term, shard_postings, shard_tfs)
+
+def score_bm25_shard(index, terms, avg_doc_length, k, k1, b):
+    """
+    Scoring BM25 TaaT di satu shard dengan statistik global.
+
+    terms adalah list of (term ID, idf global), sudah terurut seperti urutan
+    akumulasi di BSBIIndex.retrieve_bm25 (df global mengecil ke membesar),
+    sehingga penjumlahan floating-point-nya identik dengan index tunggal.
+    Mengembalikan top-k (score, doc ID), terurut score mengecil lalu doc ID.
+    """
+    posts_tfs = []
+    for term_id, idf in terms:
+        if term_id not in index.postings_dict:
+            continue
+        postings_list, tf_list = index.get_postings_list(term_id)
+        posts_tfs2 = [(doc_id, bm25_score(tf, index.doc_length[doc_id], avg_doc_length, idf, k1, b))
+                      for doc_id, tf in zip(postings_list, tf_list)]
+        posts_tfs = sorted_merge_posts_and_tfs(posts_tfs, posts_tfs2)
+    return heapq.nsmallest(k, [(score, doc_id) for doc_id, score in posts_tfs], key = lambda x: (-x[0], x[1]))
+
+def serve_shard(index_name, postings_encoding, output_dir, conn):
+    """
+    Loop utama proses shard server: index shard dibuka sekali, lalu setiap
+    request (terms, avg_doc_length, k, k1, b) dijawab dengan top-k lokal.
+    Request None menghentikan server.
+    """
+    with InvertedIndexReader(index_name, postings_encoding, output_dir) as index:
+        conn.send((index.postings_dict, index.doc_length))
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            conn.send(score_bm25_shard(index, *request))
+    conn.close()
+
+
+class ShardBroker:
+    """
+    Broker untuk index yang di-shard: menjalankan satu proses shard server per
+    shard (lokal, lewat multiprocessing), lalu untuk setiap query mengirim
+    request ke semua shard sekaligus (scatter) dan menggabungkan top-k
+    masing-masing shard (gather).
+
+    df, N, dan rata-rata panjang dokumen diagregasi dari semua shard saat
+    start, sehingga score BM25 identik dengan index tunggal.
+    """
+    def __init__(self, bsbi_index, num_shards):
+        self.bsbi_index = bsbi_index
+        self.num_shards = num_shards
+        self.processes = []
+        self.connections = []
+        self.df = {}
+        self.N = 0
+        self.total_doc_length = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def start(self):
+        self.bsbi_index.load()
+        for i in range(self.num_shards):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target = serve_shard,
+                                              args = (shard_name(self.bsbi_index.index_name, i),
+                                                      self.bsbi_index.postings_encoding,
+                                                      self.bsbi_index.output_dir, child_conn),
+                                              daemon = True)
+            process.start()
+            self.processes.append(process)
+            self.connections.append(parent_conn)
+
+        # agregasi statistik global dari metadata semua shard
+        for conn in self.connections:
+            postings_dict, doc_length = conn.recv()
+            for term_id, entry in postings_dict.items():
+                self.df[term_id] = self.df.get(term_id, 0) + entry[1]
+            self.N += len(doc_length)
+            self.total_doc_length += sum(doc_length.values())
+
+    def close(self):
+        for conn in self.connections:
+            conn.send(None)
+        for process in self.processes:
+            process.join()
+        self.processes = []
+        self.connections = []
+
+    def retrieve_bm25(self, query, k = 10, k1=1.4, b=0.75):
+        """Sama seperti BSBIIndex.retrieve_bm25, namun dieksekusi di semua shard"""
+        tokenized = self.bsbi_index.analyze_query(query)
+        term_ids = [self.bsbi_index.term_id_map[token] for token in tokenized
+                    if token in self.bsbi_index.term_id_map]
+        # urutan akumulasi sama dengan index tunggal: df mengecil ke membesar (stable)
+        term_ids.sort(key = lambda term_id: self.df[term_id])
+        terms = [(term_id, math.log(self.N / self.df[term_id])) for term_id in term_ids]
+        avg_doc_length = self.total_doc_length / self.N
+
+        for conn in self.connections:
+            conn.send((terms, avg_doc_length, k, k1, b))
+        results = [conn.recv() for conn in self.connections]
+
+        merged = heapq.merge(*results, key = lambda x: (-x[0], x[1]))
+        return [(score, self.bsbi_index.doc_id_map[doc_id]) for (score, doc_id) in list(merged)[:k]]
+
+
+if __name__ == "__main__":
+
+    from bsbi import BSBIIndex
+    from compression import VBEPostings
+
+    BSBI_instance = BSBIIndex(data_dir = 'collection', \
+                              postings_encoding = VBEPostings, \
+                              output_dir = 'index')
+    NUM_SHARDS = 4
+    build_shards(BSBI_instance, NUM_SHARDS)
+
+    # hasil scatter-gather harus identik dengan index tunggal
+    with ShardBroker(BSBI_instance, NUM_SHARDS) as broker:
+        with open("queries.txt") as file:
+            for qline in file:
+                query = " ".join(qline.strip().split()[1:])
+                expected = BSBI_instance.retrieve_bm25(query, k = 100)
+                assert broker.retrieve_bm25(query, k = 100) == expected, "hasil shard berbeda: " + query
@@ -0,0 +1,174 @@
+import os
+import pickle
+import array
+import itertools
+
+class SpellingCorrector:
+    """
+    Koreksi ejaan untuk token query yang tidak ada di vocabulary, dengan
+    pendekatan symmetric delete (SymSpell).
+
+    Saat build, untuk setiap term di vocabulary dibangkitkan semua string
+    hasil menghapus sampai max_edit_distance karakter (dari prefix sepanjang
+    prefix_length), lalu disimpan mapping delete -> term. Saat lookup, cukup
+    membangkitkan delete dari token query dan mencocokkannya ke mapping
+    tersebut; kandidat yang didapat diverifikasi dengan edit distance
+    (Damerau-Levenshtein / optimal string alignment) dan diurutkan
+    berdasarkan (jarak, -df). Tidak ada scan ke seluruh vocabulary.
+
+    Attributes
+    ----------
+    terms: List[str]
+    dfs: array.array('L'), df setiap term
+    deletes: Dict[str, List[int]], delete -> indeks term di self.terms
+    """
+    def __init__(self, output_dir, name = "spelling", max_edit_distance = 2, prefix_length = 7):
+        self.file_path = os.path.join(output_dir, name + '.dict')
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.terms = []
+        self.dfs = array.array('L')
+        self.term_index = {}
+        self.deletes = {}
+
+    def build(self, term_id_map, postings_dict):
+        """Membangun deletion index dari vocabulary (term_id_map) dan df di postings_dict"""
+        pairs = sorted((term_id_map[term_id], entry[1]) for term_id, entry in postings_dict.items())
+        self.terms = [term for term, _ in pairs]
+        self.dfs = array.array('L', [df for _, df in pairs])
+        self.term_index = {term: i for i, term in enumerate(self.terms)}
+        self.deletes = {}
+        for i, term in enumerate(self.terms):
+            for delete in self.generate_deletes(term[:self.prefix_length]):
+                self.deletes.setdefault(delete, []).append(i)
+        return self
+
+    def save(self):
+        with open(self.file_path, 'wb') as f:
+            pickle.dump([self.max_edit_distance, self.prefix_length, self.terms, self.dfs, self.deletes], f)
+
+    def load(self):
+        with open(self.file_path, 'rb') as f:
+            self.max_edit_distance, self.prefix_length, self.terms, self.dfs, self.deletes = pickle.load(f)
+        self.term_index = {term: i for i, term in enumerate(self.terms)}
+        return self
+
+    def generate_deletes(self, word, max_edit_distance = None):
+        """Semua string hasil menghapus 0..max_edit_distance karakter dari word"""
+        if max_edit_distance is None:
+            max_edit_distance = self.max_edit_distance
+        result = {word}
+        for distance in range(1, min(max_edit_distance, len(word) - 1) + 1):
+            for removed in itertools.combinations(range(len(word)), distance):
+                result.add(''.join(c for i, c in enumerate(word) if i not in removed))
+        return result
+
+    def lookup(self, word, max_edit_distance = None, n = 5):
+        """
+        Mengembalikan paling banyak n kandidat (term, jarak, df) untuk word,
+        terurut berdasarkan jarak lalu df terbesar.
+
+        Secara default, kata pendek (<= 4 karakter) hanya boleh berjarak 1;
+        jarak 2 pada kata sependek itu hampir selalu menghasilkan kata lain.
+        """
+        if max_edit_distance is None:
+            max_edit_distance = 1 if len(word) <= 4 else self.max_edit_distance
+        max_edit_distance = min(max_edit_distance, self.max_edit_distance)
+        if word in self.term_index:
+            i = self.term_index[word]
+            return [(word, 0, self.dfs[i])]
+
+        candidates = set()
+        for delete in self.generate_deletes(word[:self.prefix_length], max_edit_distance):
+            candidates.update(self.deletes.get(delete, ()))
+
+        result = []
+        for i in candidates:
+            term = self.terms[i]
+            if abs(len(term) - len(word)) > max_edit_distance:
+                continue
+            distance = edit_distance(word, term, max_edit_distance)
+            if distance <= max_edit_distance:
+                result.append((term, distance, self.dfs[i]))
+        result.sort(key = lambda x: (x[1], -x[2], x[0]))
+        return result[:n]
+
+    def correct(self, word, max_edit_distance = None):
+        """Koreksi terbaik untuk word, atau None jika tidak ada kandidat"""
+        candidates = self.lookup(word, max_edit_distance, n = 1)
+        return candidates[0][0] if candidates else None
+
+
+def edit_distance(s, t, max_distance):
+    """
+    Optimal string alignment distance (Levenshtein + transposisi dua karakter
+    bersebelahan). Mengembalikan max_distance + 1 begitu jarak dipastikan
+    melebihi max_distance.
+
+    Prefix dan suffix yang sama dibuang terlebih dahulu (kandidat dari deletion
+    index biasanya berbagi prefix panjang dengan token query), lalu DP hanya
+    dihitung di band selebar 2 * max_distance + 1 di sekitar diagonal.
+    """
+    start = 0
+    while start < len(s) and start < len(t) and s[start] == t[start]:
+        start += 1
+    end_s, end_t = len(s), len(t)
+    while end_s > start and end_t > start and s[end_s - 1] == t[end_t - 1]:
+        end_s -= 1
+        end_t -= 1
+    s, t = s[start:end_s], t[start:end_t]
+    if abs(len(s) - len(t)) > max_distance:
+        return max_distance + 1
+    if not s or not t:
+        return max(len(s), len(t))
+
+    big = max_distance + 1
+    prev_prev = None
+    prev = [j if j <= max_distance else big for j in range(len(t) + 1)]
+    for i in range(1, len(s) + 1):
+        curr = [big] * (len(t) + 1)
+        if i <= max_distance:
+            curr[0] = i
+        for j in range(max(1, i - max_distance), min(len(t), i + max_distance) + 1):
+            cost = 0 if s[i - 1] == t[j - 1] else 1
+            value = min(prev[j] + 1, curr[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and s[i - 1] == t[j - 2] and s[i - 2] == t[j - 1]:
+                value = min(value, prev_prev[j - 2] + 1)
+            curr[j] = min(value, big)
+        if min(curr) > max_distance:
+            return big
+        prev_prev, prev = prev, curr
+    return prev[-1]
+
+
+if __name__ == "__main__":
+
+    assert edit_distance("fluid", "fluid", 2) == 0, "edit_distance salah"
+    assert edit_distance("fliud", "fluid", 2) == 1, "edit_distance salah (transposisi)"
+    assert edit_distance("flud", "fluid", 2) == 1, "edit_distance salah"
+    assert edit_distance("abcdef", "ghijkl", 2) == 3, "edit_distance salah"
+    assert edit_distance("radioactiv", "radioactive", 2) == 1, "edit_distance salah"
+    assert edit_distance("kitten", "sitting", 3) == 3, "edit_distance salah"
+    assert edit_distance("ca", "abc", 3) == 3, "edit_distance salah (OSA)"
+
+    from util import IdMap
+    vocab = IdMap()
+    postings_dict = {vocab[term]: (0, df, 0, 0) for term, df in [("fluid", 10), ("fluids", 2), ("flu", 5), ("cerebrospinal", 4)]}
+    corrector = SpellingCorrector('').build(vocab, postings_dict)
+    assert corrector.correct("fluid") == "fluid", "correct salah"
+    assert corrector.correct("fliud") == "fluid", "correct salah"
+    assert corrector.correct("cerebrospinl") == "cerebrospinal", "correct salah"
+    assert corrector.correct("xyzxyz") is None, "correct salah"
+    assert [term for term, _, _ in corrector.lookup("flui")] == ["fluid", "flu"], "lookup salah"
+    assert [term for term, _, _ in corrector.lookup("flui", 2)] == ["fluid", "flu", "fluids"], "lookup salah"
+
+    import sys
+    if "--build" in sys.argv:
+        from index import InvertedIndexReader
+        from compression import VBEPostings
+
+        # membangun ulang spelling.dict dari index yang sudah ada
+        with open('index/terms.dict', 'rb') as f:
+            term_id_map = pickle.load(f)
+        with InvertedIndexReader('main_index', VBEPostings, 'index') as index:
+            SpellingCorrector('index').build(term_id_map, index.postings_dict).save()
@@ -0,0 +1,111 @@
+import os
+import pickle
+import bisect
+import heapq
+import array
+
+class TermSuggester:
+    """
+    Prefix autocomplete atas vocabulary index.
+
+    Semua term (hasil analisis, sama seperti di terms.dict) disimpan sebagai
+    sorted list, dengan document frequency di array sejajar. Term-term yang
+    berawalan prefix tertentu selalu berada pada satu rentang berurutan di
+    sorted list, sehingga rentang tersebut bisa ditemukan dengan dua kali
+    binary search, tanpa scan vocabulary.
+
+    Untuk prefix pendek yang rentangnya besar (misal "c"), top-N berdasarkan
+    df sudah di-precompute saat build; rentang kecil cukup diambil top-N
+    dengan heap.
+
+    Attributes
+    ----------
+    terms: List[str], sorted
+    dfs: array.array('L'), dfs[i] adalah df dari terms[i]
+    top_cache: Dict[str, List[int]], prefix -> indeks top-N di terms
+    """
+
+    MAX_SUGGESTIONS = 20
+    # rentang yang lebih besar dari ini di-precompute top-N nya
+    CACHE_THRESHOLD = 256
+
+    def __init__(self, output_dir, name = "suggest"):
+        self.file_path = os.path.join(output_dir, name + '.dict')
+        self.terms = []
+        self.dfs = array.array('L')
+        self.top_cache = {}
+
+    def build(self, term_id_map, postings_dict):
+        """
+        Membangun sorted term array dari term_id_map (IdMap) dan df dari
+        postings_dict milik merged index. Term yang tidak punya postings
+        tidak dimasukkan.
+        """
+        pairs = sorted((term_id_map[term_id], entry[1]) for term_id, entry in postings_dict.items())
+        self.terms = [term for term, _ in pairs]
+        self.dfs = array.array('L', [df for _, df in pairs])
+
+        self.top_cache = {}
+        prefixes = {term[:length] for term in self.terms for length in range(1, 4)}
+        for prefix in prefixes:
+            lo, hi = self.prefix_range(prefix)
+            if hi - lo > self.CACHE_THRESHOLD:
+                self.top_cache[prefix] = self.top_in_range(lo, hi, self.MAX_SUGGESTIONS)
+        return self
+
+    def save(self):
+        with open(self.file_path, 'wb') as f:
+            pickle.dump([self.terms, self.dfs, self.top_cache], f)
+
+    def load(self):
+        with open(self.file_path, 'rb') as f:
+            self.terms, self.dfs, self.top_cache = pickle.load(f)
+        return self
+
+    def prefix_range(self, prefix):
+        """Rentang [lo, hi) di self.terms yang berawalan prefix"""
+        lo = bisect.bisect_left(self.terms, prefix)
+        # semua string berawalan prefix < prefix + karakter unicode terbesar
+        hi = bisect.bisect_left(self.terms, prefix + '\U0010ffff', lo)
+        return lo, hi
+
+    def top_in_range(self, lo, hi, n):
+        """Indeks top-n term di rentang [lo, hi) berdasarkan df (df sama: urut alfabet)"""
+        return heapq.nsmallest(n, range(lo, hi), key = lambda i: (-self.dfs[i], i))
+
+    def suggest(self, prefix, n = 10):
+        """
+        Mengembalikan paling banyak n pasangan (term, df) berawalan prefix,
+        terurut mengecil berdasarkan df.
+        """
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        n = min(n, self.MAX_SUGGESTIONS)
+        if prefix in self.top_cache:
+            top = self.top_cache[prefix][:n]
+        else:
+            lo, hi = self.prefix_range(prefix)
+            top = self.top_in_range(lo, hi, n)
+        return [(self.terms[i], self.dfs[i]) for i in top]
+
+
+if __name__ == "__main__":
+
+    from bsbi import BSBIIndex
+    from index import InvertedIndexReader
+    from compression import VBEPostings
+
+    # membangun ulang suggest.dict dari index yang sudah ada
+    BSBI_instance = BSBIIndex(data_dir = 'collection', \
+                              postings_encoding = VBEPostings, \
+                              output_dir = 'index')
+    BSBI_instance.load()
+    with InvertedIndexReader(BSBI_instance.index_name, VBEPostings, BSBI_instance.output_dir) as index:
+        suggester = TermSuggester(BSBI_instance.output_dir).build(BSBI_instance.term_id_map, index.postings_dict)
+    suggester.save()
+
+    suggestions = suggester.suggest("ce")
+    assert all(term.startswith("ce") for term, _ in suggestions), "suggestion salah"
+    assert [df for _, df in suggestions] == sorted([df for _, df in suggestions], reverse = True), "urutan df salah"
+    print(suggestions)
@@ -0,0 +1,215 @@
+import os
+import math
+import heapq
+import pickle
+import collections
+
+from index import InvertedIndexReader, InvertedIndexWriter
+from bsbi import bm25_score
+
+class TieredIndex:
+    """
+    Index dua tier dengan static pruning untuk BM25.
+
+    Tier 2 adalah merged index biasa (semua postings). Tier 1 berisi, untuk
+    setiap term, hanya postings dengan score BM25 terbesar: semua postings
+    untuk term dengan df <= min_postings, selain itu ceil(fraction * df)
+    postings teratas. Untuk setiap term juga disimpan residual bound, yaitu
+    score BM25 terbesar di antara postings yang TIDAK masuk tier 1 (0 jika
+    semua postings masuk).
+
+    Retrieval membaca tier 1 saja, lalu memeriksa apakah top-k pasti sama
+    dengan top-k tier 2:
+
+        1. score parsial L(d) dari tier 1. Score dokumen sudah exact jika
+           setiap term query dengan residual bound > 0 memuat d di tier 1
+           (term lain tier 1-nya lengkap); selain itu score-nya dibatasi
+           U(d) = L(d) + sum residual bound term yang tidak memuat d. Dokumen
+           yang tidak muncul di tier 1 dibatasi oleh jumlah residual bound
+           semua term query
+        2. aman jika score exact ke-k lebih besar dari U(d) semua dokumen yang
+           score-nya belum exact; jika tidak, postings lengkap (tier 2) dibaca
+           hanya untuk term dengan residual bound terbesar (bound-nya menjadi
+           0, jadi lebih banyak dokumen yang exact), lalu kembali ke langkah 2.
+           Setelah semua term memakai tier 2, semua score exact.
+
+    Tidak ada term vector yang dibaca: kontribusi yang hilang selalu diambil
+    dari postings tier 2. Kontribusi setiap term dijumlahkan dengan urutan yang
+    sama dengan retrieve_bm25 (term terurut df), sehingga hasilnya identik,
+    termasuk score-nya.
+
+    Metadata (postings_dict tier 1 dan tier 2, doc_length) dimuat sekali oleh
+    load(); per query hanya file .index yang dibuka. Karena itu TieredIndex
+    dipakai untuk index yang tidak berubah lagi (misal sebuah generasi).
+    BSBIIndex.enable_tiering() memasang TieredIndex ke retrieve_bm25.
+
+    Files: <index_name>_tier1.index/.dict (InvertedIndex) dan
+    <index_name>_tier1.tierdict (residual bound, k1, b).
+    """
+
+    FRACTION = 0.1
+    MIN_POSTINGS = 64
+    # toleransi relatif: bound dijumlahkan dengan urutan berbeda dari score exact
+    EPSILON = 1e-9
+
+    def __init__(self, bsbi_index, fraction = FRACTION, min_postings = MIN_POSTINGS):
+        self.bsbi_index = bsbi_index
+        self.name = bsbi_index.index_name + '_tier1'
+        self.metadata_file_path = os.path.join(bsbi_index.output_dir, self.name + '.tierdict')
+        self.fraction = fraction
+        self.min_postings = min_postings
+        self.bounds = None
+        self.k1 = None
+        self.b = None
+        # metadata tier 2 (merged index) dan tier 1, dimuat oleh load()
+        self.index = None
+        self.tier1 = None
+        self.avg_doc_length = 0
+        # bytes_decoded: bytes postings yang benar-benar di-decode (tier 1 dan tier 2),
+        # bytes_full: bytes yang di-decode jika semua query langsung dijawab tier 2
+        self.stats = {"tier1": 0, "upgraded": 0, "bytes_decoded": 0, "bytes_full": 0}
+
+    def exists(self):
+        return os.path.exists(self.metadata_file_path)
+
+    def build(self, k1=1.4, b=0.75):
+        """Membangun tier 1 dari merged index BSBIIndex"""
+        bsbi_index = self.bsbi_index
+        self.bounds = {}
+        self.k1, self.b = k1, b
+        with InvertedIndexReader(bsbi_index.index_name, bsbi_index.postings_encoding, bsbi_index.output_dir) as index, \
+             InvertedIndexWriter(self.name, bsbi_index.postings_encoding, directory = bsbi_index.output_dir) as tier1:
+            doc_length = index.doc_length
+            N = len(doc_length)
+            avg_doc_length = sum(doc_length.values()) / N
+            for term, postings_list, tf_list in index:
+                idf = math.log(N / len(postings_list))
+                keep = len(postings_list)
+                if keep > self.min_postings:
+                    keep = max(self.min_postings, math.ceil(self.fraction * keep))
+                scored = sorted(((bm25_score(tf, doc_length[doc_id], avg_doc_length, idf, k1, b), doc_id, tf)
+                                 for doc_id, tf in zip(postings_list, tf_list)), key = lambda x: (-x[0], x[1]))
+                kept = sorted(scored[:keep], key = lambda x: x[1])
+                tier1.append(term, [doc_id for (_, doc_id, _) in kept], [tf for (_, _, tf) in kept])
+                self.bounds[term] = scored[keep][0] if keep < len(scored) else 0.
+        with open(self.metadata_file_path, 'wb') as f:
+            pickle.dump([self.k1, self.b, self.bounds], f)
+        self.index = self.tier1 = None
+        return self
+
+    def load(self):
+        """Memuat residual bound, k1, b, serta metadata tier 1 dan tier 2 (sekali)"""
+        if self.bounds is None:
+            with open(self.metadata_file_path, 'rb') as f:
+                self.k1, self.b, self.bounds = pickle.load(f)
+        if self.index is None:
+            bsbi_index = self.bsbi_index
+            # reader hanya dipakai untuk metadata-nya; file .index dibuka per query
+            with InvertedIndexReader(bsbi_index.index_name, bsbi_index.postings_encoding, bsbi_index.output_dir) as index, \
+                 InvertedIndexReader(self.name, bsbi_index.postings_encoding, bsbi_index.output_dir) as tier1:
+                N = len(index.doc_length)
+                self.avg_doc_length = sum(index.doc_length.values()) / N if N > 0 else 0
+                self.index, self.tier1 = index, tier1
+        return self
+
+    def read_postings(self, index, index_file, term_id):
+        """(postings_list, tf_list) sebuah term dari index_file, dengan metadata index yang sudah dimuat"""
+        start_position_in_index_file, _, length_in_bytes_of_postings_list, length_in_bytes_of_tf_list = \
+            index.postings_dict[term_id]
+        self.stats["bytes_decoded"] += length_in_bytes_of_postings_list + length_in_bytes_of_tf_list
+        index_file.seek(start_position_in_index_file)
+        postings_list = index.postings_encoding.decode(index_file.read(length_in_bytes_of_postings_list))
+        tf_list = index.postings_encoding.decode_tf(index_file.read(length_in_bytes_of_tf_list))
+        return postings_list, tf_list
+
+    def retrieve(self, query, k = 10):
+        """
+        Returns
+        -------
+        Tuple[List[(float, str)], bool]
+            (hasil yang sama dengan BSBIIndex.retrieve_bm25(query, k) dengan k1
+            dan b saat build, True jika tidak ada postings list tier 2 yang
+            perlu dibaca)
+        """
+        bsbi_index = self.bsbi_index
+        bsbi_index.load()
+        self.load()
+        k1, b = self.k1, self.b
+        index, doc_length, avg_doc_length = self.index, self.index.doc_length, self.avg_doc_length
+        N = len(doc_length)
+        term_ids = [bsbi_index.term_id_map[token] for token in bsbi_index.analyze_query(query)
+                    if token in bsbi_index.term_id_map]
+        # urutan akumulasi sama seperti retrieve_bm25: df mengecil ke membesar
+        term_ids.sort(key = lambda term_id: index.postings_dict[term_id][1])
+        if not term_ids:
+            return [], True
+        # term yang muncul lebih dari sekali di query dijumlahkan sebanyak kemunculannya
+        counts = collections.Counter(term_ids)
+        idf = {term_id: math.log(N / index.postings_dict[term_id][1]) for term_id in counts}
+        bounds = {term_id: self.bounds[term_id] for term_id in counts}
+        self.stats["bytes_full"] += sum(index.postings_dict[term_id][2] + index.postings_dict[term_id][3]
+                                        for term_id in term_ids)
+
+        # doc ID -> {term ID -> score BM25 term tersebut (sekali kemunculan)}
+        contributions = {}
+        def accumulate(term_id, postings_list, tf_list):
+            for doc_id, tf in zip(postings_list, tf_list):
+                contributions.setdefault(doc_id, {})[term_id] = \
+                    bm25_score(tf, doc_length[doc_id], avg_doc_length, idf[term_id], k1, b)
+
+        with open(self.tier1.index_file_path, 'rb') as tier1_file:
+            for term_id in counts:
+                accumulate(term_id, *self.read_postings(self.tier1, tier1_file, term_id))
+
+        from_tier1 = True
+        with open(index.index_file_path, 'rb') as index_file:
+            while True:
+                unseen_bound = sum(counts[term_id] * bound for term_id, bound in bounds.items())
+                exact = {}
+                remaining_bound = unseen_bound
+                for doc_id, contribution in contributions.items():
+                    # score exact dijumlahkan dengan urutan term_ids, sama seperti retrieve_bm25
+                    score = 0.
+                    for term_id in term_ids:
+                        if term_id in contribution:
+                            score += contribution[term_id]
+                    missing = sum(counts[term_id] * bound for term_id, bound in bounds.items()
+                                  if bound > 0. and term_id not in contribution)
+                    if missing == 0.:
+                        exact[doc_id] = score
+                    else:
+                        remaining_bound = max(remaining_bound, score + missing)
+                top = heapq.nsmallest(k, exact.items(), key = lambda x: (-x[1], x[0]))
+                if unseen_bound == 0. or (len(top) == k and top[-1][1] > remaining_bound * (1 + self.EPSILON)):
+                    self.stats["tier1" if from_tier1 else "upgraded"] += 1
+                    return [(score, bsbi_index.doc_id_map[doc_id]) for (doc_id, score) in top], from_tier1
+
+                # belum aman: postings lengkap (tier 2) dibaca untuk term dengan residual bound terbesar
+                term_id = max((term_id for term_id in counts if bounds[term_id] > 0.),
+                              key = lambda term_id: (counts[term_id] * bounds[term_id], term_id))
+                accumulate(term_id, *self.read_postings(index, index_file, term_id))
+                bounds[term_id] = 0.
+                from_tier1 = False
+
+if __name__ == "__main__":
+
+    from bsbi import BSBIIndex
+    from compression import VBEPostings
+
+    BSBI_instance = BSBIIndex(data_dir = 'collection', \
+                              postings_encoding = VBEPostings, \
+                              output_dir = 'index')
+    if not TieredIndex(BSBI_instance).exists():
+        TieredIndex(BSBI_instance).build()
+    tiered = BSBI_instance.enable_tiering()
+
+    with open("queries.txt") as file:
+        for qline in file:
+            query = " ".join(qline.strip().split()[1:])
+            result, from_tier1 = tiered.retrieve(query, k = 10)
+            assert result == BSBI_instance.retrieve_bm25(query, k = 10, tiered = False), "hasil tier 1 berbeda dari tier 2"
+            assert BSBI_instance.retrieve_bm25(query, k = 10) == result, "retrieve_bm25 dengan tier 1 salah"
+            print(qline.split()[0], "tier 1" if from_tier1 else "tier 1 + tier 2")
+    print("bytes decoded:", tiered.stats["bytes_decoded"], "tanpa tier 1:", tiered.stats["bytes_full"],
+          "tier 1:", tiered.stats["tier1"], "upgraded:", tiered.stats["upgraded"])
+    assert tiered.stats["bytes_decoded"] < tiered.stats["bytes_full"], "tier 1 men-decode lebih banyak bytes dari postings lengkap"
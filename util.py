@@ -1,3 +1,11 @@
+import os
+import mmap
+import zlib
+import array
+import struct
+import bisect
+import heapq
+
 class IdMap:
     """
     Ingat kembali di kuliah, bahwa secara praktis, sebuah dokumen dan
@@ -27,6 +35,13 @@ class IdMap:
         """Mengembalikan banyaknya term (atau dokumen) yang disimpan di IdMap."""
         return len(self.id_to_str)
 
+    def __contains__(self, s):
+        """
+        Cek apakah string s sudah ada di IdMap, tanpa meng-assign id baru.
+        Tanpa method ini, operator `in` akan scan id_to_str lewat __getitem__.
+        """
+        return s in self.str_to_id
+
     def __get_str(self, i):
         """Mengembalikan string yang terasosiasi dengan index i."""
         return self.id_to_str[i]
@@ -64,6 +79,156 @@ class IdMap:
         else:
             raise TypeError
 
+class DocTable:
+    """
+    Pengganti IdMap untuk dokumen: mapping relative path dokumen (misal
+    "1/13.txt", relatif terhadap data_dir) <-> docID, ditambah external ID
+    setiap dokumen (misal ID numerik yang dipakai di qrels.txt).
+
+    Alih-alih satu dictionary dan satu list berisi objek str per dokumen,
+    semua path disimpan sebagai satu blob bytes (UTF-8) yang bersambung:
+
+        blob[offsets[i]:offsets[i + 1]]  -> path dokumen dengan docID i
+        external_ids[i]                  -> external ID dokumen i
+        slots                            -> hash table open addressing
+                                            (linear probing), berisi docID
+                                            atau -1; slot awal sebuah path
+                                            adalah crc32(path) & (len(slots) - 1)
+
+    Di file (docs.table), keempatnya ditulis berurutan setelah header
+    <N, len(slots), len(blob)>, sehingga saat load file cukup di-mmap:
+    id -> path O(1) dan path -> id rata-rata O(1), tanpa membangun objek
+    Python per dokumen. Tabel hasil load bersifat read-only.
+    """
+
+    NO_EXTERNAL_ID = -1
+    HEADER = struct.Struct('<3Q')
+
+    def __init__(self):
+        self.blob = bytearray()
+        self.offsets = array.array('Q', [0])
+        self.external_ids = array.array('q')
+        # selama build, path -> id cukup disimpan di dictionary biasa;
+        # hash table (slots) baru dibangun saat save
+        self.building = {}
+        self.slots = None
+        # mmap file docs.table (hanya untuk tabel hasil load), dilepas oleh close()
+        self.mapped = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def close(self):
+        """Melepas mmap tabel hasil load; tabel tidak bisa dipakai lagi setelahnya"""
+        if self.mapped is None:
+            return
+        # semua memoryview atas mmap harus dilepas dulu sebelum mmap bisa ditutup
+        for view in [self.offsets, self.external_ids, self.slots, self.blob]:
+            view.release()
+        self.mapped.close()
+        self.mapped = None
+
+    def __contains__(self, path):
+        return self.find(path) is not None
+
+    def __getitem__(self, key):
+        """Sama seperti IdMap: int -> path, str -> docID (di-assign jika belum ada)"""
+        if type(key) is int:
+            return self.get_path(key)
+        elif type(key) is str:
+            return self.add(key)
+        else:
+            raise TypeError
+
+    def get_path(self, doc_id):
+        if not 0 <= doc_id < len(self):
+            raise IndexError(doc_id)
+        return bytes(self.blob[self.offsets[doc_id]:self.offsets[doc_id + 1]]).decode('utf-8')
+
+    def external_id(self, doc_id):
+        """External ID dokumen doc_id, atau NO_EXTERNAL_ID"""
+        return self.external_ids[doc_id]
+
+    def find(self, path):
+        """docID dari path, atau None jika path tidak ada"""
+        if self.slots is None:
+            return self.building.get(path)
+        encoded = path.encode('utf-8')
+        mask = len(self.slots) - 1
+        slot = zlib.crc32(encoded) & mask
+        while self.slots[slot] != -1:
+            doc_id = self.slots[slot]
+            if self.blob[self.offsets[doc_id]:self.offsets[doc_id + 1]] == encoded:
+                return doc_id
+            slot = (slot + 1) & mask
+        return None
+
+    def add(self, path, external_id = NO_EXTERNAL_ID):
+        """
+        Menambahkan dokumen (jika belum ada) dan mengembalikan docID-nya.
+        docID di-assign berurutan mulai dari 0.
+        """
+        doc_id = self.find(path)
+        if doc_id is not None:
+            return doc_id
+        if self.slots is not None:
+            raise ValueError("DocTable hasil load bersifat read-only: " + path)
+        doc_id = len(self)
+        self.blob += path.encode('utf-8')
+        self.offsets.append(len(self.blob))
+        self.external_ids.append(external_id)
+        self.building[path] = doc_id
+        return doc_id
+
+    def save(self, file_path):
+        n_slots = 2
+        while n_slots < 2 * len(self):
+            n_slots *= 2
+        slots = array.array('q', [-1]) * n_slots
+        for doc_id in range(len(self)):
+            slot = zlib.crc32(self.blob[self.offsets[doc_id]:self.offsets[doc_id + 1]]) & (n_slots - 1)
+            while slots[slot] != -1:
+                slot = (slot + 1) & (n_slots - 1)
+            slots[slot] = doc_id
+        with open(file_path, 'wb') as f:
+            f.write(self.HEADER.pack(len(self), n_slots, len(self.blob)))
+            f.write(array.array('Q', self.offsets).tobytes())
+            f.write(array.array('q', self.external_ids).tobytes())
+            f.write(slots.tobytes())
+            f.write(self.blob)
+
+    @classmethod
+    def load(cls, file_path):
+        """Memuat DocTable dari file dengan mmap (read-only)"""
+        table = cls()
+        with open(file_path, 'rb') as f:
+            table.mapped = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        data = memoryview(table.mapped)
+        N, n_slots, blob_length = cls.HEADER.unpack(data[:cls.HEADER.size])
+        position = cls.HEADER.size
+        table.offsets = data[position:position + 8 * (N + 1)].cast('Q')
+        position += 8 * (N + 1)
+        table.external_ids = data[position:position + 8 * N].cast('q')
+        position += 8 * N
+        table.slots = data[position:position + 8 * n_slots].cast('q')
+        position += 8 * n_slots
+        table.blob = data[position:position + blob_length]
+        table.building = None
+        data.release()
+        return table
+
+def external_doc_id(path):
+    """
+    External ID sebuah dokumen dari nama file-nya: "1/13.txt" -> 13, sesuai
+    doc ID di qrels.txt. Mengembalikan DocTable.NO_EXTERNAL_ID jika nama file
+    tidak numerik. Akhiran .gz (dokumen terkompresi) diabaikan.
+    """
+    name = os.path.basename(path)
+    if name.endswith('.gz'):
+        name = name[:-3]
+    name = os.path.splitext(name)[0]
+    return int(name) if name.isdigit() else DocTable.NO_EXTERNAL_ID
+
 def sorted_merge_posts_and_tfs(posts_tfs1, posts_tfs2):
     """
     Menggabung (merge) dua lists of tuples (doc id, tf) dan mengembalikan
@@ -114,6 +279,168 @@ def sorted_merge_posts_and_tfs(posts_tfs1, posts_tfs2):
             pointer2 += 1
     return sorted_list
 
+def sorted_merge_postings_positions(postings1, postings2):
+    """
+    Seperti sorted_merge_posts_and_tfs, namun untuk positional postings berupa
+    list of tuples (doc id, tf, positions). Untuk doc id yang sama, TF
+    dijumlahkan dan positions digabung (tetap terurut).
+
+    contoh: postings1 = [(1, 2, [3, 8]), (4, 1, [0])]
+            postings2 = [(2, 1, [5]), (4, 1, [6])]
+
+            return   [(1, 2, [3, 8]), (2, 1, [5]), (4, 2, [0, 6])]
+    """
+    pointer1 = 0
+    pointer2 = 0
+    sorted_list = []
+    while pointer1 < len(postings1) and pointer2 < len(postings2):
+        doc_id1, tf1, positions1 = postings1[pointer1]
+        doc_id2, tf2, positions2 = postings2[pointer2]
+        if doc_id1 == doc_id2:
+            sorted_list.append((doc_id1, tf1 + tf2, sorted(positions1 + positions2)))
+            pointer1 += 1
+            pointer2 += 1
+        elif doc_id1 < doc_id2:
+            sorted_list.append(postings1[pointer1])
+            pointer1 += 1
+        else:
+            sorted_list.append(postings2[pointer2])
+            pointer2 += 1
+    sorted_list.extend(postings1[pointer1:])
+    sorted_list.extend(postings2[pointer2:])
+    return sorted_list
+
+def phrase_positions(positions_lists):
+    """
+    Mengembalikan posisi awal setiap kemunculan frasa di sebuah dokumen, yaitu
+    posisi p sehingga term ke-i frasa berada di posisi p + i.
+
+    Dihitung dengan intersection list posisi yang sudah digeser (posisi term
+    ke-i dikurangi i), dimulai dari list terpendek agar kandidat cepat mengecil.
+
+    Parameters
+    ----------
+    positions_lists: List[List[int]]
+        positions_lists[i] adalah sorted list posisi term ke-i dari frasa
+
+    Returns
+    -------
+    List[int]
+    """
+    shifted = [[p - i for p in positions] for i, positions in enumerate(positions_lists)]
+    shifted.sort(key = len)
+    result = shifted[0]
+    for positions in shifted[1:]:
+        if not result:
+            break
+        result = sorted_intersect(result, positions)
+    return result
+
+def sorted_intersect(list1, list2):
+    """Intersection dua sorted list of integers dengan two-pointer merge"""
+    pointer1 = 0
+    pointer2 = 0
+    result = []
+    while pointer1 < len(list1) and pointer2 < len(list2):
+        if list1[pointer1] == list2[pointer2]:
+            result.append(list1[pointer1])
+            pointer1 += 1
+            pointer2 += 1
+        elif list1[pointer1] < list2[pointer2]:
+            pointer1 += 1
+        else:
+            pointer2 += 1
+    return result
+
+def galloping_search(sorted_list, target, low = 0):
+    """
+    Mencari indeks pertama i >= low dengan sorted_list[i] >= target, memakai
+    galloping (exponential) search: loncat 1, 2, 4, 8, ... posisi sampai
+    melewati target, lalu binary search di rentang terakhir. Biayanya
+    O(log d), dengan d jarak antara low dan hasil, sehingga cocok untuk
+    intersection list pendek dengan list yang jauh lebih panjang.
+    """
+    n = len(sorted_list)
+    if low >= n or sorted_list[low] >= target:
+        return low
+    step = 1
+    high = low + 1
+    while high < n and sorted_list[high] < target:
+        low = high
+        step *= 2
+        high = low + step
+    return bisect.bisect_left(sorted_list, target, low + 1, min(high, n))
+
+def galloping_intersect(short_list, long_list):
+    """
+    Intersection dua sorted list; setiap elemen list pendek dicari di list
+    panjang dengan galloping_search, jadi biayanya sebanding dengan panjang
+    list yang pendek (kali log jarak), bukan jumlah panjang keduanya.
+    """
+    if len(short_list) > len(long_list):
+        short_list, long_list = long_list, short_list
+    result = []
+    i = 0
+    for x in short_list:
+        i = galloping_search(long_list, x, i)
+        if i == len(long_list):
+            break
+        if long_list[i] == x:
+            result.append(x)
+            i += 1
+    return result
+
+def galloping_difference(list1, list2):
+    """Elemen list1 yang tidak ada di list2 (keduanya sorted), dengan galloping_search"""
+    result = []
+    i = 0
+    for x in list1:
+        i = galloping_search(list2, x, i)
+        if i == len(list2) or list2[i] != x:
+            result.append(x)
+    return result
+
+def sorted_union(list1, list2):
+    """Union dua sorted list of integers tanpa duplikat"""
+    pointer1 = 0
+    pointer2 = 0
+    result = []
+    while pointer1 < len(list1) and pointer2 < len(list2):
+        if list1[pointer1] == list2[pointer2]:
+            result.append(list1[pointer1])
+            pointer1 += 1
+            pointer2 += 1
+        elif list1[pointer1] < list2[pointer2]:
+            result.append(list1[pointer1])
+            pointer1 += 1
+        else:
+            result.append(list2[pointer2])
+            pointer2 += 1
+    result.extend(list1[pointer1:])
+    result.extend(list2[pointer2:])
+    return result
+
+def min_window_span(positions_lists):
+    """
+    Panjang window terkecil (dalam token, last - first + 1) yang memuat paling
+    tidak satu posisi dari setiap list. Dihitung dengan menyapu semua list
+    secara bersamaan memakai heap, O(P log m) untuk P posisi dan m list.
+
+    contoh: [[1, 10], [4, 12], [11]] -> 3 (window posisi 10..12)
+    """
+    heap = [(positions[0], i, 0) for i, positions in enumerate(positions_lists)]
+    heapq.heapify(heap)
+    right = max(position for position, _, _ in heap)
+    best = right - heap[0][0] + 1
+    while True:
+        left, i, j = heapq.heappop(heap)
+        best = min(best, right - left + 1)
+        if j + 1 == len(positions_lists[i]):
+            return best
+        nxt = positions_lists[i][j + 1]
+        right = max(right, nxt)
+        heapq.heappush(heap, (nxt, i, j + 1))
+
 def test(output, expected):
     """ simple function for testing """
     return "PASSED" if output == expected else "FAILED"
@@ -127,6 +454,8 @@ if __name__ == '__main__':
     assert term_id_map[0] == "halo", "term_id salah"
     assert term_id_map["selamat"] == 2, "term_id salah"
     assert term_id_map["pagi"] == 3, "term_id salah"
+    assert "pagi" in term_id_map and "malam" not in term_id_map, "__contains__ salah"
+    assert len(term_id_map) == 4, "__contains__ tidak boleh menambah term"
 
     docs = ["/collection/0/data0.txt",
             "/collection/0/data10.txt",
@@ -134,5 +463,35 @@ if __name__ == '__main__':
     doc_id_map = IdMap()
     assert [doc_id_map[docname] for docname in docs] == [0, 1, 2], "docs_id salah"
 
+    import tempfile
+    doc_table = DocTable()
+    assert external_doc_id("3/258.txt.gz") == 258, "external_doc_id salah"
+    paths = ["1/1.txt", "2/1.txt", "2/53.txt", "2/readme.txt"]
+    assert [doc_table.add(path, external_doc_id(path)) for path in paths] == [0, 1, 2, 3], "DocTable salah"
+    assert doc_table["2/1.txt"] == 1 and doc_table[0] == "1/1.txt", "DocTable salah"
+    with tempfile.TemporaryDirectory() as tmp:
+        doc_table.save(os.path.join(tmp, "docs.table"))
+        loaded = DocTable.load(os.path.join(tmp, "docs.table"))
+        assert len(loaded) == 4, "DocTable.load salah"
+        assert [loaded[path] for path in paths] == [0, 1, 2, 3], "DocTable.load salah"
+        assert [loaded[i] for i in range(4)] == paths, "DocTable.load salah"
+        assert [loaded.external_id(i) for i in range(4)] == [1, 1, 53, DocTable.NO_EXTERNAL_ID], "external ID salah"
+        assert "3/1.txt" not in loaded, "DocTable.__contains__ salah"
+        loaded.close()
+        assert loaded.mapped is None, "DocTable.close salah"
+
     assert sorted_merge_posts_and_tfs([(1, 34), (3, 2), (4, 23)], \
                                       [(1, 11), (2, 4), (4, 3 ), (6, 13)]) == [(1, 45), (2, 4), (3, 2), (4, 26), (6, 13)], "sorted_merge_posts_and_tfs salah"
+
+    assert sorted_merge_postings_positions([(1, 2, [3, 8]), (4, 1, [0])], \
+                                           [(2, 1, [5]), (4, 1, [6])]) == [(1, 2, [3, 8]), (2, 1, [5]), (4, 2, [0, 6])], "sorted_merge_postings_positions salah"
+    assert phrase_positions([[1, 5, 9], [2, 7, 10], [3, 11]]) == [1, 9], "phrase_positions salah"
+    assert phrase_positions([[1], [5]]) == [], "phrase_positions salah"
+    assert min_window_span([[1, 10], [4, 12], [11]]) == 3, "min_window_span salah"
+    assert min_window_span([[7], [8]]) == 2, "min_window_span salah"
+
+    long_list = list(range(0, 1000, 3))
+    assert [galloping_search(long_list, x) for x in [-1, 0, 1, 3, 998, 1000]] == [0, 0, 1, 1, 333, 334], "galloping_search salah"
+    assert galloping_intersect([3, 4, 300, 999], long_list) == [3, 300, 999], "galloping_intersect salah"
+    assert galloping_difference([3, 4, 300, 1000], long_list) == [4, 1000], "galloping_difference salah"
+    assert sorted_union([1, 3, 5], [2, 3, 6]) == [1, 2, 3, 5, 6], "sorted_union salah"